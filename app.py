@@ -1,6 +1,5 @@
 # Sistem ve işletim sistemi fonksiyonları için
 import sys
-import os
 # Veri işleme ve manipülasyon için
 import pandas as pd
 import random  # Rastgele sayı üretimi için
@@ -24,7 +23,8 @@ import matplotlib.patches as patches  # Grafik üzerinde şekiller için
 from matplotlib.patches import Rectangle  # Dikdörtgen şekiller için
 
 # Kendi model.py dosyamızdan fonksiyonları import et
-from model import load_and_preprocess_data, train_model, predict_price, get_available_features, get_district_stats
+from model import (train_model, predict_price, get_available_features, get_district_stats, get_predictor,
+                   get_data_context, has_trained_model)
 
 # Grafiklerin görünümü için stil ayarları
 plt.style.use('seaborn-v0_8')  # Güzel seaborn stili
@@ -35,6 +35,86 @@ plt.rcParams['axes.labelsize'] = 8  # Eksen etiket font boyutu
 plt.rcParams['xtick.labelsize'] = 7  # X ekseni değer font boyutu
 plt.rcParams['ytick.labelsize'] = 7  # Y ekseni değer font boyutu
 
+# Arka plan iş parçacığı - uzun süren işleri arayüzü dondurmadan çalıştırır
+class Worker(QThread):
+    """Verilen fonksiyonu arka planda çalıştırır; ilerleme, ara sonuç ve hata sinyalleri yayar
+    
+    pass_worker=True ise fonksiyona 'worker' argümanı verilir; fonksiyon bununla ara sonuç
+    yayabilir ve iptal edilip edilmediğini kontrol edebilir. İptal edilen işin sonucu yayılmaz.
+    """
+    progress = pyqtSignal(int, str)  # Yüzde ve durum mesajı
+    partial = pyqtSignal(str, object)  # Hazır olan ara sonucun adı ve değeri
+    result = pyqtSignal(object)  # Nihai sonuç
+    error = pyqtSignal(str)  # Hata mesajı
+    
+    def __init__(self, fn, *args, pass_worker=False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = dict(kwargs, worker=self) if pass_worker else kwargs
+        self._cancelled = False
+    
+    def cancel(self):
+        """İşi iptal et (çalışan adım bittiğinde durur, sonuç arayüze iletilmez)"""
+        self._cancelled = True
+    
+    def is_cancelled(self):
+        return self._cancelled
+    
+    def run(self):
+        try:
+            value = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self._cancelled:
+                self.error.emit(str(e))
+            return
+        if not self._cancelled:
+            self.result.emit(value)
+
+def load_model_artifacts(reload=False):
+    """Eğitilmiş model, scaler ve özellik isimlerini tahmin motorundan alır (model yoksa None)
+    
+    Model paketi yalnızca tahmin motoru tarafından bir kez açılır; arayüz aynı nesneleri kullanır.
+    """
+    if not has_trained_model():
+        return None
+    predictor = get_predictor()
+    if reload:
+        predictor.load()
+    return {
+        'model': predictor.model,
+        'scaler': predictor.scaler,
+        'feature_names': predictor.feature_names
+    }
+
+def warm_up_predictor():
+    """Tahmin motorunu önceden yükler; böylece ilk tahmin beklemez"""
+    if not has_trained_model():
+        return None
+    return get_predictor()
+
+def load_app_data(worker):
+    """Uygulama verilerini arka planda sırayla yükler; her adım hazır olduğunda ara sonuç olarak yayınlanır"""
+    steps = [
+        ('available_features', "İlçe ve mahalle listeleri yükleniyor...", get_available_features),
+        ('model', "Model dosyaları yükleniyor...", load_model_artifacts),
+        ('df', "Veri seti yükleniyor...", lambda: get_data_context().frame()),
+        ('district_stats', "İlçe istatistikleri hesaplanıyor...", get_district_stats),
+        ('predictor', "Tahmin motoru hazırlanıyor...", warm_up_predictor),
+    ]
+    for i, (name, message, fn) in enumerate(steps):
+        if worker.is_cancelled():
+            return
+        worker.progress.emit(int(100 * i / len(steps)), message)
+        try:
+            value = fn()
+        except Exception as e:
+            print(f"❌ {message} adımında hata: {e}")
+            value = None
+        if not worker.is_cancelled():
+            worker.partial.emit(name, value)
+    worker.progress.emit(100, "✅ Veri yükleme tamamlandı!")
+
 # Ana uygulama sınıfı - QMainWindow'dan miras alır (PyQt5 ana pencere)
 class KonutFiyatTahmini(QMainWindow):
     def __init__(self):
@@ -105,22 +185,104 @@ class KonutFiyatTahmini(QMainWindow):
         self.feature_importance = None  # Özelliklerin önem skorları
         self.current_real_price = None  # Rastgele seçilen örneğin gerçek fiyatı (karşılaştırma için)
         self.district_stats = None  # İlçe bazında istatistikler sözlüğü
+        self.available_features = None  # İlçe ve mahalle listeleri (arka planda yüklenir)
+        self.workers = set()  # Çalışan arka plan iş parçacıkları
+        self.prediction_worker = None  # Son başlatılan tahmin işi
+        self.chart_renderers = {}  # Sekme sayfası -> (çizim metodu, gerekli veri)
+        self.rendered_charts = set()  # Grafikleri çizilmiş (önbellekteki) sekme sayfaları
         
-        # Model.py'den ilçe ve mahalle listelerini al
-        self.available_features = get_available_features()
-        
-        # Veri setini uygulama başlangıcında yükle (tek seferlik işlem)
-        print("📊 Veri seti yükleniyor...")
-        self.df = load_and_preprocess_data()  # Excel dosyasından veriyi oku ve temizle
-        print("📈 İlçe istatistikleri hesaplanıyor...")
-        self.district_stats = get_district_stats()  # Her ilçe için ortalama, min, max fiyatları hesapla
-        print("✅ Veri yükleme tamamlandı!")
-        
-        # Arayüz elemanlarını oluştur
+        # Arayüz elemanlarını oluştur (pencere veriler yüklenmeden hemen açılır)
         self.create_ui()
         
-        # Model bilgilerini yükle (daha önce eğitilmişse)
-        self.load_model_info()
+        # Veri seti, model ve istatistikleri arka planda yükle; her biri hazır oldukça arayüze işlenir
+        self.start_worker(load_app_data, pass_worker=True, on_partial=self.on_data_loaded)
+    
+    def start_worker(self, fn, *args, on_result=None, on_partial=None, on_error=None, pass_worker=False, **kwargs):
+        """Fonksiyonu arka plan iş parçacığında başlatır ve sinyallerini bağlar"""
+        worker = Worker(fn, *args, pass_worker=pass_worker, **kwargs)
+        worker.progress.connect(self.show_progress)
+        if on_result is not None:
+            worker.result.connect(on_result)
+        if on_partial is not None:
+            worker.partial.connect(on_partial)
+        worker.error.connect(on_error if on_error is not None else self.show_worker_error)
+        worker.finished.connect(lambda: self.workers.discard(worker))
+        self.workers.add(worker)
+        worker.start()
+        return worker
+    
+    def show_progress(self, percent, message):
+        """Arka plan işlerinin ilerlemesini durum çubuğunda gösterir"""
+        print(message)
+        self.statusBar().showMessage(message)
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setVisible(percent < 100)
+    
+    def show_worker_error(self, message):
+        """Arka plan işindeki hatayı durum çubuğunda gösterir"""
+        print(f"❌ Arka plan işi hatası: {message}")
+        self.statusBar().showMessage(f"❌ Hata: {message}")
+        self.progress_bar.setVisible(False)
+    
+    def on_data_loaded(self, name, value):
+        """Arka planda yüklenen her veri parçasını arayüze işler"""
+        if name == 'available_features':
+            self.update_input_fields(value)
+        elif name == 'model':
+            if value is not None:
+                self.model = value['model']
+                self.scaler = value['scaler']
+                self.feature_names = value['feature_names']
+                self.invalidate_charts(self.importance_page)
+                print("✅ Model başarıyla yüklendi!")
+            else:
+                print("⚠️ Eğitilmiş model bulunamadı!")
+        elif name == 'df':
+            self.df = value
+            self.update_data_info()
+        elif name == 'district_stats':
+            self.district_stats = value
+            self.invalidate_charts(self.data_page)
+    
+    def register_chart(self, page, renderer, requires='df'):
+        """Sekme sayfasının grafiklerini çizen metodu kaydeder (sayfa ilk gösterildiğinde çizilir)"""
+        self.chart_renderers[page] = (renderer, requires)
+    
+    def visible_chart_pages(self):
+        """Şu anda görünen sekme sayfaları (ana sekme ve içindeki seçili alt sekme)"""
+        current = self.tab_widget.currentWidget()
+        pages = [current]
+        for sub_tabs in (self.market_tabs, self.stats_tabs, self.analysis_tabs):
+            if current.isAncestorOf(sub_tabs):
+                pages.append(sub_tabs.currentWidget())
+        return pages
+    
+    def render_visible_charts(self, *args):
+        """Görünen sekmelerin grafiklerini ilk gösterimde çizer; çizilmiş sekmeler yeniden çizilmez"""
+        for page in self.visible_chart_pages():
+            if page in self.rendered_charts or page not in self.chart_renderers:
+                continue
+            renderer, requires = self.chart_renderers[page]
+            if requires is not None and getattr(self, requires) is None:
+                continue  # Gerekli veri henüz yüklenmedi
+            renderer()
+            self.rendered_charts.add(page)
+    
+    def invalidate_charts(self, *pages):
+        """Grafik önbelleğini temizler (sayfa verilmezse tümü); görünen sayfalar hemen yeniden çizilir"""
+        if pages:
+            self.rendered_charts.difference_update(pages)
+        else:
+            self.rendered_charts.clear()
+        self.render_visible_charts()
+    
+    def closeEvent(self, event):
+        """Pencere kapanırken arka plan işlerini iptal et ve bitmelerini bekle"""
+        for worker in list(self.workers):
+            worker.cancel()
+        for worker in list(self.workers):
+            worker.wait()
+        super().closeEvent(event)
         
     def create_ui(self):
         """Kullanıcı arayüzünü oluşturur - ana UI metodu"""
@@ -142,6 +304,10 @@ class KonutFiyatTahmini(QMainWindow):
         
         self.create_data_tab()  # Ham veri analizi sekmesi
         
+        # Grafikler sekmeler ilk gösterildiğinde çizilir
+        for tabs in (self.tab_widget, self.market_tabs, self.stats_tabs, self.analysis_tabs):
+            tabs.currentChanged.connect(self.render_visible_charts)
+        
         # Sekme widget'ını ana layout'a ekle
         main_layout.addWidget(self.tab_widget)
         
@@ -149,6 +315,12 @@ class KonutFiyatTahmini(QMainWindow):
         main_widget.setLayout(main_layout)
         self.setCentralWidget(main_widget)  # QMainWindow'un merkez widget'ını ayarla
         
+        # Arka plan işleri için durum çubuğu ve ilerleme göstergesi
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+        
     def create_prediction_tab(self):
         """Fiyat tahmin sekmesini oluşturur - ana sekme"""
         prediction_tab = QWidget()  # Sekme için widget oluştur
@@ -337,8 +509,8 @@ class KonutFiyatTahmini(QMainWindow):
         prediction_tab.setLayout(main_layout)
         self.tab_widget.addTab(prediction_tab, "🔮 Fiyat Tahmini")
         
-        # İlk yüklemede mini grafikleri çiz
-        self.plot_prediction_mini_charts()
+        # Mini grafikler veri seti yüklendiğinde çizilir
+        self.register_chart(prediction_tab, self.plot_prediction_mini_charts)
         
     def create_feature_importance_tab(self):
         """Özellik önemleri sekmesini oluşturur"""
@@ -360,6 +532,8 @@ class KonutFiyatTahmini(QMainWindow):
         main_layout.addWidget(importance_group)
         importance_tab.setLayout(main_layout)
         self.tab_widget.addTab(importance_tab, "🎯 Özellik Önemleri")
+        self.importance_page = importance_tab
+        self.register_chart(importance_tab, self.plot_feature_importance, requires='model')
         
     def create_market_analysis_tab(self):
         """Piyasa analizi sekmesini oluşturur"""
@@ -382,6 +556,7 @@ class KonutFiyatTahmini(QMainWindow):
         price_trend_layout.addWidget(self.price_trend_canvas)
         price_trend_tab.setLayout(price_trend_layout)
         self.market_tabs.addTab(price_trend_tab, "💰 Fiyat Trendleri")
+        self.register_chart(price_trend_tab, self.plot_price_trends)
         
         # Bölgesel analiz tab
         regional_tab = QWidget()
@@ -392,6 +567,7 @@ class KonutFiyatTahmini(QMainWindow):
         regional_layout.addWidget(self.regional_canvas)
         regional_tab.setLayout(regional_layout)
         self.market_tabs.addTab(regional_tab, "🗺️ Bölgesel Analiz")
+        self.register_chart(regional_tab, self.plot_regional_analysis)
         
         # Değer analizi tab
         value_tab = QWidget()
@@ -402,6 +578,7 @@ class KonutFiyatTahmini(QMainWindow):
         value_layout.addWidget(self.value_canvas)
         value_tab.setLayout(value_layout)
         self.market_tabs.addTab(value_tab, "💎 Değer Analizi")
+        self.register_chart(value_tab, self.plot_value_analysis)
         
         market_layout.addWidget(self.market_tabs)
         market_group.setLayout(market_layout)
@@ -430,6 +607,7 @@ class KonutFiyatTahmini(QMainWindow):
         distribution_layout.addWidget(self.distribution_canvas)
         distribution_tab.setLayout(distribution_layout)
         self.stats_tabs.addTab(distribution_tab, "📈 Dağılım Analizi")
+        self.register_chart(distribution_tab, self.plot_distribution_analysis)
         
         # Korelasyon detay tab
         correlation_tab = QWidget()
@@ -440,6 +618,7 @@ class KonutFiyatTahmini(QMainWindow):
         correlation_layout.addWidget(self.correlation_detail_canvas)
         correlation_tab.setLayout(correlation_layout)
         self.stats_tabs.addTab(correlation_tab, "🔗 Detaylı Korelasyon")
+        self.register_chart(correlation_tab, self.plot_detailed_correlation)
         
         # Outlier analizi tab
         outlier_tab = QWidget()
@@ -450,6 +629,7 @@ class KonutFiyatTahmini(QMainWindow):
         outlier_layout.addWidget(self.outlier_canvas)
         outlier_tab.setLayout(outlier_layout)
         self.stats_tabs.addTab(outlier_tab, "🎯 Outlier Analizi")
+        self.register_chart(outlier_tab, self.plot_outlier_analysis)
         
         stats_layout.addWidget(self.stats_tabs)
         stats_group.setLayout(stats_layout)
@@ -520,6 +700,7 @@ class KonutFiyatTahmini(QMainWindow):
         price_layout.addWidget(self.price_canvas)
         price_tab.setLayout(price_layout)
         self.analysis_tabs.addTab(price_tab, "💰 Fiyat Dağılımı")
+        self.register_chart(price_tab, self.plot_price_distribution)
         
         # Korelasyon tab
         corr_tab = QWidget()
@@ -530,6 +711,7 @@ class KonutFiyatTahmini(QMainWindow):
         corr_layout.addWidget(self.corr_canvas)
         corr_tab.setLayout(corr_layout)
         self.analysis_tabs.addTab(corr_tab, "🔗 Korelasyon Analizi")
+        self.register_chart(corr_tab, self.plot_correlation_analysis)
         
         # Trend analizi tab
         trend_tab = QWidget()
@@ -540,6 +722,7 @@ class KonutFiyatTahmini(QMainWindow):
         trend_layout.addWidget(self.trend_canvas)
         trend_tab.setLayout(trend_layout)
         self.analysis_tabs.addTab(trend_tab, "📈 Trend Analizi")
+        self.register_chart(trend_tab, self.plot_trend_analysis)
         
         analysis_layout.addWidget(self.analysis_tabs)
         analysis_group.setLayout(analysis_layout)
@@ -556,6 +739,8 @@ class KonutFiyatTahmini(QMainWindow):
         main_layout.addWidget(data_splitter)
         data_tab.setLayout(main_layout)
         self.tab_widget.addTab(data_tab, "📊 Veri Analizi")
+        self.data_page = data_tab
+        self.register_chart(data_tab, self.plot_district_statistics, requires='district_stats')
     
     def update_mahalle_list(self, selected_ilce):
         """Seçilen ilçeye göre mahalle listesini güncelle"""
@@ -582,15 +767,15 @@ class KonutFiyatTahmini(QMainWindow):
     def load_model_files(self):
         """Model dosyalarını yükler"""
         try:
-            if os.path.exists('models/konut_fiyat_model.pkl'):
+            artifacts = load_model_artifacts(reload=True)
+            if artifacts is not None:
                 # Model detaylarını göster
-                import joblib
-                self.model = joblib.load('models/konut_fiyat_model.pkl')
-                self.scaler = joblib.load('models/scaler.pkl')
-                self.feature_names = joblib.load('models/feature_names.pkl')
+                self.model = artifacts['model']
+                self.scaler = artifacts['scaler']
+                self.feature_names = artifacts['feature_names']
                 
-                # Özellik önemini çizdir
-                self.plot_feature_importance()
+                # Model değişti: özellik önemi grafiği sekme gösterildiğinde yeniden çizilir
+                self.invalidate_charts(self.importance_page)
                 
                 # Input alanlarını güncelle
                 self.update_input_fields()
@@ -601,10 +786,10 @@ class KonutFiyatTahmini(QMainWindow):
         except Exception as e:
             print(f"❌ Model yükleme hatası: {e}")
     
-    def update_input_fields(self):
+    def update_input_fields(self, available_features=None):
         """Modele göre input alanlarını günceller"""
-        # Modelden ilçe ve mahalle bilgilerini al
-        self.available_features = get_available_features()
+        # Modelden ilçe ve mahalle bilgilerini al (verilmediyse dosyadan oku)
+        self.available_features = available_features if available_features is not None else get_available_features()
         
         if self.available_features is not None:
             # İlçe listesini güncelle
@@ -628,12 +813,7 @@ class KonutFiyatTahmini(QMainWindow):
     def update_data_info(self):
         """Veri seti bilgilerini günceller"""
         try:
-            # Veri zaten yüklüyse yeniden yükleme
-            if self.df is None:
-                self.df = load_and_preprocess_data()
-            if self.district_stats is None:
-                self.district_stats = get_district_stats()
-            
+            # Veri arka planda yüklenir; henüz hazır değilse bekleme mesajı kalır
             if self.df is not None:
                 # Detaylı veri seti özeti
                 unique_districts = self.df['ilce'].nunique()
@@ -672,15 +852,8 @@ class KonutFiyatTahmini(QMainWindow):
                 
                 self.data_info_text.setText(info_text)
                 
-                # Tüm grafikleri çiz
-                self.plot_price_distribution()
-                self.plot_correlation_analysis()
-                self.plot_trend_analysis()
-                self.plot_district_statistics()
-                
-                # Yeni analiz grafiklerini çiz
-                self.plot_market_analysis()
-                self.plot_statistical_analysis()
+                # Veri seti değişti: grafik önbelleğini temizle, sekmeler gösterildikçe yeniden çizilir
+                self.invalidate_charts()
         except Exception as e:
             self.data_info_text.setText(f"Veri yükleme hatası: {e}")
     
@@ -944,8 +1117,9 @@ class KonutFiyatTahmini(QMainWindow):
             
             # 4. Fiyat/m² dağılımı
             ax4 = self.trend_fig.add_subplot(gs[1, 1])
-            self.df['fiyat_per_m2'] = self.df['fiyat'] / self.df['metrekare']
-            price_per_m2_by_district = self.df.groupby('ilce')['fiyat_per_m2'].mean().sort_values(ascending=False).head(10)
+            # Paylaşılan veri çerçevesine sütun eklenmez, m² fiyatı yerel seri olarak hesaplanır
+            fiyat_per_m2 = self.df['fiyat'] / self.df['metrekare']
+            price_per_m2_by_district = fiyat_per_m2.groupby(self.df['ilce']).mean().sort_values(ascending=False).head(10)
             price_per_m2_by_district.plot(kind='bar', ax=ax4, color='lightcoral')
             ax4.set_title('İlçe Bazında m² Fiyatı', fontweight='bold')
             ax4.set_xlabel('')
@@ -1030,8 +1204,7 @@ class KonutFiyatTahmini(QMainWindow):
             
             # 2. Metrekare başına fiyat dağılımı
             ax2 = self.price_trend_fig.add_subplot(gs[0, 1])
-            self.df['price_per_m2'] = self.df['fiyat'] / self.df['metrekare']
-            m2_price = self.df['price_per_m2']
+            m2_price = self.df['fiyat'] / self.df['metrekare']
             ax2.hist(m2_price, bins=50, alpha=0.7, color='lightblue', edgecolor='navy')
             ax2.axvline(m2_price.mean(), color='red', linestyle='--', linewidth=2, label=f'Ortalama: {m2_price.mean():,.0f} TL/m²')
             ax2.axvline(m2_price.median(), color='green', linestyle='--', linewidth=2, label=f'Medyan: {m2_price.median():,.0f} TL/m²')
@@ -1655,10 +1828,10 @@ class KonutFiyatTahmini(QMainWindow):
     def load_random_sample(self):
         """Veri setinden rastgele bir örnek seçer ve form alanlarını doldurur"""
         try:
-            # Veri seti yüklü değilse yükle
-            if self.df is None:
-                print("📊 Veri seti yükleniyor...")
-                self.df = load_and_preprocess_data()
+            # Veri seti arka planda yükleniyorsa beklet
+            if self.df is None and self.workers:
+                QMessageBox.information(self, "Veri Yükleniyor", "Veri seti henüz yükleniyor, lütfen birkaç saniye sonra tekrar deneyin.")
+                return
             
             if self.df is not None and not self.df.empty:
                 # Rastgele bir konut seç
@@ -1713,9 +1886,37 @@ class KonutFiyatTahmini(QMainWindow):
                 elif isinstance(widget, QLineEdit):  # Metin kutusu ise
                     features[key] = widget.text()  # Metni al
             
-            # Model.py'deki predict_price fonksiyonunu çağır
-            result = predict_price(features)  # Makine öğrenmesi ile tahmin yap
-            
+            # Önceki tahmin hâlâ sürüyorsa iptal et (sonucu artık gösterilmez)
+            if self.prediction_worker is not None:
+                self.prediction_worker.cancel()
+            
+            # Model.py'deki predict_price fonksiyonunu arka planda çağır
+            self.result_label.setText("⏳ Tahmin hesaplanıyor...")
+            self.prediction_worker = self.start_worker(
+                predict_price, features,
+                on_result=lambda result: self.show_prediction_result(features, result),
+                on_error=self.show_prediction_error
+            )
+        except Exception as e:
+            self.show_prediction_error(str(e))
+    
+    def show_prediction_error(self, message):
+        """Tahmin hatasını sonuç alanında gösterir"""
+        self.result_label.setText(f"❌ Tahmin hatası: {message}")
+        self.result_label.setStyleSheet("""
+            QLabel {
+                background-color: #f8d7da;
+                color: #721c24;
+                padding: 20px;
+                border-radius: 15px;
+                border: 2px solid #dc3545;
+            }
+        """)
+        self.confidence_label.setText("")
+    
+    def show_prediction_result(self, features, result):
+        """Arka planda yapılan tahminin sonucunu arayüzde gösterir"""
+        try:
             if result is not None:
                 # Sonuçları göster
                 prediction = result['prediction']
@@ -1801,17 +2002,7 @@ class KonutFiyatTahmini(QMainWindow):
                 """)
                 self.confidence_label.setText("")
         except Exception as e:
-            self.result_label.setText(f"❌ Tahmin hatası: {e}")
-            self.result_label.setStyleSheet("""
-                QLabel {
-                    background-color: #f8d7da;
-                    color: #721c24;
-                    padding: 20px;
-                    border-radius: 15px;
-                    border: 2px solid #dc3545;
-                }
-            """)
-            self.confidence_label.setText("")
+            self.show_prediction_error(str(e))
     
     def plot_prediction_comparison(self, features, prediction, lower_bound, upper_bound):
         """Tahmin karşılaştırma grafiği çizer"""
@@ -1924,7 +2115,7 @@ if __name__ == "__main__":
     window.show()
     
     # Eğitilmiş model dosyasının varlığını kontrol et
-    if not os.path.exists('models/konut_fiyat_model.pkl'):
+    if not has_trained_model():
         # Model yoksa kullanıcıya bilgi ver
         QMessageBox.information(window, "Model Bulunamadı", 
                               "Eğitilmiş model bulunamadı. Model eğitimi için 'model.py' dosyasını çalıştırın.")
@@ -0,0 +1,222 @@
+# Performans karşılaştırmaları - eski ve yeni uygulamaları sentetik veri üzerinde ölçer
+# Kullanım: python benchmark.py [karşılaştırma_adı ...]
+import pickle
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+
+from model import (INPUT_COLUMNS, TARGET_ENCODING_COLUMNS, CompiledForest, MicroBatcher,
+                   advanced_target_encode_categorical, attach_encodings, clean_district_outliers, compile_ensemble,
+                   compiled_prediction_error, get_predictor, has_trained_model)
+
+
+def synthetic_listings(n_rows, n_districts=39, n_neighbourhoods=900, seed=42):
+    """Gerçek veri setine benzer dağılımda sentetik konut ilanları üret"""
+    rng = np.random.default_rng(seed)
+    ilce_ids = rng.integers(0, n_districts, n_rows)
+    # Her mahalle tek bir ilçeye bağlı
+    mahalle_ids = ilce_ids * (n_neighbourhoods // n_districts) + rng.integers(0, n_neighbourhoods // n_districts, n_rows)
+    ilce_level = rng.uniform(15000, 90000, n_districts)[ilce_ids]
+    metrekare = rng.integers(30, 400, n_rows)
+    yas = rng.integers(0, 80, n_rows)
+    fiyat = ilce_level * metrekare * (1 - yas / 200) * rng.lognormal(0, 0.25, n_rows)
+    return pd.DataFrame({
+        'fiyat': fiyat.round(-3),
+        'ilce': np.array([f'Ilce {i}' for i in range(n_districts)])[ilce_ids],
+        'mahalle': np.array([f'Mahalle {i}' for i in range(n_neighbourhoods)])[mahalle_ids],
+        'metrekare': metrekare,
+        'oda_sayisi': np.clip(metrekare // 45 + 1, 1, 8),
+        'yas': yas,
+        'bulundugu_kat': rng.integers(-2, 40, n_rows)
+    })
+
+
+def timed(func, *args, repeat=3):
+    """Fonksiyonu birkaç kez çalıştır, en iyi süreyi ve son sonucu döndür"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _legacy_district_cleaning(df):
+    """load_and_preprocess_data'daki eski ilçe döngüsü (karşılaştırma için)"""
+    cleaned_dfs = []
+    for ilce in df['ilce'].unique():
+        ilce_df = df[df['ilce'] == ilce].copy()
+        if len(ilce_df) < 10:
+            continue
+        Q1_fiyat = ilce_df['fiyat'].quantile(0.1)
+        Q3_fiyat = ilce_df['fiyat'].quantile(0.9)
+        IQR_fiyat = Q3_fiyat - Q1_fiyat
+        ilce_df = ilce_df[(ilce_df['fiyat'] >= Q1_fiyat - 1.0 * IQR_fiyat) & (ilce_df['fiyat'] <= Q3_fiyat + 1.0 * IQR_fiyat)]
+        Q1_m2 = ilce_df['metrekare'].quantile(0.05)
+        Q3_m2 = ilce_df['metrekare'].quantile(0.95)
+        IQR_m2 = Q3_m2 - Q1_m2
+        ilce_df = ilce_df[(ilce_df['metrekare'] >= Q1_m2 - 1.5 * IQR_m2) & (ilce_df['metrekare'] <= Q3_m2 + 1.5 * IQR_m2)]
+        cleaned_dfs.append(ilce_df)
+    return pd.concat(cleaned_dfs, ignore_index=True)
+
+
+def bench_district_cleaning(sizes=(20_000, 200_000, 2_000_000)):
+    """İlçe bazında aykırı değer temizleme: Python döngüsü vs tek gruplu geçiş"""
+    print("İlçe bazında aykırı değer temizleme")
+    print(f"{'Satır':>10} {'Döngü (s)':>12} {'Gruplu (s)':>12} {'Hızlanma':>10}")
+    for n_rows in sizes:
+        df = synthetic_listings(n_rows)
+        legacy_time, legacy = timed(_legacy_district_cleaning, df)
+        new_time, new = timed(clean_district_outliers, df)
+        pd.testing.assert_frame_equal(legacy, new)  # Çıktılar birebir aynı olmalı
+        print(f"{n_rows:>10,} {legacy_time:>12.3f} {new_time:>12.3f} {legacy_time / new_time:>9.1f}x")
+
+
+def _legacy_target_encoding(df, categorical_cols, target_col, n_splits=5):
+    """advanced_target_encode_categorical'ın eski groupby/merge/loc sürümü (karşılaştırma için)"""
+    df_encoded = df.copy()
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    ilce_labels = LabelEncoder().fit_transform(df['ilce'])
+    global_mean = df[target_col].mean()
+    global_median = df[target_col].median()
+    global_std = df[target_col].std()
+    fill_values = {'mean': global_mean, 'median': global_median, 'std': global_std, 'count': 1,
+                   'min': global_mean, 'max': global_mean, 'q25': global_mean, 'q75': global_mean,
+                   'smoothed_mean': global_mean}
+    stat_names = ['mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75', 'smoothed_mean']
+    for col in categorical_cols:
+        for name in stat_names:
+            df_encoded[f"{col}_target_{name.replace('_mean', '')}"] = 0.0
+        for train_idx, val_idx in skf.split(df, ilce_labels):
+            train_data = df.iloc[train_idx]
+            val_data = df.iloc[val_idx]
+            target_stats = train_data.groupby(col)[target_col].agg([
+                'mean', 'median', 'std', 'count', 'min', 'max',
+                lambda x: x.quantile(0.25),
+                lambda x: x.quantile(0.75)
+            ]).reset_index()
+            target_stats.columns = [col, 'mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75']
+            target_stats['smoothed_mean'] = (
+                (target_stats['count'] * target_stats['mean'] + 10 * global_mean) / (target_stats['count'] + 10)
+            )
+            target_stats = target_stats.fillna(fill_values)
+            val_merged = val_data[[col]].merge(target_stats, on=col, how='left').fillna(fill_values)
+            for name in stat_names:
+                df_encoded.loc[val_idx, f"{col}_target_{name.replace('_mean', '')}"] = val_merged[name].values
+    return df_encoded
+
+
+def bench_target_encoding(sizes=(100_000, 1_000_000)):
+    """Out-of-fold target encoding: fold başına groupby+merge vs tamsayı kodlu sıralı dizi çekirdekleri"""
+    print("Out-of-fold target encoding (ilce + mahalle, 5 fold)")
+    print(f"{'Satır':>10} {'Eski (s)':>12} {'Vektörel (s)':>12} {'Hızlanma':>10}")
+    for n_rows in sizes:
+        df = synthetic_listings(n_rows)
+        args = (df, ['ilce', 'mahalle'], 'fiyat')
+        legacy_time, legacy = timed(_legacy_target_encoding, *args, repeat=1)
+        new_time, new = timed(advanced_target_encode_categorical, *args)
+        # Çıktılar kayan nokta yuvarlaması dışında aynı olmalı
+        np.testing.assert_allclose(new[TARGET_ENCODING_COLUMNS].values, legacy[TARGET_ENCODING_COLUMNS].values,
+                                   rtol=1e-10)
+        print(f"{n_rows:>10,} {legacy_time:>12.3f} {new_time:>12.3f} {legacy_time / new_time:>9.1f}x")
+
+
+def _closed_loop_load(batcher, listings, n_callers):
+    """n_callers iş parçacığı, her biri sonucunu bekleyip sıradaki ilanı gönderir; toplam süreyi döndür"""
+    def caller(offset):
+        for i in range(offset, len(listings), n_callers):
+            batcher.predict(listings[i])
+    threads = [threading.Thread(target=caller, args=(k,)) for k in range(n_callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def bench_micro_batching(settings=((1, 0), (32, 5), (256, 5), (256, 25)), n_callers=64, n_requests=2000):
+    """Mikro-toplu kuyruk: grup boyutu (N) ve bekleme süresi (T) ayarlarının verim ve gecikmeye etkisi"""
+    print(f"Mikro-toplu tahmin kuyruğu ({n_callers} eşzamanlı istemci, {n_requests:,} istek)")
+    if not has_trained_model():
+        print("Eğitilmiş model bulunamadı, atlandı (önce python model.py)")
+        return
+    predictor = get_predictor()
+    listings = synthetic_listings(n_requests)[INPUT_COLUMNS].to_dict('records')
+    print(f"{'N':>5} {'T (ms)':>7} {'İstek/s':>9} {'Ort. grup':>10} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for max_batch_size, max_wait_ms in settings:
+        batcher = MicroBatcher(predictor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        elapsed = _closed_loop_load(batcher, listings, n_callers)
+        batcher.close()
+        stats = batcher.stats.snapshot()
+        print(f"{max_batch_size:>5} {max_wait_ms:>7g} {n_requests / elapsed:>9.1f} {stats['mean_batch_size']:>10.1f} "
+              f"{stats['latency_ms']['p50']:>9.0f} {stats['latency_ms']['p99']:>9.0f}")
+    print("Son ayarın grup boyutu histogramı:", stats['batch_size_histogram'])
+
+
+def _peak_memory(func, *args):
+    """Fonksiyon çalışırken Python tarafında ayrılan en yüksek bellek (bayt)"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_compiled_inference(batch_sizes=(1, 16, 64, 256, 1024, 4096)):
+    """Derlenmiş ağaç motoru: grup boyutuna göre sklearn'e karşı hızlanma, sapma ve bellek"""
+    print("Derlenmiş ağaç motoru (düz düğüm dizileri, tüm ağaçlar birlikte)")
+    if not has_trained_model():
+        print("Eğitilmiş model bulunamadı, atlandı (önce python model.py)")
+        return
+    predictor = get_predictor()
+    model = predictor.model
+    start = time.perf_counter()
+    compiled_model, n_compiled = compile_ensemble(model)
+    print(f"Derleme: {n_compiled} model, {time.perf_counter() - start:.2f} s")
+    if n_compiled == 0:
+        print("Derlenebilir ağaç modeli yok, atlandı")
+        return
+    
+    listings = synthetic_listings(max(batch_sizes))[INPUT_COLUMNS]
+    X_all = predictor.feature_plan.model_input(attach_encodings(listings, predictor.encoding_tables), predictor.scaler)
+    print(f"{'Satır':>7} {'sklearn (ms)':>13} {'Derlenmiş (ms)':>15} {'Hızlanma':>9} {'Göreli sapma':>13}")
+    for n_rows in batch_sizes:
+        X = X_all[:n_rows]
+        sklearn_time, _ = timed(model.predict, X)
+        compiled_time, _ = timed(compiled_model.predict, X)
+        error = compiled_prediction_error(model, compiled_model, X)
+        print(f"{n_rows:>7,} {sklearn_time * 1000:>13.1f} {compiled_time * 1000:>15.1f} "
+              f"{sklearn_time / compiled_time:>8.1f}x {error:>13.1e}")
+    
+    forests = ([compiled_model] if isinstance(compiled_model, CompiledForest)
+               else [est for est in compiled_model.named_estimators_.values() if isinstance(est, CompiledForest)])
+    print(f"Düğüm dizileri: {sum(forest.nbytes for forest in forests) / 2**20:.1f} MB "
+          f"({sum(forest.n_trees for forest in forests):,} ağaç), "
+          f"pickle edilmiş orijinal model: {len(pickle.dumps(model)) / 2**20:.1f} MB")
+    X = X_all[:batch_sizes[-1]]
+    print(f"{X.shape[0]:,} satır tahmininde en yüksek ek bellek: sklearn {_peak_memory(model.predict, X) / 2**20:.1f} MB, "
+          f"derlenmiş {_peak_memory(compiled_model.predict, X) / 2**20:.1f} MB")
+
+
+BENCHMARKS = {
+    'cleaning': bench_district_cleaning,
+    'target_encoding': bench_target_encoding,
+    'micro_batching': bench_micro_batching,
+    'compiled_inference': bench_compiled_inference,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
@@ -2,8 +2,11 @@
 import pandas as pd  # Veri işleme için
 import numpy as np   # Sayısal hesaplamalar için
 # Makine öğrenmesi algoritmaları için sklearn kütüphaneleri
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, VotingRegressor, StackingRegressor
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold  # Veriyi bölme ve doğrulama için
+from sklearn.ensemble import (RandomForestRegressor, GradientBoostingRegressor, VotingRegressor, StackingRegressor,
+                              ExtraTreesRegressor, HistGradientBoostingRegressor)
+from sklearn.tree import DecisionTreeRegressor  # Derlenmiş ağaç motoru için
+from sklearn.dummy import DummyRegressor  # Gradient boosting başlangıç tahmini için
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold, KFold  # Veriyi bölme ve doğrulama için
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_percentage_error, mean_absolute_error  # Performans ölçme için
 from sklearn.preprocessing import RobustScaler, PowerTransformer, LabelEncoder, PolynomialFeatures  # Veri dönüşümü için
 from sklearn.pipeline import Pipeline  # İşlem zincirleri için
@@ -11,247 +14,569 @@ from sklearn.feature_selection import SelectFromModel, SelectKBest, f_regression
 from sklearn.linear_model import Ridge  # Doğrusal regresyon için
 from scipy import stats  # İstatistiksel işlemler için
 from scipy.stats import boxcox  # Veri dönüşümü için
+from scipy import sparse  # Seyrek one-hot matrisleri için
 import joblib  # Model kaydetme/yükleme için
+from joblib import Parallel, delayed  # Paralel model eğitimi için
+from sklearn.base import clone  # Model kopyalama için
 import os  # Dosya işlemleri için
+import threading  # Tahmin motorunda eşzamanlı erişim için
+import time  # Model dosyası değişiklik kontrolü için
 import matplotlib.pyplot as plt  # Grafik çizme için
 import seaborn as sns  # Güzel grafikler için
+import hashlib  # Veri dosyası özeti (önbellek anahtarı) için
+import json  # Önbellek meta bilgisi için
+import queue  # Mikro-toplu tahmin kuyruğu için
+import copy  # Derlenmiş ensemble kopyası için
+import pickle  # Model boyutu ölçümü için
+from collections import deque  # Gecikme geçmişi için
+from concurrent.futures import Future  # Kuyruktaki isteklerin sonuçları için
 import warnings
 warnings.filterwarnings('ignore')  # Uyarıları gizle
 
+# Opsiyonel gradient boosting kütüphaneleri (kurulu değilse ensemble'a eklenmez)
+try:
+    import xgboost as xgb
+    XGB_AVAILABLE = True
+except ImportError:
+    XGB_AVAILABLE = False
 
-def load_and_preprocess_data():
-    """Veri setini yükle ve ön işle - İyileştirilmiş veri temizleme"""
+try:
+    import lightgbm as lgb
+    LGB_AVAILABLE = True
+except ImportError:
+    LGB_AVAILABLE = False
+
+# Temizlenmiş veri önbelleği için Arrow/Feather desteği (yoksa .npz kullanılır)
+try:
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Veri seti dosyası ve temizlenmiş veri önbelleği ayarları
+DATA_FILE = 'istanbul_konut2.xlsx'
+DATA_CACHE_DIR = 'cache'
+# Temizleme adımları değiştiğinde artırılır; eski önbellek dosyaları geçersiz olur
+CLEANING_VERSION = 1
+# İlçe listesi, ilçe-mahalle haritası ve fiyat aralığını tek dosyada tutan meta veri (eski model klasörleri)
+METADATA_FILE = 'models/metadata.pkl'
+
+# Versiyonlu model paketi: JSON manifest + sıkıştırılmamış joblib yükü (diziler bellek eşlemeli açılabilir)
+MODEL_BUNDLE_SCHEMA_VERSION = 1
+MODEL_BUNDLE_MANIFEST = 'manifest.json'
+MODEL_BUNDLE_KEYS = ('model', 'scaler', 'feature_names', 'feature_plan', 'encoding_tables', 'uncertainty_table',
+                     'confidence_params', 'performance_metrics', 'metadata')
+# Pakette bulunmayabilen parçalar (eksikse None yüklenir)
+MODEL_BUNDLE_OPTIONAL_KEYS = ('compiled_model', 'student_model', 'training_split')
+# Paketten önceki sürümlerin ayrı ayrı kaydettiği dosyalar
+LEGACY_MODEL_FILES = ('konut_fiyat_model.pkl', 'scaler.pkl', 'feature_names.pkl', 'feature_plan.pkl',
+                      'encoding_tables.pkl', 'uncertainty_table.pkl', 'confidence_params.pkl',
+                      'performance_metrics.pkl', 'metadata.pkl', 'unique_ilce.pkl', 'ilce_mahalle_map.pkl',
+                      'price_range.pkl')
+
+
+def _file_sha256(path, block_size=1 << 20):
+    """Dosyanın SHA-256 özetini hesapla"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _cache_meta_path(source_path):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(DATA_CACHE_DIR, f'{stem}.meta.json')
+
+def load_cached_dataset(source_path=DATA_FILE):
+    """Kaynak dosya değişmediyse temizlenmiş veriyi sütunsal önbellekten yükle, yoksa None döndür"""
+    meta_path = _cache_meta_path(source_path)
+    if not os.path.exists(meta_path) or not os.path.exists(source_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != CLEANING_VERSION or not os.path.exists(meta.get('cache_file', '')):
+        return None
+    
+    # Önce hızlı kontrol (mtime + boyut), değiştiyse içerik özetine bak
+    stat = os.stat(source_path)
+    if (meta['mtime_ns'], meta['size']) != (stat.st_mtime_ns, stat.st_size):
+        if _file_sha256(source_path) != meta['sha256']:
+            return None
+        # İçerik aynı, sadece zaman damgası değişmiş: meta bilgiyi güncelle
+        meta['mtime_ns'], meta['size'] = stat.st_mtime_ns, stat.st_size
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+    
+    cache_file = meta['cache_file']
+    if cache_file.endswith('.feather'):
+        if not PYARROW_AVAILABLE:
+            return None
+        # Sıkıştırmasız Feather dosyası bellek eşlemeli (memory-map) okunur
+        return feather.read_table(cache_file, memory_map=True).to_pandas()
+    with np.load(cache_file, allow_pickle=False) as arrays:
+        return pd.DataFrame({col: arrays[col] for col in meta['columns']})
+
+def save_cached_dataset(df, source_path=DATA_FILE):
+    """Temizlenmiş veriyi kaynak dosyanın özetiyle anahtarlanmış sütunsal önbelleğe yaz"""
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+    stat = os.stat(source_path)
+    sha256 = _file_sha256(source_path)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    base_path = os.path.join(DATA_CACHE_DIR, f'{stem}_{sha256[:16]}_v{CLEANING_VERSION}')
+    
+    df = df.reset_index(drop=True)
+    if PYARROW_AVAILABLE:
+        cache_file = base_path + '.feather'
+        df.to_feather(cache_file, compression='uncompressed')
+    else:
+        # Tipli NumPy dizileri: metin sütunları sabit genişlikli unicode olarak saklanır
+        cache_file = base_path + '.npz'
+        arrays = {col: (df[col].to_numpy(dtype=str) if df[col].dtype == object or pd.api.types.is_string_dtype(df[col])
+                        else df[col].to_numpy()) for col in df.columns}
+        np.savez(cache_file, **arrays)
+    
+    meta = {
+        'version': CLEANING_VERSION,
+        'source': os.path.basename(source_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': sha256,
+        'cache_file': cache_file,
+        'columns': df.columns.tolist()
+    }
+    with open(_cache_meta_path(source_path), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def clean_district_outliers(df, min_count=10):
+    """İlçe bazında fiyat ve metrekare aykırı değerlerini tek gruplu geçişte temizle
+    
+    Her ilçe için fiyatın %10-%90 ve metrekarenin %5-%95 yüzdelikleri groupby().transform
+    ile hesaplanır ve tek bir boolean maske uygulanır. Sonuç, ilçe ilçe filtreleyip
+    birleştiren eski döngüyle aynıdır (satırlar ilçelerin ilk görülme sırasına göre gruplanır).
+    """
+    # İlçe kodları ilk görülme sırasında (df['ilce'].unique() ile aynı sıra)
+    ilce_codes = pd.factorize(df['ilce'])[0]
+    
+    # Fiyat sınırları - IQR yöntemiyle agresif temizlik (%10-%90, 1.0 çarpan)
+    # Çok az örneği olan ilçeler (güvenilir istatistik için) tamamen çıkarılır
+    fiyat_groups = df.groupby(ilce_codes, sort=False)['fiyat']
+    counts = fiyat_groups.transform('size')
+    q1_fiyat = fiyat_groups.transform('quantile', 0.1)
+    q3_fiyat = fiyat_groups.transform('quantile', 0.9)
+    iqr_fiyat = q3_fiyat - q1_fiyat
+    fiyat_mask = ((counts >= min_count) &
+                  (df['fiyat'] >= q1_fiyat - 1.0 * iqr_fiyat) &
+                  (df['fiyat'] <= q3_fiyat + 1.0 * iqr_fiyat)).values
+    df = df[fiyat_mask]
+    ilce_codes = ilce_codes[fiyat_mask]
+    
+    # Metrekare sınırları fiyat temizliğinden sonra kalan satırlar üzerinden (%5-%95, 1.5 çarpan)
+    m2_groups = df.groupby(ilce_codes, sort=False)['metrekare']
+    q1_m2 = m2_groups.transform('quantile', 0.05)
+    q3_m2 = m2_groups.transform('quantile', 0.95)
+    iqr_m2 = q3_m2 - q1_m2
+    m2_mask = ((df['metrekare'] >= q1_m2 - 1.5 * iqr_m2) &
+               (df['metrekare'] <= q3_m2 + 1.5 * iqr_m2)).values
+    df = df[m2_mask]
+    
+    # Eski pd.concat(ilçe listesi) sırasını koru: ilçe sırasına göre kararlı sıralama
+    order = np.argsort(ilce_codes[m2_mask], kind='stable')
+    return df.iloc[order].reset_index(drop=True)
+
+def clean_raw_listings(df):
+    """Ham ilan tablosunu standart sütun isimlerine çevir ve temel temizlemeyi uygula
+    
+    Hem veri setinin ilk yüklemesinde hem de artımlı güncellemedeki yeni ilanlarda kullanılır.
+    """
+    # Sütun isimlerini Türkçe karakterler ve boşluklar olmadan düzenle (consistency için)
+    df.columns = ['fiyat', 'ilce', 'mahalle', 'metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat']
+    
+    # Eksik (NaN) verileri temizle - pandas dropna() ile
+    df = df.dropna()  # Eksik verileri kaldır
+    
+    # Fiyat sütununu sayısal veriye dönüştür, hata varsa NaN yap
+    df['fiyat'] = pd.to_numeric(df['fiyat'], errors='coerce')
+    # Fiyatı eksik/hatalı olan kayıtları sil
+    df = df.dropna(subset=['fiyat'])  # Fiyatı eksik olan kayıtları çıkar
+    
+    # İlçe ve mahalle değerlerini standartlaştır ve tutarlı hale getir
+    df['ilce'] = df['ilce'].str.strip().str.title()      # Başına-sonuna boşluk sil, ilk harfi büyüt
+    df['mahalle'] = df['mahalle'].str.strip().str.title()  # Aynı işlemi mahalle için de yap
+    
+    # Aynı anlama gelebilecek farklı yazımları birleştir (örnek: Üsküdar = Uskudar)
+    ilce_mapping = {
+        'Üsküdar': 'Üsküdar',   # Standart yazım
+        'Uskudar': 'Üsküdar',   # Türkçesiz yazımı standarda çevir
+        'Beşiktaş': 'Beşiktaş', # Standart yazım
+        'Besiktas': 'Beşiktaş', # Türkçesiz yazımı standarda çevir
+        'Şişli': 'Şişli',       # Standart yazım
+        'Sisli': 'Şişli'        # Türkçesiz yazımı standarda çevir
+    }
+    df['ilce'] = df['ilce'].replace(ilce_mapping)  # Mapping'i uygula
+    
+    # Sayısal değerlerin makul aralıklarda olduğundan emin ol (aykırı değerleri temizle)
+    df = df[(df['metrekare'] >= 30) & (df['metrekare'] <= 400)]      # 30-400 m² arası makul
+    df = df[(df['oda_sayisi'] >= 1) & (df['oda_sayisi'] <= 8)]       # 1-8 oda arası makul
+    df = df[(df['yas'] >= 0) & (df['yas'] <= 80)]                    # 0-80 yaş arası makul
+    df = df[(df['bulundugu_kat'] >= -2) & (df['bulundugu_kat'] <= 40)]  # -2 ile 40. kat arası makul
+    
+    # Fiyat üzerinde daha agresif aykırı değer temizleme
+    df = df[(df['fiyat'] >= 100000) & (df['fiyat'] <= 50000000)]  # 100bin-50milyon TL arası makul
+    return df
+
+def add_group_statistics(df):
+    """İlçe/mahalle fiyat istatistiklerini, log fiyatı ve frekans kodlamasını ekle"""
+    # İlçe ve mahalle bazında fiyat istatistikleri
+    ilce_stats = df.groupby('ilce')['fiyat'].agg(['mean', 'median', 'std']).reset_index()
+    mahalle_stats = df.groupby('mahalle')['fiyat'].agg(['mean', 'median', 'std']).reset_index()
+    
+    # İlçe ve mahalle bazında fiyat istatistikleri ile encoding
+    df = df.merge(ilce_stats, on='ilce', how='left', suffixes=('', '_ilce'))
+    df = df.merge(mahalle_stats, on='mahalle', how='left', suffixes=('', '_mahalle'))
+    
+    # Logaritmik dönüşüm (fiyat dağılımını normalleştirmek için)
+    df['fiyat_log'] = np.log1p(df['fiyat'])
+    
+    # İlçe ve mahalle frekans kodlaması
+    ilce_freq = df['ilce'].value_counts(normalize=True).to_dict()
+    mahalle_freq = df['mahalle'].value_counts(normalize=True).to_dict()
+    df['ilce_freq'] = df['ilce'].map(ilce_freq)
+    df['mahalle_freq'] = df['mahalle'].map(mahalle_freq)
+    return df
+
+def filter_listings(df):
+    """Veri seti düzeyinde aykırı değer ve az örnekli grup temizliği
+    
+    Z-score, ilçe bazında aykırı değer, metrekare fiyatı sınırları ve en az 10 ilanlı ilçe /
+    5 ilanlı mahalle filtreleri uygulanır. Hem Excel verisinde hem de artımlı güncellemelerle
+    birleştirilmiş eğitim verisinde kullanılır.
+    """
+    # 1. Aşama: Z-score tabanlı aykırı değer temizleme (tüm veri için genel temizlik)
+    from scipy import stats  # İstatistiksel fonksiyonlar için
+    z_scores = np.abs(stats.zscore(df['fiyat']))  # Her fiyat için Z-score hesapla (ortalamadan kaç sigma uzak)
+    df = df[z_scores < 3]  # 3 sigma (standart sapma) dışındaki değerleri aykırı say ve çıkar
+    print(f"Z-score temizleme sonrası: {df.shape[0]} kayıt")
+    
+    # 2. Aşama: İlçe bazında daha agresif aykırı değer tespiti (her ilçeyi kendi içinde temizle)
+    df = clean_district_outliers(df)
+    print(f"İlçe bazında temizleme sonrası: {df.shape[0]} kayıt")
+    
+    # Metrekare başına düşen fiyat hesapla ve aykırı değerleri temizle
+    df['fiyat_metrekare'] = df['fiyat'] / df['metrekare']
+    Q1_fiyat_m2 = df['fiyat_metrekare'].quantile(0.01)
+    Q3_fiyat_m2 = df['fiyat_metrekare'].quantile(0.99)
+    IQR_fiyat_m2 = Q3_fiyat_m2 - Q1_fiyat_m2
+    lower_bound_m2 = Q1_fiyat_m2 - 1.5 * IQR_fiyat_m2
+    upper_bound_m2 = Q3_fiyat_m2 + 1.5 * IQR_fiyat_m2
+    df = df[(df['fiyat_metrekare'] >= lower_bound_m2) & (df['fiyat_metrekare'] <= upper_bound_m2)]
+    
+    # İlçe bazında minimum örnek sayısı kontrolü
+    ilce_counts = df['ilce'].value_counts()
+    valid_ilceler = ilce_counts[ilce_counts >= 10].index  # En az 10 örneği olan ilçeleri al
+    df = df[df['ilce'].isin(valid_ilceler)]
+    
+    # Mahalle bazında minimum örnek sayısı kontrolü
+    mahalle_counts = df['mahalle'].value_counts()
+    valid_mahalleler = mahalle_counts[mahalle_counts >= 5].index  # En az 5 örneği olan mahalleleri al
+    df = df[df['mahalle'].isin(valid_mahalleler)]
+    
+    return df
+
+def load_and_preprocess_data(use_cache=True):
+    """Veri setini yükle ve ön işle - İyileştirilmiş veri temizleme
+    
+    Temizlenmiş veri cache/ altında sütunsal bir dosyaya yazılır; Excel dosyası değişmediği
+    sürece sonraki çağrılar Excel okuma ve temizleme adımlarını atlar.
+    """
     try:
-        # Excel dosyasını pandas ile oku
-        df = pd.read_excel('istanbul_konut2.xlsx')
+        if use_cache:
+            df = load_cached_dataset(DATA_FILE)
+            if df is not None:
+                print(f"Temizlenmiş veri önbellekten yüklendi: {df.shape[0]} kayıt")
+                return df
         
-        # Sütun isimlerini Türkçe karakterler ve boşluklar olmadan düzenle (consistency için)
-        df.columns = ['fiyat', 'ilce', 'mahalle', 'metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat']
+        # Excel dosyasını pandas ile oku
+        df = pd.read_excel(DATA_FILE)
         
-        # Kaç tane kayıt yüklendiğini ekrana yazdır
+        # Sütun isimleri, eksik değerler, yazım birliği ve makul aralık filtreleri
         print(f"İlk yükleme: {df.shape[0]} kayıt")
-        
-        # Eksik (NaN) verileri temizle - pandas dropna() ile
-        df = df.dropna()  # Eksik verileri kaldır
-        
-        # Fiyat sütununu sayısal veriye dönüştür, hata varsa NaN yap
-        df['fiyat'] = pd.to_numeric(df['fiyat'], errors='coerce')
-        # Fiyatı eksik/hatalı olan kayıtları sil
-        df = df.dropna(subset=['fiyat'])  # Fiyatı eksik olan kayıtları çıkar
-        
-        # İlçe ve mahalle değerlerini standartlaştır ve tutarlı hale getir
-        df['ilce'] = df['ilce'].str.strip().str.title()      # Başına-sonuna boşluk sil, ilk harfi büyüt
-        df['mahalle'] = df['mahalle'].str.strip().str.title()  # Aynı işlemi mahalle için de yap
-        
-        # Aynı anlama gelebilecek farklı yazımları birleştir (örnek: Üsküdar = Uskudar)
-        ilce_mapping = {
-            'Üsküdar': 'Üsküdar',   # Standart yazım
-            'Uskudar': 'Üsküdar',   # Türkçesiz yazımı standarda çevir
-            'Beşiktaş': 'Beşiktaş', # Standart yazım
-            'Besiktas': 'Beşiktaş', # Türkçesiz yazımı standarda çevir
-            'Şişli': 'Şişli',       # Standart yazım
-            'Sisli': 'Şişli'        # Türkçesiz yazımı standarda çevir
-        }
-        df['ilce'] = df['ilce'].replace(ilce_mapping)  # Mapping'i uygula
-        
-        # Sayısal değerlerin makul aralıklarda olduğundan emin ol (aykırı değerleri temizle)
-        df = df[(df['metrekare'] >= 30) & (df['metrekare'] <= 400)]      # 30-400 m² arası makul
-        df = df[(df['oda_sayisi'] >= 1) & (df['oda_sayisi'] <= 8)]       # 1-8 oda arası makul
-        df = df[(df['yas'] >= 0) & (df['yas'] <= 80)]                    # 0-80 yaş arası makul
-        df = df[(df['bulundugu_kat'] >= -2) & (df['bulundugu_kat'] <= 40)]  # -2 ile 40. kat arası makul
-        
-        # Fiyat üzerinde daha agresif aykırı değer temizleme
-        df = df[(df['fiyat'] >= 100000) & (df['fiyat'] <= 50000000)]  # 100bin-50milyon TL arası makul
+        df = clean_raw_listings(df)
         
         # Gelişmiş aykırı değer temizleme - Çok aşamalı temizleme sistemi
         print(f"Temel temizleme sonrası: {df.shape[0]} kayıt")
+        df = filter_listings(df)
         
-        # 1. Aşama: Z-score tabanlı aykırı değer temizleme (tüm veri için genel temizlik)
-        from scipy import stats  # İstatistiksel fonksiyonlar için
-        z_scores = np.abs(stats.zscore(df['fiyat']))  # Her fiyat için Z-score hesapla (ortalamadan kaç sigma uzak)
-        df = df[z_scores < 3]  # 3 sigma (standart sapma) dışındaki değerleri aykırı say ve çıkar
-        print(f"Z-score temizleme sonrası: {df.shape[0]} kayıt")
-        
-        # 2. Aşama: İlçe bazında daha agresif aykırı değer tespiti (her ilçeyi kendi içinde temizle)
-        cleaned_dfs = []  # Temizlenmiş ilçe verilerini tutacak liste
-        for ilce in df['ilce'].unique():  # Her ilçe için döngü
-            ilce_df = df[df['ilce'] == ilce].copy()  # Bu ilçenin tüm verilerini al
-            
-            if len(ilce_df) < 10:  # Çok az örneği olan ilçeleri atla (güvenilir istatistik için)
-                continue
-                
-            # İlçe bazında fiyat aykırı değerleri - IQR yöntemiyle agresif temizlik
-            Q1_fiyat = ilce_df['fiyat'].quantile(0.1)   # Alt %10 (1. çeyrek yerine daha agresif)
-            Q3_fiyat = ilce_df['fiyat'].quantile(0.9)   # Üst %10 (3. çeyrek yerine daha agresif)
-            IQR_fiyat = Q3_fiyat - Q1_fiyat  # Interquartile Range (çeyrekler arası fark)
-            lower_bound_fiyat = Q1_fiyat - 1.0 * IQR_fiyat  # Alt sınır (daha sıkı: 1.0 çarpan)
-            upper_bound_fiyat = Q3_fiyat + 1.0 * IQR_fiyat  # Üst sınır (daha sıkı: 1.0 çarpan)
-            # Bu sınırlar dışındaki fiyatları çıkar
-            ilce_df = ilce_df[(ilce_df['fiyat'] >= lower_bound_fiyat) & (ilce_df['fiyat'] <= upper_bound_fiyat)]
-            
-            # Metrekare bazında da temizleme (her ilçe için ayrı ayrı)
-            Q1_m2 = ilce_df['metrekare'].quantile(0.05)  # Alt %5
-            Q3_m2 = ilce_df['metrekare'].quantile(0.95)  # Üst %5
-            IQR_m2 = Q3_m2 - Q1_m2  # Metrekare için IQR
-            lower_bound_m2 = Q1_m2 - 1.5 * IQR_m2  # Alt sınır
-            upper_bound_m2 = Q3_m2 + 1.5 * IQR_m2  # Üst sınır
-            # Bu sınırlar dışındaki metrekareleri çıkar
-            ilce_df = ilce_df[(ilce_df['metrekare'] >= lower_bound_m2) & (ilce_df['metrekare'] <= upper_bound_m2)]
-            
-            cleaned_dfs.append(ilce_df)  # Temizlenmiş ilçe verisini listeye ekle
-        
-        df = pd.concat(cleaned_dfs, ignore_index=True)
-        print(f"İlçe bazında temizleme sonrası: {df.shape[0]} kayıt")
-        
-        # Metrekare başına düşen fiyat hesapla ve aykırı değerleri temizle
-        df['fiyat_metrekare'] = df['fiyat'] / df['metrekare']
-        Q1_fiyat_m2 = df['fiyat_metrekare'].quantile(0.01)
-        Q3_fiyat_m2 = df['fiyat_metrekare'].quantile(0.99)
-        IQR_fiyat_m2 = Q3_fiyat_m2 - Q1_fiyat_m2
-        lower_bound_m2 = Q1_fiyat_m2 - 1.5 * IQR_fiyat_m2
-        upper_bound_m2 = Q3_fiyat_m2 + 1.5 * IQR_fiyat_m2
-        df = df[(df['fiyat_metrekare'] >= lower_bound_m2) & (df['fiyat_metrekare'] <= upper_bound_m2)]
-        
-        # İlçe bazında minimum örnek sayısı kontrolü
-        ilce_counts = df['ilce'].value_counts()
-        valid_ilceler = ilce_counts[ilce_counts >= 10].index  # En az 10 örneği olan ilçeleri al
-        df = df[df['ilce'].isin(valid_ilceler)]
-        
-        # Mahalle bazında minimum örnek sayısı kontrolü
-        mahalle_counts = df['mahalle'].value_counts()
-        valid_mahalleler = mahalle_counts[mahalle_counts >= 5].index  # En az 5 örneği olan mahalleleri al
-        df = df[df['mahalle'].isin(valid_mahalleler)]
-        
-        # İlçe ve mahalle bazında fiyat istatistikleri
-        ilce_stats = df.groupby('ilce')['fiyat'].agg(['mean', 'median', 'std']).reset_index()
-        mahalle_stats = df.groupby('mahalle')['fiyat'].agg(['mean', 'median', 'std']).reset_index()
-        
-        # İlçe ve mahalle bazında fiyat istatistikleri ile encoding
-        df = df.merge(ilce_stats, on='ilce', how='left', suffixes=('', '_ilce'))
-        df = df.merge(mahalle_stats, on='mahalle', how='left', suffixes=('', '_mahalle'))
-        
-        # Logaritmik dönüşüm (fiyat dağılımını normalleştirmek için)
-        df['fiyat_log'] = np.log1p(df['fiyat'])
-        
-        # İlçe ve mahalle frekans kodlaması
-        ilce_freq = df['ilce'].value_counts(normalize=True).to_dict()
-        mahalle_freq = df['mahalle'].value_counts(normalize=True).to_dict()
-        df['ilce_freq'] = df['ilce'].map(ilce_freq)
-        df['mahalle_freq'] = df['mahalle'].map(mahalle_freq)
+        # İlçe/mahalle fiyat istatistikleri, log fiyat ve frekans kodlaması
+        df = add_group_statistics(df)
         
         print(f"Veri temizleme sonrası kalan örnek sayısı: {df.shape[0]}")
         
+        if use_cache:
+            try:
+                save_cached_dataset(df, DATA_FILE)
+            except OSError as e:
+                print(f"Veri önbelleği yazılamadı: {e}")
+        
         return df
     except Exception as e:
         print(f"Veri yükleme hatası: {e}")
         return None
 
-def create_advanced_features(df):
-    """Özellik mühendisliği: Polynomial ve complex interactions"""
-    # Ham veriden sayısal özellikleri seç (makine öğrenmesi için gerekli)
-    numerical_cols = ['metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat', 
-                     'mean', 'median', 'std', 'mean_mahalle', 'median_mahalle', 'std_mahalle',
-                     'ilce_freq', 'mahalle_freq']  # İlçe ve mahalle istatistikleri de dahil
-    X_numerical = df[numerical_cols].copy()  # Bu sütunları kopyala
-    
-    # Kaç özellikle başladığımızı kaydet
-    print(f"Feature engineering öncesi: {X_numerical.shape[1]} özellik")
-    
+# Ham sayısal girdiler (ilçe ve mahalle istatistikleri de dahil)
+BASE_NUMERICAL_COLUMNS = ['metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat',
+                          'mean', 'median', 'std', 'mean_mahalle', 'median_mahalle', 'std_mahalle',
+                          'ilce_freq', 'mahalle_freq']
+
+def _kat_avantaj_skoru(c):
+    """Kat avantaj skoru"""
+    kat = c['bulundugu_kat']
+    return np.where(
+        kat < 0, -0.1,  # Bodrum katlar
+        np.where(kat == 0, 0,  # Zemin kat
+        np.where(kat <= 3, 0.1,  # Düşük katlar
+        np.where(kat <= 7, 0.15,  # Orta katlar
+        np.where(kat <= 15, 0.05,  # Yüksek katlar
+        -0.05))))  # Çok yüksek katlar
+    )
+
+# Türetilmiş özelliklerin bildirimsel tanımı: (isim, hesaplama). Sıra özellik sırasını belirler;
+# her hesaplama kendisinden önce tanımlanan sütunları kullanabilir.
+DERIVED_FEATURE_SPEC = [
     # Temel istatistiksel özellikler
-    X_numerical.loc[:, 'fiyat_volatilite'] = X_numerical['std'] / (X_numerical['mean'] + 1)  # Volatilite
-    X_numerical.loc[:, 'mahalle_volatilite'] = X_numerical['std_mahalle'] / (X_numerical['mean_mahalle'] + 1)
-    X_numerical.loc[:, 'mahalle_premium'] = X_numerical['mean_mahalle'] / (X_numerical['mean'] + 1)  # Mahalle primı
+    ('fiyat_volatilite', lambda c: c['std'] / (c['mean'] + 1)),  # Volatilite
+    ('mahalle_volatilite', lambda c: c['std_mahalle'] / (c['mean_mahalle'] + 1)),
+    ('mahalle_premium', lambda c: c['mean_mahalle'] / (c['mean'] + 1)),  # Mahalle primı
     
     # Pazarlık indeksi - fiyat dağılımına dayalı
-    X_numerical.loc[:, 'pazarlik_indeksi'] = (X_numerical['mean'] - X_numerical['median']) / (X_numerical['std'] + 1)
-    X_numerical.loc[:, 'mahalle_pazarlik_indeksi'] = (X_numerical['mean_mahalle'] - X_numerical['median_mahalle']) / (X_numerical['std_mahalle'] + 1)
+    ('pazarlik_indeksi', lambda c: (c['mean'] - c['median']) / (c['std'] + 1)),
+    ('mahalle_pazarlik_indeksi', lambda c: (c['mean_mahalle'] - c['median_mahalle']) / (c['std_mahalle'] + 1)),
     
     # Bölgesel lüks indeksi
-    X_numerical.loc[:, 'bolgsel_luksus_skoru'] = X_numerical['mean'] * X_numerical['ilce_freq']
-    X_numerical.loc[:, 'mahalle_luksus_skoru'] = X_numerical['mean_mahalle'] * X_numerical['mahalle_freq']
+    ('bolgsel_luksus_skoru', lambda c: c['mean'] * c['ilce_freq']),
+    ('mahalle_luksus_skoru', lambda c: c['mean_mahalle'] * c['mahalle_freq']),
     
     # Temel transformasyonlar - İyileştirilmiş
-    X_numerical.loc[:, 'metrekare_oda_orani'] = X_numerical['metrekare'] / (X_numerical['oda_sayisi'] + 0.1)
-    X_numerical.loc[:, 'metrekare_kare'] = X_numerical['metrekare'] ** 2
-    X_numerical.loc[:, 'metrekare_log'] = np.log1p(X_numerical['metrekare'])
-    X_numerical.loc[:, 'metrekare_sqrt'] = np.sqrt(X_numerical['metrekare'])
-    X_numerical.loc[:, 'metrekare_kup'] = X_numerical['metrekare'] ** 3
+    ('metrekare_oda_orani', lambda c: c['metrekare'] / (c['oda_sayisi'] + 0.1)),
+    ('metrekare_kare', lambda c: c['metrekare'] ** 2),
+    ('metrekare_log', lambda c: np.log1p(c['metrekare'])),
+    ('metrekare_sqrt', lambda c: np.sqrt(c['metrekare'])),
+    ('metrekare_kup', lambda c: c['metrekare'] ** 3),
     
     # Gelişmiş metrekare kombinasyonları
-    X_numerical.loc[:, 'metrekare_oda_kare'] = X_numerical['metrekare_oda_orani'] ** 2
-    X_numerical.loc[:, 'metrekare_oda_log'] = np.log1p(X_numerical['metrekare_oda_orani'])
-    X_numerical.loc[:, 'ideal_metrekare_sapma'] = np.abs(X_numerical['metrekare'] - (X_numerical['oda_sayisi'] * 25))  # İdeal alan sapması
+    ('metrekare_oda_kare', lambda c: c['metrekare_oda_orani'] ** 2),
+    ('metrekare_oda_log', lambda c: np.log1p(c['metrekare_oda_orani'])),
+    ('ideal_metrekare_sapma', lambda c: np.abs(c['metrekare'] - (c['oda_sayisi'] * 25))),  # İdeal alan sapması
     
     # Yaş transformasyonları - daha sofistike
-    X_numerical.loc[:, 'yas_kare'] = X_numerical['yas'] ** 2
-    X_numerical.loc[:, 'yas_log'] = np.log1p(X_numerical['yas'] + 1)
-    X_numerical.loc[:, 'yas_sqrt'] = np.sqrt(X_numerical['yas'] + 1)
-    X_numerical.loc[:, 'yas_tersi'] = 1 / (X_numerical['yas'] + 1)  # Yeni bina değeri
-    X_numerical.loc[:, 'yas_exp'] = np.exp(-X_numerical['yas'] / 20)  # Yenilik değeri (exponential decay)
+    ('yas_kare', lambda c: c['yas'] ** 2),
+    ('yas_log', lambda c: np.log1p(c['yas'] + 1)),
+    ('yas_sqrt', lambda c: np.sqrt(c['yas'] + 1)),
+    ('yas_tersi', lambda c: 1 / (c['yas'] + 1)),  # Yeni bina değeri
+    ('yas_exp', lambda c: np.exp(-c['yas'] / 20)),  # Yenilik değeri (exponential decay)
     
     # Yaş kategorileri ve değer kaybı modeli
-    X_numerical.loc[:, 'yeni_bina'] = (X_numerical['yas'] <= 5).astype(int)
-    X_numerical.loc[:, 'orta_yas_bina'] = ((X_numerical['yas'] > 5) & (X_numerical['yas'] <= 15)).astype(int)
-    X_numerical.loc[:, 'eski_bina'] = (X_numerical['yas'] > 15).astype(int)
-    X_numerical.loc[:, 'deger_kaybi_orani'] = np.maximum(0, 1 - (X_numerical['yas'] / 50))  # Değer kaybı oranı
+    ('yeni_bina', lambda c: c['yas'] <= 5),
+    ('orta_yas_bina', lambda c: (c['yas'] > 5) & (c['yas'] <= 15)),
+    ('eski_bina', lambda c: c['yas'] > 15),
+    ('deger_kaybi_orani', lambda c: np.maximum(0, 1 - (c['yas'] / 50))),  # Değer kaybı oranı
     
     # Metrekare eficiencysi - gelişmiş
-    X_numerical.loc[:, 'alan_verimliligi_v2'] = X_numerical['metrekare'] / (X_numerical['oda_sayisi'] ** 1.2)
-    X_numerical.loc[:, 'oda_buyuklugu_avg'] = X_numerical['metrekare'] / (X_numerical['oda_sayisi'] + 0.5)  # Ortalama oda büyüklüğü
+    ('alan_verimliligi_v2', lambda c: c['metrekare'] / (c['oda_sayisi'] ** 1.2)),
+    ('oda_buyuklugu_avg', lambda c: c['metrekare'] / (c['oda_sayisi'] + 0.5)),  # Ortalama oda büyüklüğü
     
     # Oda büyüklüğü kategorileri
-    X_numerical.loc[:, 'genis_odalar'] = (X_numerical['oda_buyuklugu_avg'] > 20).astype(int)
-    X_numerical.loc[:, 'orta_odalar'] = ((X_numerical['oda_buyuklugu_avg'] >= 15) & (X_numerical['oda_buyuklugu_avg'] <= 20)).astype(int)
-    X_numerical.loc[:, 'dar_odalar'] = (X_numerical['oda_buyuklugu_avg'] < 15).astype(int)
+    ('genis_odalar', lambda c: c['oda_buyuklugu_avg'] > 20),
+    ('orta_odalar', lambda c: (c['oda_buyuklugu_avg'] >= 15) & (c['oda_buyuklugu_avg'] <= 20)),
+    ('dar_odalar', lambda c: c['oda_buyuklugu_avg'] < 15),
     
     # Kat transformasyonları
-    X_numerical.loc[:, 'kat_zemin'] = (X_numerical['bulundugu_kat'] == 0).astype(int)
-    X_numerical.loc[:, 'kat_yuksek'] = (X_numerical['bulundugu_kat'] > 5).astype(int)
-    X_numerical.loc[:, 'kat_bodrum'] = (X_numerical['bulundugu_kat'] < 0).astype(int)
-    X_numerical.loc[:, 'kat_1_3'] = ((X_numerical['bulundugu_kat'] >= 1) & (X_numerical['bulundugu_kat'] <= 3)).astype(int)
-    X_numerical.loc[:, 'kat_4_7'] = ((X_numerical['bulundugu_kat'] >= 4) & (X_numerical['bulundugu_kat'] <= 7)).astype(int)
-    X_numerical.loc[:, 'kat_8_plus'] = (X_numerical['bulundugu_kat'] >= 8).astype(int)
-    X_numerical.loc[:, 'kat_log'] = np.log1p(X_numerical['bulundugu_kat'] + 3)
-    X_numerical.loc[:, 'kat_kare'] = (X_numerical['bulundugu_kat'] + 3) ** 2
-    
-    # Kat avantaj skoru
-    X_numerical.loc[:, 'kat_avantaj_skoru'] = np.where(
-        X_numerical['bulundugu_kat'] < 0, -0.1,  # Bodrum katlar
-        np.where(X_numerical['bulundugu_kat'] == 0, 0,  # Zemin kat
-        np.where(X_numerical['bulundugu_kat'] <= 3, 0.1,  # Düşük katlar
-        np.where(X_numerical['bulundugu_kat'] <= 7, 0.15,  # Orta katlar
-        np.where(X_numerical['bulundugu_kat'] <= 15, 0.05,  # Yüksek katlar
-        -0.05))))  # Çok yüksek katlar
-    )
+    ('kat_zemin', lambda c: c['bulundugu_kat'] == 0),
+    ('kat_yuksek', lambda c: c['bulundugu_kat'] > 5),
+    ('kat_bodrum', lambda c: c['bulundugu_kat'] < 0),
+    ('kat_1_3', lambda c: (c['bulundugu_kat'] >= 1) & (c['bulundugu_kat'] <= 3)),
+    ('kat_4_7', lambda c: (c['bulundugu_kat'] >= 4) & (c['bulundugu_kat'] <= 7)),
+    ('kat_8_plus', lambda c: c['bulundugu_kat'] >= 8),
+    ('kat_log', lambda c: np.log1p(c['bulundugu_kat'] + 3)),
+    ('kat_kare', lambda c: (c['bulundugu_kat'] + 3) ** 2),
+    ('kat_avantaj_skoru', _kat_avantaj_skoru),
     
     # Kompleks etkileşimler
-    X_numerical.loc[:, 'yas_metrekare_etkilesim'] = X_numerical['yas_tersi'] * X_numerical['metrekare_log']
-    X_numerical.loc[:, 'kat_alan_etkilesim'] = X_numerical['kat_avantaj_skoru'] * X_numerical['metrekare_oda_orani']
-    X_numerical.loc[:, 'premium_lokasyon_skoru'] = X_numerical['bolgsel_luksus_skoru'] * X_numerical['yas_exp']
+    ('yas_metrekare_etkilesim', lambda c: c['yas_tersi'] * c['metrekare_log']),
+    ('kat_alan_etkilesim', lambda c: c['kat_avantaj_skoru'] * c['metrekare_oda_orani']),
+    ('premium_lokasyon_skoru', lambda c: c['bolgsel_luksus_skoru'] * c['yas_exp']),
     
     # Pazar dinamikleri
-    X_numerical.loc[:, 'arz_talep_dengesi'] = X_numerical['ilce_freq'] / (X_numerical['mahalle_freq'] + 0.001)
-    X_numerical.loc[:, 'fiyat_istikrar_indeksi'] = 1 / (X_numerical['fiyat_volatilite'] + 0.1)
+    ('arz_talep_dengesi', lambda c: c['ilce_freq'] / (c['mahalle_freq'] + 0.001)),
+    ('fiyat_istikrar_indeksi', lambda c: 1 / (c['fiyat_volatilite'] + 0.1)),
     
     # Gelişmiş istatistiksel özellikler
-    X_numerical.loc[:, 'z_score_mahalle'] = (X_numerical['mean_mahalle'] - X_numerical['mean']) / (X_numerical['std'] + 1)
-    X_numerical.loc[:, 'mahalle_median_orani'] = X_numerical['median_mahalle'] / (X_numerical['median'] + 1)
+    ('z_score_mahalle', lambda c: (c['mean_mahalle'] - c['mean']) / (c['std'] + 1)),
+    ('mahalle_median_orani', lambda c: c['median_mahalle'] / (c['median'] + 1)),
+    
+    # Polynomial özellikler (sadece etkileşim terimleri)
+    ('metrekare_oda_sayisi', lambda c: c['metrekare'] * c['oda_sayisi']),
+    ('metrekare_yas_tersi', lambda c: c['metrekare'] * c['yas_tersi']),
+    ('metrekare_kat_avantaj_skoru', lambda c: c['metrekare'] * c['kat_avantaj_skoru']),
+    ('oda_sayisi_yas_tersi', lambda c: c['oda_sayisi'] * c['yas_tersi']),
+    ('oda_sayisi_kat_avantaj_skoru', lambda c: c['oda_sayisi'] * c['kat_avantaj_skoru']),
+    ('yas_tersi_kat_avantaj_skoru', lambda c: c['yas_tersi'] * c['kat_avantaj_skoru']),
+]
+
+NUMERICAL_FEATURE_NAMES = BASE_NUMERICAL_COLUMNS + [name for name, _ in DERIVED_FEATURE_SPEC]
+
+# Target encoding sütunları (ilçe ve mahalle için 9'ar istatistik)
+TARGET_STAT_NAMES = ['mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75', 'smoothed']
+TARGET_ENCODING_COLUMNS = [f'{col}_target_{name}' for col in ['ilce', 'mahalle'] for name in TARGET_STAT_NAMES]
+
+def onehot_feature_names(df, categorical_cols=('ilce', 'mahalle')):
+    """pd.get_dummies(drop_first=True) ile aynı one-hot sütun isimleri (sıralı, ilk kategori atılır)"""
+    names = []
+    for col in categorical_cols:
+        names.extend(f'{col}_{value}' for value in sorted(df[col].unique())[1:])
+    return names
+
+def lookup_codes(values, index, missing):
+    """Kategori değerlerini sözlükten satır/sütun indekslerine çevir (her benzersiz değer için bir arama)"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    unique_codes = np.array([index.get(value, missing) for value in uniques], dtype=np.intp)
+    return unique_codes[codes]
+
+class FeaturePlan:
+    """feature_names sırasına sabitlenmiş, derlenmiş özellik üretim planı
+    
+    Eğitim, predict_price ve get_price_range_performance aynı planı kullanır; tüm türetilmiş
+    sütunlar önceden ayrılmış tek bir NumPy matrisine tek geçişte yazılır.
+    """
     
-    # Polynomial özellikler
-    important_features = ['metrekare', 'oda_sayisi', 'yas_tersi', 'kat_avantaj_skoru']
-    poly = PolynomialFeatures(degree=2, interaction_only=True, include_bias=False)
-    poly_features = poly.fit_transform(X_numerical[important_features])
-    poly_feature_names = poly.get_feature_names_out(important_features)
+    def __init__(self, feature_names, dtype=np.float64):
+        self.feature_names = list(feature_names)
+        self.dtype = dtype
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        
+        # Sayısal özelliklerin ara matristeki konumu -> nihai matristeki konumu
+        self.numerical_index = {name: j for j, name in enumerate(NUMERICAL_FEATURE_NAMES)}
+        numerical_pairs = [(j, self.feature_index[name]) for j, name in enumerate(NUMERICAL_FEATURE_NAMES)
+                           if name in self.feature_index]
+        self.numerical_src = np.array([j for j, _ in numerical_pairs], dtype=np.intp)
+        self.numerical_dst = np.array([i for _, i in numerical_pairs], dtype=np.intp)
+        
+        self.target_columns = [name for name in TARGET_ENCODING_COLUMNS if name in self.feature_index]
+        self.target_dst = np.array([self.feature_index[name] for name in self.target_columns], dtype=np.intp)
+        
+        # Yoğun blok (sayısal + target encoding) başta, one-hot blok sonda yer alır
+        self.n_dense = len(self.numerical_dst) + len(self.target_dst)
+        dense_positions = np.sort(np.concatenate([self.numerical_dst, self.target_dst]))
+        if not np.array_equal(dense_positions, np.arange(self.n_dense)):
+            raise ValueError("Özellik sırası yoğun sütunlar önce gelecek şekilde olmalı")
+        self.n_onehot = len(self.feature_names) - self.n_dense
+        
+        # Eğitim verisinden dondurulan doldurma değerleri ve kırpma sınırları (fit ile ayarlanır)
+        self.fill_values = None
+        self.clip_lower = None
+        self.clip_upper = None
     
-    # Polynomial özellikleri ekle (sadece etkileşim terimleri)
-    for i, name in enumerate(poly_feature_names):
-        if ' ' in name:  # Sadece etkileşim terimlerini al
-            clean_name = name.replace(' ', '_').replace('^', '_pow')
-            X_numerical.loc[:, clean_name] = poly_features[:, i]
+    def fit(self, df):
+        """Eksik/sonsuz değerler için eğitim medyanlarını ve sayısal kırpma sınırlarını dondur"""
+        numerical = self._raw_numerical(df)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Tamamen boş sütunlar
+            self.fill_values = np.nan_to_num(np.nanmedian(numerical, axis=0))
+            self.clip_lower = np.nan_to_num(np.nanmin(numerical, axis=0), nan=-np.inf)
+            self.clip_upper = np.nan_to_num(np.nanmax(numerical, axis=0), nan=np.inf)
+        return self
     
-    # NaN ve inf değerleri temizle
-    X_numerical = X_numerical.replace([np.inf, -np.inf], np.nan)
-    X_numerical = X_numerical.fillna(X_numerical.median())
+    def _raw_numerical(self, df):
+        """Ham ve türetilmiş sayısal özellikleri hesapla (sonsuz değerler NaN olarak döner)"""
+        out = np.empty((len(df), len(NUMERICAL_FEATURE_NAMES)), dtype=np.float64)
+        index = self.numerical_index
+        
+        class _Columns:
+            # Daha önce hesaplanmış sütunlara matris görünümü olarak erişim
+            def __getitem__(_, name):
+                return out[:, index[name]]
+        columns = _Columns()
+        
+        for name in BASE_NUMERICAL_COLUMNS:
+            out[:, index[name]] = df[name].to_numpy(dtype=np.float64)
+        for name, compute in DERIVED_FEATURE_SPEC:
+            out[:, index[name]] = compute(columns)
+        
+        out[~np.isfinite(out)] = np.nan
+        return out
+    
+    def compute_numerical(self, df):
+        """Ham ve türetilmiş sayısal özellikleri (satır, NUMERICAL_FEATURE_NAMES) matrisine hesapla"""
+        out = self._raw_numerical(df)
+        
+        if self.fill_values is not None:
+            # Eğitimde dondurulan medyanlar ve sınırlar (tek satırlık tahminde de kararlı)
+            out = np.where(np.isnan(out), self.fill_values, out)
+            return np.clip(out, self.clip_lower, self.clip_upper, out=out)
+        
+        # Plan eğitilmemişse NaN değerleri o anki verinin sütun medyanı ile doldur
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Tamamen boş sütunlar NaN kalır
+            medians = np.nanmedian(out, axis=0)
+        return np.where(np.isnan(out), medians, out)
+    
+    def transform_dense(self, df):
+        """Yoğun blok: sayısal ve target encoding sütunları (satır, n_dense)"""
+        X = np.empty((len(df), self.n_dense), dtype=self.dtype)
+        numerical = self.compute_numerical(df)
+        X[:, self.numerical_dst] = numerical[:, self.numerical_src]
+        if self.target_columns:
+            X[:, self.target_dst] = df[self.target_columns].to_numpy(dtype=np.float64)
+        return X
+    
+    def transform_onehot(self, df):
+        """One-hot blok: satır başına en fazla iki sıfırdan farklı değer içeren CSR matrisi
+        
+        drop_first ile atılan ve eğitimde görülmemiş kategoriler haritada yoktur, 0 kalır.
+        """
+        rows, cols = [], []
+        for col in ['ilce', 'mahalle']:
+            codes = lookup_codes((col + '_' + df[col].astype(str)).values, self.feature_index, -1)
+            known = np.flatnonzero(codes >= 0)
+            rows.append(known)
+            cols.append(codes[known] - self.n_dense)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        return sparse.csr_matrix((np.ones(len(rows), dtype=self.dtype), (rows, cols)),
+                                 shape=(len(df), self.n_onehot))
+    
+    def transform(self, df):
+        """Girdi DataFrame'inden (istatistikler eklenmiş) tam yoğun özellik matrisini üret"""
+        return np.hstack([self.transform_dense(df), self.transform_onehot(df).toarray()])
+    
+    def model_input(self, df, scaler):
+        """Modele verilecek ölçeklenmiş girdi: yoğun blok ölçeklenir, one-hot blok seyrek kalır
+        
+        Tüm sütunlar üzerinde eğitilmiş eski scaler'lar için tam yoğun matris ölçeklenir.
+        """
+        if getattr(scaler, 'n_features_in_', self.n_dense) != self.n_dense:
+            return scaler.transform(self.transform(df))
+        dense = scaler.transform(self.transform_dense(df))
+        if self.n_onehot == 0:
+            return dense
+        return sparse.hstack([sparse.csr_matrix(dense), self.transform_onehot(df)], format='csr')
+
+def load_feature_plan(model_dir, feature_names):
+    """Kaydedilmiş özellik planını yükle; eski model klasörlerinde istatistiksiz plan oluştur"""
+    plan_path = os.path.join(model_dir, 'feature_plan.pkl')
+    if os.path.exists(plan_path):
+        plan = joblib.load(plan_path)
+        if plan.feature_names != list(feature_names):
+            raise ValueError("feature_plan.pkl ile feature_names.pkl uyuşmuyor")
+        return plan
+    return FeaturePlan(feature_names)
+
+def create_advanced_features(df):
+    """Özellik mühendisliği: Polynomial ve complex interactions"""
+    # Kaç özellikle başladığımızı kaydet
+    print(f"Feature engineering öncesi: {len(BASE_NUMERICAL_COLUMNS)} özellik")
+    
+    plan = FeaturePlan(NUMERICAL_FEATURE_NAMES)
+    X_numerical = pd.DataFrame(plan.compute_numerical(df), columns=NUMERICAL_FEATURE_NAMES, index=df.index)
     
     print(f"Feature engineering sonrası: {X_numerical.shape[1]} özellik")
     
@@ -261,102 +586,873 @@ def create_features(df):
     """Ana özellik oluşturma fonksiyonu - geriye uyumluluk için"""
     return create_advanced_features(df)
 
-def advanced_target_encode_categorical(df, categorical_cols, target_col, n_splits=5):
-    """Gelişmiş target encoding with multiple strategies and smoothing"""
-    df_encoded = df.copy()
+def group_target_stats(codes, y, n_groups):
+    """Tamsayı kategori kodları için hedef istatistikleri (sıralı dizi + bincount çekirdekleri)
+    
+    codes ve y kategori, sonra hedef değerine göre sıralı olmalıdır. Dönen matrisin sütunları
+    TARGET_STAT_NAMES sırasındadır (smoothed hariç); hiç örneği olmayan grupların sayısı 0'dır.
+    """
+    count = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    present = count > 0
+    total = np.bincount(codes, weights=y, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        # Örneklem std (ddof=1) merkezlenmiş ikinci geçişle; tek örnekli gruplarda NaN
+        sq_dev = np.bincount(codes, weights=(y - mean[codes]) ** 2, minlength=n_groups)
+        std = np.sqrt(sq_dev / (count - 1))
+    std[count < 2] = np.nan
+    
+    # Her grubun sıralı dizideki başlangıç konumu; çeyreklikler doğrusal interpolasyonla
+    start = np.concatenate([[0], np.cumsum(count)[:-1]]).astype(np.intp)
+    last = np.maximum(count - 1, 0)
+    
+    def quantile(q):
+        position = start + q * last
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, start + last.astype(np.intp))
+        fraction = position - lower
+        result = np.full(n_groups, np.nan)
+        result[present] = y[lower[present]] + (y[upper[present]] - y[lower[present]]) * fraction[present]
+        return result
+    
+    stats = np.full((n_groups, len(TARGET_STAT_NAMES) - 1), np.nan)
+    stats[:, 0] = mean
+    stats[:, 1] = quantile(0.5)
+    stats[:, 2] = std
+    stats[:, 3] = count
+    stats[present, 4] = y[start[present]]
+    stats[present, 5] = y[start[present] + last[present].astype(np.intp)]
+    stats[:, 6] = quantile(0.25)
+    stats[:, 7] = quantile(0.75)
+    return stats
+
+def advanced_target_encode_categorical(df, categorical_cols, target_col, n_splits=5, smoothing_factor=10):
+    """Gelişmiş target encoding with multiple strategies and smoothing
     
-    # StratifiedKFold target encoding için
+    Out-of-fold: her satırın istatistikleri kendi fold'u dışındaki satırlardan hesaplanır.
+    Kategoriler tamsayı kodlara çevrilir, satırlar bir kez (kod, hedef) sırasına dizilir ve
+    her fold için tüm istatistikler tek geçişte tek bir önceden ayrılmış matrise yazılır.
+    """
+    # StratifiedKFold target encoding için (ilçe bazında stratifikasyon)
     skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    ilce_labels = pd.factorize(df['ilce'], sort=True)[0]  # LabelEncoder ile aynı etiketler
+    folds = list(skf.split(np.zeros(len(df)), ilce_labels))
     
-    # İlçe bazında stratifikasyon için
-    ilce_labels = LabelEncoder().fit_transform(df['ilce'])
+    y = df[target_col].to_numpy(dtype=np.float64)
     
     # Global statistics
     global_mean = df[target_col].mean()
     global_median = df[target_col].median()
     global_std = df[target_col].std()
+    # Eğitim fold'unda görülmemiş kategoriler ve tek örnekli std için yedek değerler
+    fallback = np.array([global_mean, global_median, global_std, 1, global_mean, global_mean,
+                         global_mean, global_mean, global_mean])
     
-    for col in categorical_cols:
-        # Initialize columns
-        df_encoded[f'{col}_target_mean'] = 0.0
-        df_encoded[f'{col}_target_median'] = 0.0
-        df_encoded[f'{col}_target_std'] = 0.0
-        df_encoded[f'{col}_target_count'] = 0.0
-        df_encoded[f'{col}_target_min'] = 0.0
-        df_encoded[f'{col}_target_max'] = 0.0
-        df_encoded[f'{col}_target_q25'] = 0.0
-        df_encoded[f'{col}_target_q75'] = 0.0
-        df_encoded[f'{col}_target_smoothed'] = 0.0  # Bayesian smoothed mean
-        
-        for train_idx, val_idx in skf.split(df, ilce_labels):
-            train_data = df.iloc[train_idx]
-            val_data = df.iloc[val_idx]
-            
-            # Training data'dan genişletilmiş istatistikleri hesapla
-            target_stats = train_data.groupby(col)[target_col].agg([
-                'mean', 'median', 'std', 'count', 'min', 'max',
-                lambda x: x.quantile(0.25),  # Q1
-                lambda x: x.quantile(0.75)   # Q3
-            ]).reset_index()
-            
-            target_stats.columns = [col, 'mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75']
+    n_stats = len(TARGET_STAT_NAMES)
+    encoded = np.empty((len(df), n_stats * len(categorical_cols)), dtype=np.float64)
+    value_order = np.argsort(y, kind='stable')  # Hedef sırası tüm sütunlar için bir kez
+    
+    for c, col in enumerate(categorical_cols):
+        codes, uniques = pd.factorize(df[col])  # Eksik kategori -1 (görülmemiş gibi)
+        n_groups = len(uniques)
+        # Kategori, sonra hedef sırası: hedef sıralı dizide kodlara göre kararlı (küçük tamsayıda radix) sıralama
+        sorted_codes = codes[value_order]
+        order = value_order[sorted_codes >= 0]
+        sorted_codes = sorted_codes[sorted_codes >= 0].astype(np.min_scalar_type(n_groups))
+        order = order[np.argsort(sorted_codes, kind='stable')]
+        block = encoded[:, c * n_stats:(c + 1) * n_stats]
+        
+        for train_idx, val_idx in folds:
+            in_train = np.zeros(len(df), dtype=bool)
+            in_train[train_idx] = True
+            train_order = order[in_train[order]]  # Sıralama fold alt kümesinde korunur
+            stats = group_target_stats(codes[train_order], y[train_order], n_groups)
             
+            table = np.empty((n_groups + 1, n_stats))
+            table[:-1, :-1] = stats
             # Bayesian smoothing (regularization)
-            smoothing_factor = 10  # Regularization strength
-            target_stats['smoothed_mean'] = (
-                (target_stats['count'] * target_stats['mean'] + smoothing_factor * global_mean) / 
-                (target_stats['count'] + smoothing_factor)
-            )
+            table[:-1, -1] = (stats[:, 3] * stats[:, 0] + smoothing_factor * global_mean) / (stats[:, 3] + smoothing_factor)
+            table[:-1] = np.where(np.isnan(table[:-1]), fallback, table[:-1])
+            table[:-1][stats[:, 3] == 0] = fallback  # Bu fold'un eğitim kısmında hiç görülmemiş
+            table[-1] = fallback
             
-            # NaN handling
-            target_stats = target_stats.fillna({
-                'mean': global_mean,
-                'median': global_median,
-                'std': global_std,
-                'count': 1,
-                'min': global_mean,
-                'max': global_mean,
-                'q25': global_mean,
-                'q75': global_mean,
-                'smoothed_mean': global_mean
-            })
-            
-            # Validation data'ya uygula
-            val_merged = val_data[[col]].merge(target_stats, on=col, how='left')
-            
-            # Fill missing values with global statistics
-            val_merged = val_merged.fillna({
-                'mean': global_mean,
-                'median': global_median,
-                'std': global_std,
-                'count': 1,
-                'min': global_mean,
-                'max': global_mean,
-                'q25': global_mean,
-                'q75': global_mean,
-                'smoothed_mean': global_mean
-            })
-            
-            # Assign values
-            df_encoded.loc[val_idx, f'{col}_target_mean'] = val_merged['mean'].values
-            df_encoded.loc[val_idx, f'{col}_target_median'] = val_merged['median'].values
-            df_encoded.loc[val_idx, f'{col}_target_std'] = val_merged['std'].values
-            df_encoded.loc[val_idx, f'{col}_target_count'] = val_merged['count'].values
-            df_encoded.loc[val_idx, f'{col}_target_min'] = val_merged['min'].values
-            df_encoded.loc[val_idx, f'{col}_target_max'] = val_merged['max'].values
-            df_encoded.loc[val_idx, f'{col}_target_q25'] = val_merged['q25'].values
-            df_encoded.loc[val_idx, f'{col}_target_q75'] = val_merged['q75'].values
-            df_encoded.loc[val_idx, f'{col}_target_smoothed'] = val_merged['smoothed_mean'].values
+            val_codes = codes[val_idx]
+            block[val_idx] = table[np.where(val_codes >= 0, val_codes, n_groups)]
     
+    df_encoded = df.copy()
+    names = [f'{col}_target_{name}' for col in categorical_cols for name in TARGET_STAT_NAMES]
+    df_encoded[names] = encoded
     return df_encoded
 
 def target_encode_categorical(df, categorical_cols, target_col, n_splits=5):
     """Wrapper for backward compatibility"""
     return advanced_target_encode_categorical(df, categorical_cols, target_col, n_splits)
 
-def train_model(df):
-    """Gelişmiş model eğitimi - XGBoost, LightGBM ve Target Encoding ile ensemble yaklaşım"""
+def resolve_n_jobs(n_jobs=None):
+    """Paralel iş bütçesini belirle: parametre, KONUT_N_JOBS ortam değişkeni veya çekirdek sayısı"""
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None:
+        n_jobs = int(os.environ.get('KONUT_N_JOBS', 0)) or cpu_count
+    elif n_jobs < 0:
+        n_jobs = cpu_count + 1 + n_jobs  # joblib gibi: -1 tüm çekirdekler
+    return max(1, n_jobs)
+
+def with_n_jobs(model, n_jobs):
+    """Modelin eğitilmemiş bir kopyasını verilen iç iş parçacığı sayısı ile döndür"""
+    model = clone(model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=n_jobs)
+    return model
+
+def _fit_predict(model, X, y, fit_rows, eval_rows, X_test):
+    """Modeli X[fit_rows] ile eğit; doğrulama satırları (varsa) ve test seti için tahmin yap (paralel görev)"""
+    model.fit(X[fit_rows], y[fit_rows])
+    eval_pred = model.predict(X[eval_rows]) if eval_rows is not None else None
+    return model, eval_pred, model.predict(X_test)
+
+class FoldAverageModel:
+    """Çapraz doğrulamada eğitilmiş fold modellerinin ortalamasını alan model (yeniden eğitim yok)"""
+    
+    def __init__(self, estimators):
+        self.estimators_ = list(estimators)
+    
+    def predict(self, X):
+        return np.mean([estimator.predict(X) for estimator in self.estimators_], axis=0)
+    
+    @property
+    def feature_importances_(self):
+        return np.mean([estimator.feature_importances_ for estimator in self.estimators_], axis=0)
+
+class WeightedEnsemble:
+    """Önceden eğitilmiş modellerin ağırlıklı ortalaması (VotingRegressor karşılığı)"""
+    
+    def __init__(self, estimators, weights):
+        self.estimators = list(estimators)
+        self.named_estimators_ = dict(self.estimators)
+        self.weights = np.asarray(weights, dtype=np.float64)
+    
+    def _base_predictions(self, X):
+        return np.column_stack([estimator.predict(X) for _, estimator in self.estimators])
+    
+    def predict(self, X):
+        return self._base_predictions(X) @ (self.weights / self.weights.sum())
+
+class StackedEnsemble(WeightedEnsemble):
+    """Önceden eğitilmiş modeller + out-of-fold tahminlerle eğitilmiş meta model (StackingRegressor karşılığı)"""
+    
+    def __init__(self, estimators, final_estimator):
+        super().__init__(estimators, np.ones(len(estimators)))
+        self.final_estimator_ = final_estimator
+    
+    def predict(self, X):
+        return self.final_estimator_.predict(self._base_predictions(X))
+
+def dynamic_weighted_average(pred_matrix, weights, threshold):
+    """Satır bazlı dinamik ağırlıklandırma (vektörel)
+    
+    Modeller arası tahmin std'si eşiğin altındaysa performans ağırlıkları, değilse eşit
+    ağırlık kullanılır. pred_matrix: (satır, model).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    weighted = pred_matrix @ (weights / weights.sum())
+    equal = pred_matrix.mean(axis=1)
+    return np.where(pred_matrix.std(axis=1) < threshold, weighted, equal)
+
+class DynamicWeightedEnsemble(WeightedEnsemble):
+    """Tahmin bazlı dinamik ağırlıklı ensemble; belirsizlik eşiği eğitimde sabitlenir"""
+    
+    def __init__(self, estimators, weights, threshold):
+        super().__init__(estimators, weights)
+        self.threshold = float(threshold)
+    
+    def predict(self, X):
+        return dynamic_weighted_average(self._base_predictions(X), self.weights, self.threshold)
+
+# Derlenmiş ağaç motoru: düğüm başına (özellik, eşik, sol, sağ, eksik yönü, değer) düz dizileri
+# Giriş türleri: sklearn float32 + seyrekte yok=0, XGBoost float32 + seyrekte yok=eksik,
+# LightGBM ve HistGradientBoosting float64 + yok=0
+TREE_INPUT_SKLEARN = 'float32'
+TREE_INPUT_XGB = 'float32_missing'
+TREE_INPUT_LGB = 'float64'
+XGB_IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+LGB_IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile')
+# Tahmin motorları; derlenmiş motor küçük gruplarda hızlıdır, ~1000 satırdan sonra sklearn'ün C döngüsü öne geçer.
+# 'student' ensemble yerine damıtılmış küçük modeli kullanır
+INFERENCE_BACKENDS = ('compiled', 'sklearn', 'student')
+COMPILED_MAX_ROWS = 512
+
+def _tree_depth(left, right, root=0):
+    """Düz dizilerdeki ağacın derinliği (yapraklar kendini gösterir)"""
+    depth, level = 0, np.array([root])
+    while True:
+        internal = level[left[level] != level]
+        if len(internal) == 0:
+            return depth
+        level = np.concatenate([left[internal], right[internal]])
+        depth += 1
+
+def _sklearn_tree_arrays(tree):
+    """sklearn Tree nesnesini düz dizilere çevir (x <= eşik sola; NaN missing_go_to_left yönüne)"""
+    n_nodes = tree.node_count
+    nodes = np.arange(n_nodes)
+    leaf = tree.children_left == -1
+    default_left = getattr(tree, 'missing_go_to_left', np.ones(n_nodes, dtype=bool)).astype(bool)
+    return {
+        'feature': np.where(leaf, 0, tree.feature),
+        'threshold': np.where(leaf, 0.0, tree.threshold),
+        'left': np.where(leaf, nodes, tree.children_left),
+        'right': np.where(leaf, nodes, tree.children_right),
+        'default_left': default_left,
+        'value': tree.value[:, 0, 0].astype(np.float64)
+    }
+
+def _xgb_tree_arrays(tree):
+    """XGBoost JSON ağacını düz dizilere çevir
+    
+    XGBoost float32 değerde x < eşik ile sola gider; bu, x <= (eşikten küçük en yakın float32) ile aynıdır.
+    Yaprak değerleri split_conditions içindedir.
+    """
+    if any(tree['split_type']):
+        return None  # Kategorik bölünmeler desteklenmiyor
+    left = np.asarray(tree['left_children'], dtype=np.int64)
+    right = np.asarray(tree['right_children'], dtype=np.int64)
+    conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+    nodes = np.arange(len(left))
+    leaf = left == -1
+    threshold = np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64)
+    return {
+        'feature': np.where(leaf, 0, np.asarray(tree['split_indices'], dtype=np.int64)),
+        'threshold': np.where(leaf, 0.0, threshold),
+        'left': np.where(leaf, nodes, left),
+        'right': np.where(leaf, nodes, right),
+        'default_left': np.asarray(tree['default_left'], dtype=bool),
+        'value': np.where(leaf, conditions, 0).astype(np.float64)
+    }
+
+def _lgb_tree_arrays(structure):
+    """LightGBM dump_model ağacını düz dizilere çevir (x <= eşik sola)
+    
+    missing_type 'None' iken NaN 0 kabul edilir, bu yüzden eksik yönü 0 <= eşik olur.
+    """
+    arrays = {key: [] for key in ('feature', 'threshold', 'left', 'right', 'default_left', 'value')}
+    stack = [(structure, None, None)]
+    while stack:
+        node, parent, side = stack.pop()
+        index = len(arrays['value'])
+        if parent is not None:
+            arrays[side][parent] = index
+        if 'split_index' not in node:
+            for key, value in zip(arrays, (0, 0.0, index, index, True, node['leaf_value'])):
+                arrays[key].append(value)
+            continue
+        if node['decision_type'] != '<=' or node['missing_type'] not in ('None', 'NaN'):
+            return None  # Kategorik veya sıfırı eksik sayan bölünmeler desteklenmiyor
+        threshold = float(node['threshold'])
+        default_left = node['default_left'] if node['missing_type'] == 'NaN' else 0.0 <= threshold
+        for key, value in zip(arrays, (node['split_feature'], threshold, -1, -1, default_left, 0.0)):
+            arrays[key].append(value)
+        stack.append((node['right_child'], index, 'right'))
+        stack.append((node['left_child'], index, 'left'))
+    return {key: np.asarray(value) for key, value in arrays.items()}
+
+def _hist_tree_arrays(nodes):
+    """HistGradientBoosting düğüm dizisini düz dizilere çevir (x <= eşik sola; NaN missing_go_to_left yönüne)"""
+    if nodes['is_categorical'].any():
+        return None
+    index = np.arange(len(nodes))
+    leaf = nodes['is_leaf'].astype(bool)
+    return {
+        'feature': np.where(leaf, 0, nodes['feature_idx']),
+        'threshold': np.where(leaf, 0.0, nodes['num_threshold']),
+        'left': np.where(leaf, index, nodes['left']),
+        'right': np.where(leaf, index, nodes['right']),
+        'default_left': nodes['missing_go_to_left'].astype(bool),
+        'value': np.where(leaf, nodes['value'], 0.0)
+    }
+
+def _tree_members(estimator):
+    """Ağaç modelini derlenebilir üyelere ayır: (giriş türü, [ağaç dizileri, ağaç ağırlıkları, sabit, toplama türü])
+    
+    Desteklenmeyen modeller için None döner.
+    """
+    if isinstance(estimator, FoldAverageModel):
+        parts = [_tree_members(member) for member in estimator.estimators_]
+        if not parts or any(part is None for part in parts) or len({kind for kind, _ in parts}) != 1:
+            return None
+        return parts[0][0], [member for _, members in parts for member in members]
+    
+    if isinstance(estimator, (RandomForestRegressor, ExtraTreesRegressor)):
+        trees = [_sklearn_tree_arrays(tree.tree_) for tree in estimator.estimators_]
+        return TREE_INPUT_SKLEARN, [(trees, np.full(len(trees), 1.0 / len(trees)), 0.0, np.float64)]
+    
+    if isinstance(estimator, DecisionTreeRegressor):
+        return TREE_INPUT_SKLEARN, [([_sklearn_tree_arrays(estimator.tree_)], np.ones(1), 0.0, np.float64)]
+    
+    if isinstance(estimator, GradientBoostingRegressor):
+        if isinstance(estimator.init_, str) and estimator.init_ == 'zero':
+            bias = 0.0
+        elif isinstance(estimator.init_, DummyRegressor):
+            bias = float(np.ravel(estimator.init_.constant_)[0])
+        else:
+            return None
+        trees = [_sklearn_tree_arrays(tree.tree_) for tree in estimator.estimators_[:, 0]]
+        return TREE_INPUT_SKLEARN, [(trees, np.full(len(trees), estimator.learning_rate), bias, np.float64)]
+    
+    if isinstance(estimator, HistGradientBoostingRegressor):
+        # Yaprak değerleri öğrenme oranını içerir; girdi float64 olarak kullanılır
+        if estimator.loss not in ('squared_error', 'absolute_error', 'quantile'):
+            return None
+        trees = [_hist_tree_arrays(predictors[0].nodes) for predictors in estimator._predictors]
+        if any(tree is None for tree in trees):
+            return None
+        bias = float(np.ravel(estimator._baseline_prediction)[0])
+        return TREE_INPUT_LGB, [(trees, np.ones(len(trees)), bias, np.float64)]
+    
+    if XGB_AVAILABLE and isinstance(estimator, xgb.XGBRegressor):
+        booster = estimator.get_booster()
+        config = json.loads(booster.save_config())['learner']
+        model_json = json.loads(booster.save_raw('json'))['learner']['gradient_booster']
+        if (config['objective']['name'] not in XGB_IDENTITY_OBJECTIVES or model_json['name'] != 'gbtree'
+                or not np.isnan(estimator.missing)):
+            return None
+        trees = model_json['model']['trees']
+        best_iteration = booster.attr('best_iteration')
+        if best_iteration is not None:
+            trees = trees[:model_json['model']['iteration_indptr'][int(best_iteration) + 1]]
+        trees = [_xgb_tree_arrays(tree) for tree in trees]
+        if any(tree is None for tree in trees):
+            return None
+        bias = float(np.float32(config['learner_model_param']['base_score'].strip('[]')))
+        # XGBoost ağaç çıktılarını sırayla float32 olarak toplar
+        return TREE_INPUT_XGB, [(trees, np.ones(len(trees)), bias, np.float32)]
+    
+    if LGB_AVAILABLE and isinstance(estimator, lgb.LGBMRegressor):
+        best_iteration = estimator.best_iteration_ or -1
+        dump = estimator.booster_.dump_model(num_iteration=best_iteration)
+        if (dump['num_tree_per_iteration'] != 1 or dump['objective'].split()[0] not in LGB_IDENTITY_OBJECTIVES
+                or any(info.get('is_linear') for info in dump['tree_info'])):
+            return None
+        trees = [_lgb_tree_arrays(info['tree_structure']) for info in dump['tree_info']]
+        if any(tree is None for tree in trees):
+            return None
+        weight = 1.0 / len(trees) if dump['average_output'] else 1.0
+        return TREE_INPUT_LGB, [(trees, np.full(len(trees), weight), 0.0, np.float64)]
+    
+    return None
+
+class CompiledForest:
+    """Ağaç topluluğunun düz düğüm dizileri üzerinde vektörel NumPy tahmin motoru
+    
+    Tüm üyelerin tüm ağaçları tek dizide tutulur; bir satır grubu için her ağacın düğüm indeksi
+    (satır, ağaç) matrisinde derinlik boyunca birlikte ilerletilir. Üye çıktıları orijinal
+    modelle aynı sırayla toplanır (XGBoost için float32); çapraz doğrulama üyeleri
+    FoldAverageModel gibi ortalanır.
+    """
+    
+    # Tek seferde işlenen (satır x ağaç) eleman sayısı; ara diziler işlemci önbelleğinde kalır
+    block_elements = 1 << 16
+    
+    def __init__(self, input_kind, members, average_members):
+        self.input_kind = input_kind
+        self.average_members = average_members
+        trees = [tree for member_trees, _, _, _ in members for tree in member_trees]
+        sizes = np.array([len(tree['value']) for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        
+        def stacked(key, dtype, shift=False):
+            return np.concatenate([tree[key] + (offset if shift else 0)
+                                   for tree, offset in zip(trees, offsets)]).astype(dtype)
+        
+        self.feature = stacked('feature', np.intp)
+        self.threshold = stacked('threshold', np.float64)
+        # Düğüm i'nin çocukları children[2i] (sol) ve children[2i + 1] (sağ)
+        self.children = np.column_stack([stacked('left', np.intp, shift=True),
+                                         stacked('right', np.intp, shift=True)]).ravel()
+        self.default_left = stacked('default_left', bool)
+        self.value = stacked('value', np.float64)
+        self.roots = offsets.astype(np.intp)
+        self.max_depth = max(_tree_depth(tree['left'], tree['right']) for tree in trees)
+        
+        # Üye başına ağaç aralığı, ağırlıklar, sabit terim ve toplama türü
+        bounds = np.cumsum([0] + [len(member_trees) for member_trees, _, _, _ in members])
+        self.member_slices = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+        self.tree_weights = np.concatenate([weights for _, weights, _, _ in members]).astype(np.float64)
+        self.member_bias = [bias for _, _, bias, _ in members]
+        self.member_dtype = [np.dtype(dtype).name for _, _, _, dtype in members]
+        self.n_features_in_ = int(self.feature.max()) + 1 if len(self.feature) else 0
+    
+    @classmethod
+    def from_estimator(cls, estimator):
+        """Desteklenen ağaç modelinden derlenmiş motor oluştur (desteklenmiyorsa None)"""
+        parts = _tree_members(estimator)
+        if parts is None:
+            return None
+        input_kind, members = parts
+        return cls(input_kind, members, isinstance(estimator, FoldAverageModel))
+    
+    @property
+    def n_trees(self):
+        return len(self.roots)
+    
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.children, self.default_left,
+                                               self.value, self.roots, self.tree_weights))
+    
+    def _dense_input(self, X):
+        """Model girdisini orijinal kütüphanenin gördüğü yoğun diziye çevir"""
+        dtype = np.float64 if self.input_kind == TREE_INPUT_LGB else np.float32
+        if not sparse.issparse(X):
+            return np.ascontiguousarray(X, dtype=dtype)
+        X = X.tocsr()
+        if self.input_kind != TREE_INPUT_XGB:
+            return X.astype(dtype).toarray()
+        # XGBoost seyrek matriste saklanmayan hücreleri eksik değer sayar
+        dense = np.full(X.shape, np.nan, dtype=dtype)
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        dense[rows, X.indices] = X.data
+        return dense
+    
+    def _leaf_values(self, X):
+        """(satır, ağaç) yaprak değerleri: tüm ağaçlar derinlik boyunca birlikte ilerletilir"""
+        n_rows, n_cols = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_cols)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        check_missing = np.isnan(flat).any()
+        for _ in range(self.max_depth):
+            x = flat.take(row_offsets + self.feature.take(node))
+            go_right = x > self.threshold.take(node)
+            if check_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left.take(node), go_right)
+            node = self.children.take(2 * node + go_right)
+        return self.value.take(node)
+    
+    def _member_outputs(self, leaves):
+        outputs = []
+        for (start, stop), bias, dtype in zip(self.member_slices, self.member_bias, self.member_dtype):
+            if dtype == 'float32':
+                # float32 sıralı toplam: sabit terim + ağaç 1 + ağaç 2 + ... (cumsum sıralı toplar)
+                columns = np.hstack([np.full((len(leaves), 1), bias, dtype=np.float32),
+                                     leaves[:, start:stop].astype(np.float32)])
+                outputs.append(np.cumsum(columns, axis=1, dtype=np.float32)[:, -1])
+            else:
+                outputs.append(bias + leaves[:, start:stop] @ self.tree_weights[start:stop])
+        return outputs
+    
+    def predict(self, X):
+        X = self._dense_input(X)
+        block = max(1, self.block_elements // max(self.n_trees, 1))
+        outputs = []
+        for start in range(0, X.shape[0], block):
+            members = self._member_outputs(self._leaf_values(X[start:start + block]))
+            outputs.append(np.mean(members, axis=0) if self.average_members else members[0])
+        return np.concatenate(outputs) if outputs else np.empty(0)
+
+def compile_ensemble(model):
+    """Ensemble'daki ağaç modellerini derlenmiş motorlarla değiştiren kopya döndür
+    
+    Desteklenmeyen modeller (ör. meta model, doğrusal modeller) olduğu gibi kalır. Sonuç: (model, derlenen sayısı).
+    """
+    compiled = CompiledForest.from_estimator(model)
+    if compiled is not None:
+        return compiled, 1
+    
+    if isinstance(model, WeightedEnsemble):
+        pairs = [(name, CompiledForest.from_estimator(estimator) or estimator) for name, estimator in model.estimators]
+        result = copy.copy(model)
+        result.estimators = pairs
+        result.named_estimators_ = dict(pairs)
+        return result, sum(isinstance(estimator, CompiledForest) for _, estimator in pairs)
+    
+    if isinstance(model, (VotingRegressor, StackingRegressor)):
+        fitted = [CompiledForest.from_estimator(estimator) or estimator for estimator in model.estimators_]
+        result = copy.copy(model)
+        result.estimators_ = fitted
+        result.named_estimators_ = copy.copy(model.named_estimators_)
+        names = [name for name, estimator in model.estimators if estimator != 'drop']
+        for name, estimator in zip(names, fitted):
+            result.named_estimators_[name] = estimator
+        return result, sum(isinstance(estimator, CompiledForest) for estimator in fitted)
+    
+    return model, 0
+
+def compiled_prediction_error(model, compiled_model, X):
+    """Derlenmiş modelin orijinal tahminlerden en büyük göreli sapması"""
+    reference = np.asarray(model.predict(X), dtype=np.float64)
+    compiled = np.asarray(compiled_model.predict(X), dtype=np.float64)
+    return float(np.max(np.abs(compiled - reference) / np.maximum(np.abs(reference), 1.0)))
+
+def build_compiled_model(model, X_check, rtol=1e-6):
+    """Ensemble'ı derle ve örnek girdide doğrula; sapma rtol'u aşarsa veya ağaç modeli yoksa None döndür"""
+    compiled_model, n_compiled = compile_ensemble(model)
+    if n_compiled == 0:
+        print("Derlenebilir ağaç modeli bulunamadı, sklearn tahmin yolu kullanılacak")
+        return None
+    error = compiled_prediction_error(model, compiled_model, X_check)
+    if error > rtol:
+        print(f"⚠️ Derlenmiş model sapması {error:.2e} > {rtol:.0e}, sklearn tahmin yolu kullanılacak")
+        return None
+    print(f"Derlenmiş ağaç motoru: {n_compiled} model, en büyük göreli sapma {error:.2e}")
+    return compiled_model
+
+# Bootstrap replikaları için sabit kök tohum ve disk önbelleği
+BOOTSTRAP_SEED = 42
+BOOTSTRAP_CACHE_DIR = os.path.join('models', 'bootstrap_cache')
+
+def _array_fingerprint(*arrays):
+    """Dizilerin (yoğun veya seyrek) içeriğinden kısa bir özet üret"""
+    digest = hashlib.sha256()
+    for array in arrays:
+        if sparse.issparse(array):
+            array = array.tocsr()
+            parts = [np.asarray(array.shape), array.data, array.indices, array.indptr]
+        else:
+            parts = [np.asarray(np.shape(array)), np.ascontiguousarray(array)]
+        for part in parts:
+            digest.update(np.ascontiguousarray(part).tobytes())
+    return digest
+
+def _bootstrap_replicate(bootstrap_models, X, y, X_test, replicate, seed=BOOTSTRAP_SEED):
+    """Tek bootstrap replikası: bağımsız tohumlu RNG ile yarı boyutlu örnek, modellerin test tahminleri"""
+    # Her replikanın RNG'si (kök tohum, replika no) ile belirlenir; paralel sırasından bağımsızdır
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(replicate,)))
+    bootstrap_indices = rng.choice(X.shape[0], size=X.shape[0] // 2, replace=True)  # Yarı boyut
+    X_bootstrap = X[bootstrap_indices]
+    y_bootstrap = y[bootstrap_indices]
+    
+    bootstrap_preds = []
+    for name, model in bootstrap_models:
+        model.fit(X_bootstrap, y_bootstrap)
+        bootstrap_preds.append(model.predict(X_test))
+    return np.array(bootstrap_preds)
+
+def run_bootstrap(bootstrap_models, X, y, X_test, n_bootstrap=10, n_jobs=None, cache_dir=BOOTSTRAP_CACHE_DIR):
+    """Bootstrap replikalarını paralel süreçlerde çalıştır; sonuçları diske önbelleğe al
+    
+    Önbellek anahtarı eğitim/test verisi ve model parametrelerinden türetilir. Dönen liste
+    her replika için (model sayısı, test satırı) tahmin matrisidir.
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    digest = _array_fingerprint(X, y, X_test)
+    for name, model in bootstrap_models:
+        # Çekirdek sayısı sonucu değiştirmez, anahtara dahil edilmez
+        params = {key: value for key, value in model.get_params().items() if key != 'n_jobs'}
+        digest.update(f"{name}:{type(model).__name__}:{sorted(params.items())!r}".encode())
+    key = digest.hexdigest()[:16]
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = [os.path.join(cache_dir, f'{key}_{i}.npy') for i in range(n_bootstrap)]
+    
+    missing = [i for i, path in enumerate(paths) if not os.path.exists(path)]
+    print(f"Bootstrap: {n_bootstrap} replika ({n_bootstrap - len(missing)} önbellekte, {len(missing)} hesaplanacak)")
+    if missing:
+        outer_jobs = min(len(missing), n_jobs)
+        inner_jobs = max(1, n_jobs // outer_jobs)
+        results = Parallel(n_jobs=outer_jobs)(
+            delayed(_bootstrap_replicate)([(name, with_n_jobs(model, inner_jobs)) for name, model in bootstrap_models],
+                                          X, y, X_test, i)
+            for i in missing
+        )
+        for i, preds in zip(missing, results):
+            # Yarım kalmış dosya bırakmamak için önce geçici dosyaya yaz
+            tmp_path = paths[i] + '.tmp.npy'
+            np.save(tmp_path, preds)
+            os.replace(tmp_path, paths[i])
+    
+    return [np.load(path) for path in paths]
+
+def build_base_models(n_jobs):
+    """Ensemble'ın temel modelleri (elle ayarlanmış varsayılan hiperparametrelerle): [(isim, model)]"""
+    models = []
+    
+    # Random Forest modeli (bellek verimli)
+    rf_model = RandomForestRegressor(
+        n_estimators=200,  # Azaltıldı
+        max_depth=12,      # Azaltıldı
+        min_samples_split=3,
+        min_samples_leaf=1,
+        max_features='sqrt',
+        bootstrap=True,
+        oob_score=True,
+        random_state=42,
+        n_jobs=n_jobs
+    )
+    models.append(('rf', rf_model))
+    
+
+    
+    # Gradient Boosting modeli (geliştirilmiş)
+    gb_model = GradientBoostingRegressor(
+        n_estimators=300,
+        learning_rate=0.08,
+        max_depth=6,
+        min_samples_split=3,
+        min_samples_leaf=1,
+        subsample=0.8,
+        max_features='sqrt',
+        random_state=42
+    )
+    models.append(('gb', gb_model))
+    
+
+    
+    # XGBoost modeli (varsa) - Bellek verimli parametreler
+    if XGB_AVAILABLE:
+        xgb_model = xgb.XGBRegressor(
+            n_estimators=250,           # Azaltıldı
+            max_depth=6,                # Azaltıldı
+            learning_rate=0.08,         # Artırıldı (daha hızlı)
+            subsample=0.8,              # 
+            colsample_bytree=0.8,       # 
+            reg_alpha=0.1,              # L1 regularization
+            reg_lambda=0.1,             # L2 regularization
+            min_child_weight=3,         # Artırıldı (overfitting'i azalt)
+            gamma=0.1,                  # Minimum split loss
+            random_state=42,
+            n_jobs=n_jobs,
+            eval_metric='rmse',
+            verbosity=0                 # Logları azalt
+        )
+        models.append(('xgb', xgb_model))
+        print("XGBoost modeli bellek verimli parametrelerle eklendi")
+    
+    # LightGBM modeli (varsa) - Bellek verimli
+    if LGB_AVAILABLE:
+        lgb_model = lgb.LGBMRegressor(
+            n_estimators=250,  # Azaltıldı
+            max_depth=6,
+            learning_rate=0.08,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            random_state=42,
+            n_jobs=n_jobs,
+            verbose=-1
+        )
+        models.append(('lgb', lgb_model))
+    return models
+
+# Hiperparametre araması (successive halving / Hyperband); her tur sonunda kontrol noktası yazılır
+SEARCH_CHECKPOINT_DIR = os.path.join('models', 'search_checkpoints')
+SEARCH_STRATEGIES = ('successive_halving', 'hyperband')
+SEARCH_METRICS = {
+    'mape': mean_absolute_percentage_error,
+    'rmse': lambda y_true, y_pred: np.sqrt(mean_squared_error(y_true, y_pred))
+}
+DEFAULT_SEARCH_CONFIG = {
+    'strategy': 'successive_halving',
+    'models': ['rf', 'gb', 'xgb', 'lgb'],
+    'n_candidates': 27,        # Successive halving başlangıç aday sayısı (Hyperband grupları kendi sayısını hesaplar)
+    'eta': 3,                  # Her turda adayların 1/eta'sı kalır, kaynak eta katına çıkar
+    'min_resource': 1 / 9,     # İlk turun tam bütçeye oranı
+    'resources': ['n_estimators', 'sample_fraction'],  # Bütçeyle birlikte ölçeklenen boyutlar
+    'min_estimators': 20,
+    'n_splits': 3,
+    'metric': 'mape',
+    'seed': 42,
+    # Aday uzayları: liste = seçenekler, {'low', 'high', 'log', 'int'} = aralık;
+    # n_estimators tam bütçedeki ağaç/tur sayısıdır, küçük turlarda orantılı azaltılır
+    'spaces': {
+        'rf': {
+            'n_estimators': 300,
+            'max_depth': [8, 12, 16, 20, None],
+            'min_samples_split': [2, 3, 5, 10],
+            'min_samples_leaf': [1, 2, 4],
+            'max_features': ['sqrt', 0.3, 0.5]
+        },
+        'gb': {
+            'n_estimators': 400,
+            'learning_rate': {'low': 0.02, 'high': 0.2, 'log': True},
+            'max_depth': [3, 4, 5, 6, 8],
+            'min_samples_leaf': [1, 2, 4, 8],
+            'subsample': [0.6, 0.8, 1.0],
+            'max_features': ['sqrt', 0.3, 0.5]
+        },
+        'xgb': {
+            'n_estimators': 400,
+            'learning_rate': {'low': 0.02, 'high': 0.2, 'log': True},
+            'max_depth': [3, 4, 5, 6, 8],
+            'subsample': [0.6, 0.8, 1.0],
+            'colsample_bytree': [0.5, 0.7, 0.9],
+            'min_child_weight': [1, 3, 5, 10],
+            'reg_lambda': {'low': 0.01, 'high': 10.0, 'log': True}
+        },
+        'lgb': {
+            'n_estimators': 400,
+            'learning_rate': {'low': 0.02, 'high': 0.2, 'log': True},
+            'num_leaves': [15, 31, 63],
+            'max_depth': [-1, 6, 8],
+            'min_child_samples': [5, 10, 20, 40],
+            'subsample': [0.6, 0.8, 1.0],
+            'subsample_freq': [1],
+            'colsample_bytree': [0.5, 0.7, 0.9]
+        }
+    }
+}
+
+def load_search_config(config=None):
+    """Arama yapılandırması: None/True varsayılan, sözlük veya JSON dosya yolu (varsayılanların üzerine yazılır)"""
+    if isinstance(config, str):
+        with open(config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    elif config is None or config is True:
+        config = {}
+    merged = {**copy.deepcopy(DEFAULT_SEARCH_CONFIG), **config}
+    merged['spaces'] = {**copy.deepcopy(DEFAULT_SEARCH_CONFIG['spaces']), **config.get('spaces', {})}
+    if merged['strategy'] not in SEARCH_STRATEGIES:
+        raise ValueError(f"Bilinmeyen arama stratejisi: {merged['strategy']} (seçenekler: {SEARCH_STRATEGIES})")
+    if merged['metric'] not in SEARCH_METRICS:
+        raise ValueError(f"Bilinmeyen arama metriği: {merged['metric']} (seçenekler: {list(SEARCH_METRICS)})")
+    if merged['eta'] < 2 or not 0 < merged['min_resource'] <= 1:
+        raise ValueError("eta en az 2, min_resource (0, 1] aralığında olmalı")
+    return merged
+
+def sample_candidates(space, n_candidates, rng):
+    """Aday uzayından n_candidates parametre sözlüğü çek (n_estimators kaynak olduğu için hariç)"""
+    candidates = []
+    for _ in range(n_candidates):
+        params = {}
+        for key, spec in space.items():
+            if key == 'n_estimators':
+                continue
+            if isinstance(spec, list):
+                value = spec[int(rng.integers(len(spec)))]
+            elif isinstance(spec, dict):
+                if spec.get('log'):
+                    value = float(np.exp(rng.uniform(np.log(spec['low']), np.log(spec['high']))))
+                else:
+                    value = float(rng.uniform(spec['low'], spec['high']))
+                if spec.get('int'):
+                    value = int(round(value))
+            else:
+                value = spec
+            params[key] = value
+        candidates.append(params)
+    return candidates
+
+def _resource_settings(config, n_estimators, resource):
+    """Bütçe oranını (ağaç sayısı, örnek oranı) çiftine çevir; iki boyut birlikteyse maliyet oranla doğrusal kalır"""
+    dims = config['resources']
+    share = resource ** (1.0 / len(dims)) if dims else 1.0
+    if 'n_estimators' in dims:
+        n_estimators = min(n_estimators, max(config['min_estimators'], int(round(n_estimators * share))))
+    fraction = share if 'sample_fraction' in dims else 1.0
+    return n_estimators, fraction
+
+def _search_fold_score(model, X, y, fit_rows, val_rows, metric):
+    """Adayı bir fold'da eğit ve doğrulama hatasını döndür (paralel görev)"""
+    model.fit(X[fit_rows], y[fit_rows])
+    return SEARCH_METRICS[metric](y[val_rows], model.predict(X[val_rows]))
+
+def _successive_halving(name, base_model, X, y, config, bracket, n_candidates, min_resource, state, checkpoint_path,
+                        n_jobs):
+    """Tek successive halving grubu: tüm adaylar küçük bütçeyle başlar, her turda en iyi 1/eta'sı
+    eta kat bütçeyle devam eder; son tur tam bütçededir. Sonuç: (parametreler, tam bütçe skoru)
+    """
+    space, eta, n_splits = config['spaces'][name], config['eta'], config['n_splits']
+    rng = np.random.default_rng(np.random.SeedSequence(config['seed'], spawn_key=(bracket,)))
+    candidates = sample_candidates(space, n_candidates, rng)
+    alive = list(range(n_candidates))
+    resource, rung = min_resource, 0
+    while True:
+        n_estimators, fraction = _resource_settings(config, space['n_estimators'], resource)
+        # Aynı turdaki adaylar aynı alt örnek ve fold'larda karşılaştırılır
+        row_rng = np.random.default_rng(np.random.SeedSequence(config['seed'], spawn_key=(bracket, rung)))
+        n_rows = min(len(y), max(int(round(fraction * len(y))), 20 * n_splits))
+        rows = np.sort(row_rng.choice(len(y), size=n_rows, replace=False))
+        folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=config['seed']).split(rows))
+        
+        pending = [i for i in alive if (bracket, rung, i) not in state['scores']]
+        if pending:
+            jobs = [(i, fit_idx, val_idx) for i in pending for fit_idx, val_idx in folds]
+            outer_jobs = min(len(jobs), n_jobs)
+            inner_jobs = max(1, n_jobs // outer_jobs)
+            fold_scores = Parallel(n_jobs=outer_jobs)(
+                delayed(_search_fold_score)(
+                    with_n_jobs(base_model, inner_jobs).set_params(**candidates[i], n_estimators=n_estimators),
+                    X, y, rows[fit_idx], rows[val_idx], config['metric'])
+                for i, fit_idx, val_idx in jobs
+            )
+            for k, i in enumerate(pending):
+                state['scores'][(bracket, rung, i)] = float(np.mean(fold_scores[k * n_splits:(k + 1) * n_splits]))
+            _atomic_dump(state, checkpoint_path)
+        
+        scores = {i: state['scores'][(bracket, rung, i)] for i in alive}
+        print(f"  {name} grup {bracket}, tur {rung}: {len(alive)} aday, {n_estimators} ağaç, "
+              f"%{fraction * 100:.0f} örnek, en iyi {config['metric']}={min(scores.values()):.4f}")
+        if resource >= 1.0:
+            best = min(alive, key=scores.get)
+            return candidates[best], scores[best]
+        alive = sorted(alive, key=scores.get)[:max(1, len(alive) // eta)]
+        resource = min(1.0, resource * eta)
+        rung += 1
+
+def hyperparameter_search(models, X, y, config=None, n_jobs=None, checkpoint_dir=SEARCH_CHECKPOINT_DIR):
+    """Temel modellerin hiperparametrelerini successive halving veya Hyperband ile ara
+    
+    Her model ailesi (rf, gb, xgb, lgb) kendi aday uzayında ayrı aranır. Bütçe, ağaç sayısı
+    ve eğitim örneği oranı olarak birlikte ölçeklenir; adaylar fold'larıyla paralel eğitilir.
+    Tur skorları kontrol noktasına yazılır; aynı veri ve yapılandırmayla yeniden çalıştırılan
+    arama kaldığı yerden devam eder. Sonuç: kazanan parametreler ve skorları (JSON uyumlu).
+    """
+    config = load_search_config(config)
+    n_jobs = resolve_n_jobs(n_jobs)
+    eta, min_resource = config['eta'], config['min_resource']
+    if config['strategy'] == 'hyperband':
+        # Grup s: eta^s kat daha az bütçeyle başlayan, (s_max + 1) / (s + 1) * eta^s adaylı successive halving
+        s_max = int(round(np.log(1 / min_resource) / np.log(eta)))
+        brackets = [(s, int(np.ceil((s_max + 1) / (s + 1) * eta ** s)), float(eta) ** -s) for s in range(s_max, -1, -1)]
+    else:
+        brackets = [(0, config['n_candidates'], min_resource)]
+    
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    data_digest = _array_fingerprint(X, y)
+    data_digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    print(f"Hiperparametre araması: {config['strategy']}, eta={eta}, {len(brackets)} grup, "
+          f"metrik {config['metric']}, {n_jobs} çekirdek")
+    
+    start = time.perf_counter()
+    result = {'strategy': config['strategy'], 'metric': config['metric'], 'eta': eta, 'min_resource': min_resource,
+              'n_evaluations': 0, 'models': {}}
+    for name, base_model in models:
+        if name not in config['models'] or name not in config['spaces']:
+            continue
+        digest = data_digest.copy()
+        digest.update(f"{name}:{type(base_model).__name__}".encode())
+        checkpoint_path = os.path.join(checkpoint_dir, f'{name}_{digest.hexdigest()[:16]}.pkl')
+        state = joblib.load(checkpoint_path) if os.path.exists(checkpoint_path) else {'scores': {}}
+        if state['scores']:
+            print(f"  {name}: kontrol noktasından {len(state['scores'])} değerlendirme ile devam ediliyor")
+        
+        finalists = [_successive_halving(name, base_model, X, y, config, bracket, n_candidates, resource, state,
+                                         checkpoint_path, n_jobs)
+                     for bracket, n_candidates, resource in brackets]
+        params, score = min(finalists, key=lambda finalist: finalist[1])
+        params = {**params, 'n_estimators': config['spaces'][name]['n_estimators']}
+        result['models'][name] = {'params': params, 'score': score}
+        result['n_evaluations'] += len(state['scores'])
+        print(f"✅ {name} kazanan ({config['metric']}={score:.4f}): {params}")
+    
+    result['search_seconds'] = time.perf_counter() - start
+    result['search_date'] = pd.Timestamp.now().isoformat()
+    return result
+
+def train_model(df, n_jobs=None, ensemble_mode='reuse', n_bootstrap=10, distill=False, search=None,
+                search_result=None):
+    """Gelişmiş model eğitimi - XGBoost, LightGBM ve Target Encoding ile ensemble yaklaşım
+    
+    n_jobs: toplam çekirdek bütçesi (None: KONUT_N_JOBS veya tüm çekirdekler). Model × fold
+    görevleri paralel çalışır, bütçe iç içe tahmincilerin iş parçacıklarına bölünür.
+    ensemble_mode: 'reuse' ensemble'ı CV fold modelleri ve out-of-fold tahminlerden kurar;
+    'refit' eski davranıştır (final eğitim + VotingRegressor/StackingRegressor yeniden eğitimi).
+    n_bootstrap: güven aralığı için bootstrap replika sayısı (replikalar diskte önbelleğe alınır).
+    distill: True ise kayıttan sonra ensemble küçük bir öğrenci modele damıtılır (distill_model).
+    search: True, yapılandırma sözlüğü veya JSON dosya yolu ise temel modellerin hiperparametreleri
+    eğitim setinde aranır (hyperparameter_search); kazananlar model manifestine yazılır.
+    search_result: önceki bir aramanın sonucu; kazanan parametreler yeniden aranmadan kullanılır.
+    """
     try:
+        n_jobs = resolve_n_jobs(n_jobs)
+        
         # Tahmin edilecek hedef değişkeni belirle (konut fiyatı)
         target_column = 'fiyat'
         y = df[target_column]  # Y değişkeni (tahmin edilecek)
@@ -366,97 +1462,36 @@ def train_model(df):
         # Her ilçe/mahalle için ortalama fiyat gibi istatistikleri hesapla
         df_with_target_encoding = target_encode_categorical(df, categorical_cols, target_column)
         
-        # Gelişmiş özellik mühendisliği uygula (yeni özellikler türet)
-        X_numerical = create_features(df_with_target_encoding)
-        
-        # Target encoding özelliklerini ekle
-        target_encoding_cols = [col for col in df_with_target_encoding.columns if 'target_' in col]
-        X_target_encoded = df_with_target_encoding[target_encoding_cols]
-        
-        # One-hot encoding (target encoding ile beraber kullanım)
-        X_categorical = pd.get_dummies(df[categorical_cols], drop_first=True)
-        
-        # Tüm özellikleri birleştir
-        X = pd.concat([X_numerical, X_target_encoded, X_categorical], axis=1)
+        # Özellik sırası: sayısal + target encoding + one-hot (pd.get_dummies ile aynı isimler)
+        feature_names = NUMERICAL_FEATURE_NAMES + TARGET_ENCODING_COLUMNS + onehot_feature_names(df, categorical_cols)
         
-        # Özellik isimlerini sakla
-        feature_names = X.columns.tolist()
+        # Derlenmiş özellik planı: doldurma ve kırpma istatistikleri eğitim verisinden dondurulur
+        feature_plan = FeaturePlan(feature_names).fit(df_with_target_encoding)
+        X_dense = feature_plan.transform_dense(df_with_target_encoding)
+        X_onehot = feature_plan.transform_onehot(df_with_target_encoding)  # Seyrek (CSR)
+        print(f"Özellik matrisi: {X_dense.shape[0]} satır, {feature_plan.n_dense} yoğun + "
+              f"{feature_plan.n_onehot} seyrek one-hot özellik")
         
-        # Veriyi eğitim ve test setlerine ayır
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=df['ilce'])
+        # Veriyi eğitim ve test setlerine ayır (satır indeksleri üzerinden)
+        train_rows, test_rows, y_train, y_test = train_test_split(
+            np.arange(len(df)), y, test_size=0.2, random_state=42, stratify=df['ilce'])
         
-        # Özellikleri ölçeklendir
+        # Sadece yoğun blok ölçeklendirilir; one-hot sütunlar ölçeklenmeden seyrek eklenir
         scaler = PowerTransformer(method='yeo-johnson')
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
-        
-        # Model listesi
-        models = []
-        
-        # Random Forest modeli (bellek verimli)
-        rf_model = RandomForestRegressor(
-            n_estimators=200,  # Azaltıldı
-            max_depth=12,      # Azaltıldı
-            min_samples_split=3,
-            min_samples_leaf=1,
-            max_features='sqrt',
-            bootstrap=True,
-            oob_score=True,
-            random_state=42,
-            n_jobs=2  # Azaltıldı
-        )
-        models.append(('rf', rf_model))
-        
-
-        
-        # Gradient Boosting modeli (geliştirilmiş)
-        gb_model = GradientBoostingRegressor(
-            n_estimators=300,
-            learning_rate=0.08,
-            max_depth=6,
-            min_samples_split=3,
-            min_samples_leaf=1,
-            subsample=0.8,
-            max_features='sqrt',
-            random_state=42
-        )
-        models.append(('gb', gb_model))
-        
-
-        
-        # XGBoost modeli (varsa) - Bellek verimli parametreler
-        if XGB_AVAILABLE:
-            xgb_model = xgb.XGBRegressor(
-                n_estimators=250,           # Azaltıldı
-                max_depth=6,                # Azaltıldı
-                learning_rate=0.08,         # Artırıldı (daha hızlı)
-                subsample=0.8,              # 
-                colsample_bytree=0.8,       # 
-                reg_alpha=0.1,              # L1 regularization
-                reg_lambda=0.1,             # L2 regularization
-                min_child_weight=3,         # Artırıldı (overfitting'i azalt)
-                gamma=0.1,                  # Minimum split loss
-                random_state=42,
-                n_jobs=2,                   # Azaltıldı
-                eval_metric='rmse',
-                verbosity=0                 # Logları azalt
-            )
-            models.append(('xgb', xgb_model))
-            print("XGBoost modeli bellek verimli parametrelerle eklendi")
-        
-        # LightGBM modeli (varsa) - Bellek verimli
-        if LGB_AVAILABLE:
-            lgb_model = lgb.LGBMRegressor(
-                n_estimators=250,  # Azaltıldı
-                max_depth=6,
-                learning_rate=0.08,
-                subsample=0.8,
-                colsample_bytree=0.8,
-                random_state=42,
-                n_jobs=2,  # Azaltıldı
-                verbose=-1
-            )
-            models.append(('lgb', lgb_model))
+        X_train_scaled = sparse.hstack([sparse.csr_matrix(scaler.fit_transform(X_dense[train_rows])),
+                                        X_onehot[train_rows]], format='csr')
+        X_test_scaled = sparse.hstack([sparse.csr_matrix(scaler.transform(X_dense[test_rows])),
+                                       X_onehot[test_rows]], format='csr')
+        
+        # Model listesi (arama yapıldıysa kazanan hiperparametrelerle)
+        models = build_base_models(n_jobs)
+        if search:
+            # Arama yalnızca eğitim setinde yapılır; test seti son değerlendirme için ayrı kalır
+            search_result = hyperparameter_search(models, X_train_scaled, y_train.to_numpy(), search, n_jobs)
+        if search_result:
+            for name, model in models:
+                if name in search_result['models']:
+                    model.set_params(**search_result['models'][name]['params'])
         
         # Gelişmiş model eğitimi - İyileştirilmiş ensemble stratejisi
         print(f"Gelişmiş ensemble eğitimi başlıyor... ({len(models)} model)")
@@ -466,31 +1501,62 @@ def train_model(df):
         individual_scores = {}
         model_predictions = {}
         
+        # Stratified K-Fold Cross Validation (ilçe bazlı stratification için discretized target)
+        kfold = StratifiedKFold(n_splits=3, shuffle=True, random_state=42)
+        y_discrete = pd.qcut(y_train, q=5, labels=False, duplicates='drop')
+        folds = list(kfold.split(X_train_scaled, y_discrete))
+        y_train_values = y_train.to_numpy()
+        all_rows = np.arange(X_train_scaled.shape[0])
+        
+        # Görevler: her model için fold'lar (+ 'refit' modunda tüm training data ile final eğitim)
+        tasks = []
         for name, model in models:
-            # Stratified K-Fold Cross Validation
-            cv_scores = []
-            kfold = StratifiedKFold(n_splits=3, shuffle=True, random_state=42)
-            
-            # İlçe bazlı stratification için discretized target
-            y_discrete = pd.qcut(y_train, q=5, labels=False, duplicates='drop')
-            
-            for train_idx, val_idx in kfold.split(X_train_scaled, y_discrete):
-                X_cv_train, X_cv_val = X_train_scaled[train_idx], X_train_scaled[val_idx]
-                y_cv_train, y_cv_val = y_train.iloc[train_idx], y_train.iloc[val_idx]
-                
-                model_copy = type(model)(**model.get_params())
-                model_copy.fit(X_cv_train, y_cv_train)
-                cv_pred = model_copy.predict(X_cv_val)
-                cv_score = r2_score(y_cv_val, cv_pred)
-                cv_scores.append(cv_score)
-            
-            avg_score = np.mean(cv_scores)
+            for train_idx, val_idx in folds:
+                tasks.append((name, model, train_idx, val_idx))
+            if ensemble_mode == 'refit':
+                tasks.append((name, model, all_rows, None))
+        
+        # Çekirdek bütçesini dış görevler ve modellerin iç iş parçacıkları arasında böl
+        outer_jobs = min(len(tasks), n_jobs)
+        inner_jobs = max(1, n_jobs // outer_jobs)
+        print(f"Paralel eğitim: {len(tasks)} görev, {outer_jobs} süreç x {inner_jobs} iş parçacığı")
+        
+        results = Parallel(n_jobs=outer_jobs)(
+            delayed(_fit_predict)(with_n_jobs(model, inner_jobs), X_train_scaled, y_train_values,
+                                  fit_rows, eval_rows, X_test_scaled)
+            for name, model, fit_rows, eval_rows in tasks
+        )
+        
+        # Süreçlerde eğitilen modeller: fold modelleri, out-of-fold (OOF) ve test tahminleri
+        fold_models = {name: [] for name, _ in models}
+        fold_test_predictions = {name: [] for name, _ in models}
+        oof_predictions = {name: np.zeros(len(y_train_values)) for name, _ in models}
+        fitted_models = {}
+        cv_scores = {name: [] for name, _ in models}
+        for (name, _, _, eval_rows), (fitted, eval_pred, test_pred) in zip(tasks, results):
+            # Tahminde modelin tüm bütçeyi kullanması için
+            if 'n_jobs' in fitted.get_params():
+                fitted.set_params(n_jobs=n_jobs)
+            if eval_rows is None:
+                # Final model (tüm training data ile eğitilmiş, 'refit' modu)
+                fitted_models[name] = fitted
+                model_predictions[name] = test_pred
+            else:
+                fold_models[name].append(fitted)
+                fold_test_predictions[name].append(test_pred)
+                oof_predictions[name][eval_rows] = eval_pred
+                cv_scores[name].append(r2_score(y_train_values[eval_rows], eval_pred))
+        
+        if ensemble_mode == 'reuse':
+            # Final model yeniden eğitilmez: fold modellerinin ortalaması kullanılır
+            for name, _ in models:
+                fitted_models[name] = FoldAverageModel(fold_models[name])
+                model_predictions[name] = np.mean(fold_test_predictions[name], axis=0)
+        
+        for name, _ in models:
+            avg_score = np.mean(cv_scores[name])
             individual_scores[name] = avg_score
-            print(f"{name.upper()} CV R² (μ±σ): {avg_score:.4f}±{np.std(cv_scores):.4f}")
-            
-            # Final model'i tüm training data ile eğit
-            model.fit(X_train_scaled, y_train)
-            model_predictions[name] = model.predict(X_test_scaled)
+            print(f"{name.upper()} CV R² (μ±σ): {avg_score:.4f}±{np.std(cv_scores[name]):.4f}")
         
         # 2. Aşama: En iyi modelleri seç (dinamik seçim)
         score_threshold = max(individual_scores.values()) * 0.95  # En iyinin %95'i
@@ -532,28 +1598,19 @@ def train_model(df):
         ensemble_strategies['weighted_average'] = weighted_pred
         
         # Strategy 2: Dynamic weighting (tahmin bazlı)
-        dynamic_pred = np.zeros_like(weighted_pred)
-        for i in range(len(weighted_pred)):
-            # Her tahmin için modellerin ne kadar "emin" olduğunu hesapla
-            pred_values = [model_predictions[name][i] for name in best_models.keys()]
-            pred_std = np.std(pred_values)
-            
-            if pred_std < np.mean([model_predictions[name].std() for name in best_models.keys()]) * 0.5:
-                # Düşük belirsizlik - performans ağırlığı kullan
-                dynamic_weights = weights
-            else:
-                # Yüksek belirsizlik - eşit ağırlık kullan
-                dynamic_weights = np.ones(len(weights)) / len(weights)
-            
-            dynamic_pred[i] = np.average(pred_values, weights=dynamic_weights)
-        
+        # Modeller arası std, model tahmin std'lerinin ortalamasının yarısından düşükse performans
+        # ağırlığı, değilse eşit ağırlık; eşik kaydedilen modelde de aynen kullanılır
+        dynamic_threshold = pred_matrix.std(axis=0).mean() * 0.5
+        dynamic_pred = dynamic_weighted_average(pred_matrix, weights, dynamic_threshold)
         ensemble_strategies['dynamic_weighting'] = dynamic_pred
         
-        # Strategy 3: Meta-learner (Ridge)
+        # Strategy 3: Meta-learner (Ridge) - training setinin out-of-fold tahminleri ile eğitilir,
+        # test setinde değerlendirilir
         if len(best_models) >= 2:
-            meta_features = np.column_stack([model_predictions[name] for name in best_models.keys()])
+            oof_features = np.column_stack([oof_predictions[name] for name in best_models.keys()])
             meta_learner = Ridge(alpha=1.0, random_state=42)
-            meta_learner.fit(meta_features, y_test)
+            meta_learner.fit(oof_features, y_train_values)
+            meta_features = np.column_stack([model_predictions[name] for name in best_models.keys()])
             meta_pred = meta_learner.predict(meta_features)
             ensemble_strategies['meta_learner'] = meta_pred
         
@@ -574,23 +1631,43 @@ def train_model(df):
         print(f"En iyi ensemble stratejisi: {best_strategy} (R²={best_score:.4f})")
         
         # 6. Aşama: Ensemble model objesi oluştur (kaydetmek için)
-        selected_model_list = [(name, model) for name, model in models if name in best_models]
-        
-        if best_strategy == 'meta_learner' and len(selected_model_list) >= 2:
-            ensemble_model = StackingRegressor(
-                estimators=selected_model_list,
-                final_estimator=Ridge(alpha=1.0, random_state=42),
-                cv=3,
-                n_jobs=2
-            )
-            ensemble_model.fit(X_train_scaled, y_train)
+        n_fits = len(tasks)
+        if ensemble_mode == 'reuse':
+            # CV aşamasında eğitilmiş modeller ve OOF tahminleri ile kurulur (ek eğitim yok)
+            selected_model_list = [(name, fitted_models[name]) for name in best_models]
+            if best_strategy == 'meta_learner' and len(selected_model_list) >= 2:
+                ensemble_model = StackedEnsemble(selected_model_list, meta_learner)
+            elif best_strategy == 'dynamic_weighting':
+                ensemble_model = DynamicWeightedEnsemble(selected_model_list, weights, dynamic_threshold)
+            else:
+                ensemble_model = WeightedEnsemble(selected_model_list, weights)
         else:
-            # Weighted voting regressor
-            ensemble_model = VotingRegressor(
-                estimators=selected_model_list, 
-                weights=weights
-            )
+            # Ensemble içindeki modeller paralel eğitildiği için bütçe modeller arasında bölünür
+            selected_model_list = [(name, with_n_jobs(model, max(1, n_jobs // len(best_models))))
+                                   for name, model in models if name in best_models]
+            
+            if best_strategy == 'meta_learner' and len(selected_model_list) >= 2:
+                ensemble_model = StackingRegressor(
+                    estimators=selected_model_list,
+                    final_estimator=Ridge(alpha=1.0, random_state=42),
+                    cv=3,
+                    n_jobs=min(len(selected_model_list), n_jobs)
+                )
+                n_fits += len(selected_model_list) * 4  # Final eğitim + iç cv=3
+            else:
+                # Weighted voting regressor
+                ensemble_model = VotingRegressor(
+                    estimators=selected_model_list, 
+                    weights=weights,
+                    n_jobs=min(len(selected_model_list), n_jobs)
+                )
+                n_fits += len(selected_model_list)
             ensemble_model.fit(X_train_scaled, y_train)
+            if best_strategy == 'dynamic_weighting':
+                # Eğitilmiş voting modelleri dinamik ağırlıklı ensemble'a aktarılır
+                ensemble_model = DynamicWeightedEnsemble(
+                    list(ensemble_model.named_estimators_.items()), weights, dynamic_threshold)
+        print(f"Toplam model eğitimi ({ensemble_mode} modu): {n_fits}")
         
         # Tüm özellikleri kullanıyoruz
         selected_features = feature_names
@@ -598,33 +1675,20 @@ def train_model(df):
         # YENİ: Gelişmiş güven aralığı hesaplama
         # Model belirsizliğini tahmin etmek için bootstrap sampling
         print("Güven aralığı hesaplaması için bootstrap analizi...")
-        n_bootstrap = 10  # 50'den 10'a düşürüldü - hızlandırma
-        bootstrap_predictions = []
         
         # Sadece en iyi 2 modeli kullan (daha hızlı)
         top_2_models = list(best_models.keys())[:2]
         print(f"Bootstrap için sadece en iyi 2 model kullanılıyor: {top_2_models}")
         
-        for i in range(n_bootstrap):
-            print(f"Bootstrap {i+1}/{n_bootstrap}...")
-            # Bootstrap sample oluştur
-            bootstrap_indices = np.random.choice(len(X_train_scaled), size=len(X_train_scaled)//2, replace=True)  # Yarı boyut
-            X_bootstrap = X_train_scaled[bootstrap_indices]
-            y_bootstrap = y_train.iloc[bootstrap_indices]
-            
-            # Sadece en iyi 2 modeli bootstrap verisi ile eğit
-            bootstrap_preds = []
-            for name in top_2_models:
-                model_for_bootstrap = type([m for n, m in models if n == name][0])(**[m for n, m in models if n == name][0].get_params())
-                model_for_bootstrap.fit(X_bootstrap, y_bootstrap)
-                bootstrap_pred = model_for_bootstrap.predict(X_test_scaled)
-                bootstrap_preds.append(bootstrap_pred)
-            
-            # Ensemble prediction (sadece top 2 modelin ağırlıkları)
-            top_2_weights = weights[:2] / weights[:2].sum()  # Normalize
-            ensemble_bootstrap_pred = np.average(bootstrap_preds, weights=top_2_weights, axis=0)
-            bootstrap_predictions.append(ensemble_bootstrap_pred)
+        # Her replikanın model bazlı test tahminleri diskte saklanır; tekrar sayısı artırıldığında
+        # mevcut replikalar yeniden hesaplanmaz
+        bootstrap_models = [(name, dict(models)[name]) for name in top_2_models]
+        model_bootstrap_preds = run_bootstrap(bootstrap_models, X_train_scaled, y_train_values, X_test_scaled,
+                                              n_bootstrap=n_bootstrap, n_jobs=n_jobs)
         
+        # Ensemble prediction (sadece top 2 modelin ağırlıkları)
+        top_2_weights = weights[:2] / weights[:2].sum()  # Normalize
+        bootstrap_predictions = [np.average(preds, weights=top_2_weights, axis=0) for preds in model_bootstrap_preds]
         bootstrap_predictions = np.array(bootstrap_predictions)
         
         # Bootstrap tabanlı güven aralıkları
@@ -641,6 +1705,23 @@ def train_model(df):
         ci_width = confidence_upper - confidence_lower
         print(f"Ortalama güven aralığı genişliği: {np.mean(ci_width):,.0f} TL")
         
+        # İlan bazlı belirsizlik: seçilen ensemble'ın eğitim seti out-of-fold tahminleri ile
+        # (ilçe, fiyat bandı) conformal hata tablosu kalibre edilir
+        oof_matrix = np.column_stack([oof_predictions[name] for name in best_models.keys()])
+        if best_strategy == 'meta_learner':
+            oof_ensemble_pred = meta_learner.predict(oof_matrix)
+        elif best_strategy == 'dynamic_weighting':
+            oof_ensemble_pred = dynamic_weighted_average(oof_matrix, weights, dynamic_threshold)
+        else:
+            oof_ensemble_pred = oof_matrix @ weights
+        uncertainty_table = build_uncertainty_table(df['ilce'].values[train_rows], y_train_values, oof_ensemble_pred)
+        
+        # Test setinde kapsama oranı kontrolü
+        test_quantiles = lookup_uncertainty(uncertainty_table, df['ilce'].values[test_rows], y_pred)
+        for k, level in enumerate(uncertainty_table['levels']):
+            coverage = (np.abs(y_test - y_pred) <= test_quantiles[:, k] * y_pred).mean()
+            print(f"İlan bazlı %{level * 100:.0f} aralık test kapsaması: %{coverage * 100:.1f}")
+        
         # Gelişmiş model performans değerlendirmesi
         mse = mean_squared_error(y_test, y_pred)
         rmse = np.sqrt(mse)
@@ -656,7 +1737,7 @@ def train_model(df):
         
         # R2 adjusted (feature sayısını hesaba katan)
         n = len(y_test)
-        p = X_test.shape[1]
+        p = len(feature_names)
         r2_adj = 1 - (1 - r2) * (n - 1) / (n - p - 1)
         
         # Fiyat aralığına göre performans
@@ -751,9 +1832,8 @@ def train_model(df):
             os.makedirs('models')
         
         print("Model ve ilgili dosyalar kaydediliyor...")
-        joblib.dump(ensemble_model, 'models/konut_fiyat_model.pkl')
-        joblib.dump(scaler, 'models/scaler.pkl')
-        joblib.dump(feature_names, 'models/feature_names.pkl')  # Tüm özellikler
+        # Artımlı güncelleme için birleştirilebilir fiyat özetleri (tahmin paketinin dışında tutulur)
+        joblib.dump(build_encoding_state(df), 'models/encoding_state.pkl')
         
         # YENİ: Bootstrap ve güven aralığı parametreleri
         confidence_params = {
@@ -767,7 +1847,6 @@ def train_model(df):
             'best_strategy': best_strategy,
             'ensemble_type': type(ensemble_model).__name__
         }
-        joblib.dump(confidence_params, 'models/confidence_params.pkl')
         
         # Model performans metrikleri
         performance_metrics = {
@@ -781,21 +1860,14 @@ def train_model(df):
             'accuracy_10_percent': (np.abs(residuals/y_test) < 0.1).mean(),
             'accuracy_20_percent': (np.abs(residuals/y_test) < 0.2).mean(),
             'training_date': pd.Timestamp.now().isoformat(),
-            'n_training_samples': len(X_train),
-            'n_test_samples': len(X_test),
+            'n_training_samples': len(train_rows),
+            'n_test_samples': len(test_rows),
             'n_features': len(feature_names)
         }
-        joblib.dump(performance_metrics, 'models/performance_metrics.pkl')
-        
-        # İlçe-mahalle haritası oluştur
-        ilce_mahalle_map = {}
-        for ilce in df['ilce'].unique():
-            ilce_mahalle_map[ilce] = sorted(df[df['ilce'] == ilce]['mahalle'].unique().tolist())
+        if search_result:
+            performance_metrics['hyperparameter_search'] = search_result
         
-        joblib.dump(sorted(df['ilce'].unique().tolist()), 'models/unique_ilce.pkl')
-        joblib.dump(ilce_mahalle_map, 'models/ilce_mahalle_map.pkl')
-        
-        # Tahmin güvenilirliği için fiyat aralıklarını kaydet
+        # Tahmin güvenilirliği için fiyat aralıkları
         price_range = {
             'min': float(y.min()),
             'max': float(y.max()),
@@ -806,11 +1878,38 @@ def train_model(df):
             'q5': float(y.quantile(0.05)),
             'q95': float(y.quantile(0.95))
         }
-        joblib.dump(price_range, 'models/price_range.pkl')
+        
+        # Küçük gruplar için ağaçları düz dizilere derle (test setinde orijinalle karşılaştırılır)
+        compiled_model = build_compiled_model(ensemble_model, X_test_scaled)
+        
+        # Tüm tahmin dosyalarını tek versiyonlu pakete kaydet
+        manifest = save_model_bundle({
+            'model': ensemble_model,
+            'scaler': scaler,
+            'feature_names': feature_names,
+            'feature_plan': feature_plan,  # Eğitim medyanları ve kırpma sınırları
+            # Tahmin aşaması için ilçe/mahalle kodlama tabloları (global yedek değerlerle birlikte)
+            'encoding_tables': build_encoding_tables(df),
+            # Tahmin aşamasında kullanılan küçük belirsizlik tablosu (bootstrap matrisi kullanılmaz)
+            'uncertainty_table': uncertainty_table,
+            'confidence_params': confidence_params,
+            'performance_metrics': performance_metrics,
+            'metadata': build_metadata(compute_ilce_mahalle_map(df), price_range),
+            'compiled_model': compiled_model,
+            # Eğitim/test bölmesindeki ilanlar (damıtma aynı test ilanlarında değerlendirilir)
+            'training_split': {
+                'train': df[SPLIT_COLUMNS].iloc[train_rows].reset_index(drop=True),
+                'test': df[SPLIT_COLUMNS].iloc[test_rows].reset_index(drop=True)
+            }
+        })
+        print(f"Model paketi: {manifest['payload']} (özellik özeti {manifest['feature_hash'][:12]})")
         
         print("✅ Model başarıyla kaydedildi!")
         print(f"📊 Final Performans: R²={r2:.4f}, RMSE={rmse:,.0f}, MAPE={mape:.2f}%")
         
+        if distill:
+            distill_model(df)
+        
         return ensemble_model, scaler, feature_names
     except Exception as e:
         print(f"Model eğitimi hatası: {e}")
@@ -818,199 +1917,563 @@ def train_model(df):
         traceback.print_exc()
         return None, None, None
 
-def predict_price(features_dict):
-    """Konut fiyatını tahmin et ve güvenilirlik bilgisi döndür"""
-    try:
-        # Modeli ve ilgili dosyaları yükle
-        model = joblib.load('models/konut_fiyat_model.pkl')
-        scaler = joblib.load('models/scaler.pkl')
-        feature_names = joblib.load('models/feature_names.pkl')
-        price_range = joblib.load('models/price_range.pkl')
-        
-        # Feature selector artık kullanılmıyor - hızlandırma için kaldırıldı
-        
-        # Veri setini yükle
-        df = load_and_preprocess_data()
-        
-        # İlçe ve mahalle istatistikleri
-        ilce_stats = df.groupby('ilce')['fiyat'].agg(['mean', 'median', 'std']).reset_index()
-        mahalle_stats = df.groupby('mahalle')['fiyat'].agg(['mean', 'median', 'std']).reset_index()
-        
-        # İlçe ve mahalle frekans kodlaması
-        ilce_freq = df['ilce'].value_counts(normalize=True).to_dict()
-        mahalle_freq = df['mahalle'].value_counts(normalize=True).to_dict()
-        
-        # Girdi özelliklerini DataFrame'e dönüştür
-        input_df = pd.DataFrame([features_dict])
-        
-        # İlçe ve mahalle istatistiklerini ekle
-        input_df = input_df.merge(ilce_stats, on='ilce', how='left')
-        input_df = input_df.merge(mahalle_stats, on='mahalle', how='left', suffixes=('', '_mahalle'))
-        
-        # Frekans kodlamasını ekle
-        input_df['ilce_freq'] = input_df['ilce'].map(ilce_freq)
-        input_df['mahalle_freq'] = input_df['mahalle'].map(mahalle_freq)
-        
-        # Target encoding özelliklerini ekle
-        # Global istatistiklerle doldur (tahmin aşamasında cross-validation yapmayız)
-        global_mean = df['fiyat'].mean()
-        global_median = df['fiyat'].median()
-        global_std = df['fiyat'].std()
-        
-        # Gelişmiş İlçe target encoding
-        ilce_target_stats = df.groupby('ilce')['fiyat'].agg([
-            'mean', 'median', 'std', 'count', 'min', 'max',
-            lambda x: x.quantile(0.25),  # Q1
-            lambda x: x.quantile(0.75)   # Q3
-        ]).reset_index()
-        ilce_target_stats.columns = ['ilce', 'mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75']
-        
-        # Smoothed mean hesapla
-        smoothing_factor = 10
-        ilce_target_stats['smoothed_mean'] = (
-            (ilce_target_stats['count'] * ilce_target_stats['mean'] + smoothing_factor * global_mean) / 
-            (ilce_target_stats['count'] + smoothing_factor)
+# Kategori tablosundaki sütunların tahmin DataFrame'indeki karşılıkları
+ENCODING_COLUMN_MAP = {
+    'ilce': {'mean': 'mean', 'median': 'median', 'std': 'std', 'freq': 'ilce_freq'},
+    'mahalle': {'mean': 'mean_mahalle', 'median': 'median_mahalle', 'std': 'std_mahalle', 'freq': 'mahalle_freq'}
+}
+
+def build_encoding_tables(df, smoothing_factor=10):
+    """İlçe ve mahalle için tahmin aşamasında kullanılacak kodlama tablolarını hesapla
+    
+    Her kategori için tablo: {'index': {kategori: satır}, 'columns': [...], 'values': ndarray}
+    'values' matrisinin son satırı veri setinde görülmemiş kategoriler için yedek değerlerdir.
+    """
+    group_stats = {}
+    for col in ['ilce', 'mahalle']:
+        grouped = df.groupby(col)['fiyat']
+        # Tek geçişte temel istatistikler ve çeyreklikler (lambda yerine vektörel quantile)
+        stats_df = grouped.agg(['mean', 'median', 'std', 'count', 'min', 'max'])
+        quantiles = grouped.quantile([0.25, 0.75]).unstack()
+        stats_df['q25'] = quantiles[0.25]
+        stats_df['q75'] = quantiles[0.75]
+        group_stats[col] = stats_df
+    return _assemble_encoding_tables(group_stats, df['fiyat'].mean(), df['fiyat'].median(), df['fiyat'].std(),
+                                     len(df), smoothing_factor)
+
+def _assemble_encoding_tables(group_stats, global_mean, global_median, global_std, n_rows, smoothing_factor=10):
+    """Kategori istatistik tablolarından (mean, median, std, count, min, max, q25, q75) kodlama tablolarını kur"""
+    tables = {'global': {'mean': global_mean, 'median': global_median, 'std': global_std}}
+    for col, stats_df in group_stats.items():
+        stats_df = stats_df.copy()
+        stats_df['smoothed'] = (
+            (stats_df['count'] * stats_df['mean'] + smoothing_factor * global_mean) /
+            (stats_df['count'] + smoothing_factor)
         )
         
-        # Basit ve güvenli target encoding
-        # İlçe için
-        try:
-            temp_ilce = input_df.merge(ilce_target_stats, on='ilce', how='left')
-            for col in ['mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75', 'smoothed_mean']:
-                if col in temp_ilce.columns:
-                    default_val = global_mean if col in ['mean', 'median', 'min', 'max', 'q25', 'q75', 'smoothed_mean'] else (global_std if col == 'std' else 1)
-                    input_df[f'ilce_target_{col}'] = temp_ilce[col].fillna(default_val)
-                else:
-                    default_val = global_mean if col in ['mean', 'median', 'min', 'max', 'q25', 'q75', 'smoothed_mean'] else (global_std if col == 'std' else 1)
-                    input_df[f'ilce_target_{col}'] = default_val
-        except:
-            # Eğer merge başarısızsa varsayılan değerler kullan
-            for col in ['mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75', 'smoothed_mean']:
-                default_val = global_mean if col in ['mean', 'median', 'min', 'max', 'q25', 'q75', 'smoothed_mean'] else (global_std if col == 'std' else 1)
-                input_df[f'ilce_target_{col}'] = default_val
-        
-        # Mahalle için  
+        columns = ['mean', 'median', 'std', 'freq'] + [f'target_{name}' for name in TARGET_STAT_NAMES]
+        values = np.empty((len(stats_df) + 1, len(columns)), dtype=np.float64)
+        # Ham istatistikler (load_and_preprocess_data'daki merge ile aynı, std tek örnekte NaN kalır)
+        values[:-1, 0] = stats_df['mean'].values
+        values[:-1, 1] = stats_df['median'].values
+        values[:-1, 2] = stats_df['std'].values
+        values[:-1, 3] = stats_df['count'].values / n_rows
+        # Target encoding istatistikleri (eğitimdeki eksik değer doldurma kuralları ile)
+        target_values = stats_df[TARGET_STAT_NAMES].copy()
+        target_values['std'] = target_values['std'].fillna(global_std)
+        values[:-1, 4:] = target_values.values
+        
+        # Görülmemiş kategori: ham istatistikler NaN, target encoding global değerler
+        values[-1, :4] = np.nan
+        values[-1, 4:] = [global_mean, global_median, global_std, 1,
+                          global_mean, global_mean, global_mean, global_mean, global_mean]
+        
+        tables[col] = {
+            'index': {name: i for i, name in enumerate(stats_df.index)},
+            'columns': columns,
+            'values': values
+        }
+    return tables
+
+# Artımlı güncelleme için birleştirilebilir fiyat özetleri: sayı, ortalama, M2 (Chan birleştirmesi),
+# min/max ve temizleme sınırları içinde log ölçekli fiyat histogramı (çeyreklikler için)
+SKETCH_BIN_EDGES = np.geomspace(100000, 50000000, 1025)
+
+def _price_summary(codes, y, n_groups):
+    """Kategori kodları için birleştirilebilir fiyat özeti"""
+    n_bins = len(SKETCH_BIN_EDGES) - 1
+    count = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.bincount(codes, weights=y, minlength=n_groups) / count
+    mean[count == 0] = 0.0
+    m2 = np.bincount(codes, weights=(y - mean[codes]) ** 2, minlength=n_groups)
+    minimum = np.full(n_groups, np.inf)
+    maximum = np.full(n_groups, -np.inf)
+    np.minimum.at(minimum, codes, y)
+    np.maximum.at(maximum, codes, y)
+    bins = np.clip(np.searchsorted(SKETCH_BIN_EDGES, y, side='right') - 1, 0, n_bins - 1)
+    hist = np.bincount(codes * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+    return {'count': count, 'mean': mean, 'm2': m2, 'min': minimum, 'max': maximum, 'hist': hist.astype(np.int32)}
+
+def _merge_price_summaries(a, b):
+    """İki fiyat özetini birleştir (paralel varyans formülü, histogram toplamı)"""
+    count = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    safe_count = np.where(count > 0, count, 1)
+    return {
+        'count': count,
+        'mean': a['mean'] + delta * b['count'] / safe_count,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / safe_count,
+        'min': np.minimum(a['min'], b['min']),
+        'max': np.maximum(a['max'], b['max']),
+        'hist': a['hist'] + b['hist']
+    }
+
+def _sketch_order_statistic(summary, k):
+    """Histogramdan her grubun k. (0 tabanlı) sıralı değerine yaklaşım: kutu içinde log ölçekte konum"""
+    hist = summary['hist']
+    rows = np.arange(len(hist))
+    cumulative = np.cumsum(hist, axis=1)
+    bin_idx = (cumulative > k[:, None]).argmax(axis=1)
+    in_bin = hist[rows, bin_idx]
+    before = cumulative[rows, bin_idx] - in_bin
+    fraction = (k - before + 0.5) / np.maximum(in_bin, 1)
+    log_edges = np.log(SKETCH_BIN_EDGES)
+    value = np.exp(log_edges[bin_idx] + fraction * (log_edges[bin_idx + 1] - log_edges[bin_idx]))
+    return np.clip(value, summary['min'], summary['max'])
+
+def _sketch_quantile(summary, q):
+    """Histogramdan pandas quantile ile aynı doğrusal interpolasyonlu yaklaşık çeyreklik"""
+    count = summary['count']
+    rank = q * np.maximum(count - 1, 0)
+    lower = np.floor(rank)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    with np.errstate(invalid='ignore'):
+        value_lower = _sketch_order_statistic(summary, lower)
+        value_upper = _sketch_order_statistic(summary, upper)
+        value = value_lower + (value_upper - value_lower) * (rank - lower)
+    return np.where(count > 0, value, np.nan)
+
+def build_encoding_state(df):
+    """İlçe/mahalle ve tüm veri için birleştirilebilir fiyat özetlerini hesapla (encoding_state.pkl)"""
+    y = df['fiyat'].to_numpy(dtype=np.float64)
+    state = {'global': _price_summary(np.zeros(len(y), dtype=np.intp), y, 1)}
+    for col in ['ilce', 'mahalle']:
+        codes, uniques = pd.factorize(df[col])
+        state[col] = {'index': {name: i for i, name in enumerate(uniques)}, **_price_summary(codes, y, len(uniques))}
+    return state
+
+def update_encoding_state(state, df):
+    """Yeni ilanları fiyat özetlerine ekle; yeni kategoriler tabloya eklenir"""
+    y = df['fiyat'].to_numpy(dtype=np.float64)
+    updated = {'global': _merge_price_summaries(state['global'],
+                                                _price_summary(np.zeros(len(y), dtype=np.intp), y, 1))}
+    for col in ['ilce', 'mahalle']:
+        index = dict(state[col]['index'])
+        for name in pd.unique(df[col]):
+            index.setdefault(name, len(index))
+        n_groups = len(index)
+        # Mevcut özeti yeni kategoriler için boş satırlarla genişlet
+        old = {key: value for key, value in state[col].items() if key != 'index'}
+        n_new = n_groups - len(old['count'])
+        empty = _price_summary(np.empty(0, dtype=np.intp), np.empty(0), n_new)
+        old = {key: np.concatenate([old[key], empty[key]]) for key in old}
+        codes = lookup_codes(df[col].values, index, -1)
+        updated[col] = {'index': index, **_merge_price_summaries(old, _price_summary(codes, y, n_groups))}
+    return updated
+
+def encoding_tables_from_state(state, smoothing_factor=10):
+    """Fiyat özetlerinden build_encoding_tables ile aynı biçimde kodlama tabloları üret"""
+    def summary_stats(summary):
+        count = summary['count']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(summary['m2'] / (count - 1))
+        std[count < 2] = np.nan
+        return {'mean': summary['mean'], 'median': _sketch_quantile(summary, 0.5), 'std': std, 'count': count,
+                'min': summary['min'], 'max': summary['max'],
+                'q25': _sketch_quantile(summary, 0.25), 'q75': _sketch_quantile(summary, 0.75)}
+    
+    global_stats = summary_stats(state['global'])
+    group_stats = {}
+    for col in ['ilce', 'mahalle']:
+        names = list(state[col]['index'])
+        group_stats[col] = pd.DataFrame(summary_stats(state[col]), index=pd.Index(names, name=col))
+    return _assemble_encoding_tables(group_stats, global_stats['mean'][0], global_stats['median'][0],
+                                     global_stats['std'][0], int(state['global']['count'][0]), smoothing_factor)
+
+def attach_encodings(input_df, tables):
+    """Kodlama tablolarından ilçe/mahalle istatistiklerini sözlük araması ile ekle"""
+    encoded = {}
+    for col in ['ilce', 'mahalle']:
+        table = tables[col]
+        fallback = len(table['values']) - 1
+        rows = table['values'][lookup_codes(input_df[col].values, table['index'], fallback)]
+        for j, name in enumerate(table['columns']):
+            if name.startswith('target_'):
+                out_name = f"{col}_{name}"
+            else:
+                out_name = ENCODING_COLUMN_MAP[col][name]
+            encoded[out_name] = rows[:, j]
+    return input_df.assign(**encoded)
+
+def build_uncertainty_table(ilce, y_true, y_pred, n_bands=5, min_count=20, levels=(0.68, 0.95)):
+    """İlçe ve fiyat bandına göre kalibre edilmiş (conformal) göreli hata tablosu
+    
+    Eğitim setinin out-of-fold tahminlerinden |gerçek - tahmin| / tahmin oranının
+    çeyreklikleri hesaplanır. Tablo: {'band_edges', 'index': {ilçe: satır}, 'levels',
+    'values': ndarray (ilçe+1, bant, seviye), 'counts'}; son satır tüm ilçeler için bant
+    değerleridir ve az örnekli hücreler ile görülmemiş ilçeler bu satıra düşer.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.maximum(np.asarray(y_pred, dtype=np.float64), 1.0)
+    relative_error = np.abs(y_true - y_pred) / y_pred
+    
+    # Bant sınırları tahmin dağılımının çeyrekliklerinden (uçlar açık)
+    band_edges = np.quantile(y_pred, np.linspace(0, 1, n_bands + 1)[1:-1])
+    band = np.searchsorted(band_edges, y_pred, side='right')
+    ilce_codes, ilce_uniques = pd.factorize(np.asarray(ilce), use_na_sentinel=False)
+    n_ilce = len(ilce_uniques)
+    
+    frame = pd.DataFrame({'ilce': ilce_codes, 'band': band, 'error': relative_error})
+    quantiles = frame.groupby(['ilce', 'band'])['error'].quantile(list(levels)).unstack()
+    counts = frame.groupby(['ilce', 'band']).size()
+    band_quantiles = frame.groupby('band')['error'].quantile(list(levels)).unstack()
+    
+    # Önce tüm hücreler bant değerleri ile doldurulur, yeterli örneği olan hücreler üzerine yazılır
+    values = np.empty((n_ilce + 1, n_bands, len(levels)), dtype=np.float64)
+    values[:] = np.quantile(relative_error, levels)  # Boş bant olursa global değer
+    values[:, band_quantiles.index] = band_quantiles.values
+    cell_counts = np.zeros((n_ilce + 1, n_bands), dtype=np.int64)
+    cell_counts[counts.index.get_level_values(0), counts.index.get_level_values(1)] = counts.values
+    reliable = quantiles.loc[counts[counts >= min_count].index]
+    values[reliable.index.get_level_values(0), reliable.index.get_level_values(1)] = reliable.values
+    
+    return {
+        'band_edges': band_edges,
+        'index': {name: i for i, name in enumerate(ilce_uniques)},
+        'levels': tuple(levels),
+        'values': values,
+        'counts': cell_counts
+    }
+
+def lookup_uncertainty(table, ilce, prediction):
+    """Her tahmin için (ilçe, fiyat bandı) hücresinden göreli hata çeyrekliklerini döndür"""
+    rows = lookup_codes(np.asarray(ilce), table['index'], len(table['values']) - 1)
+    band = np.searchsorted(table['band_edges'], prediction, side='right')
+    return table['values'][rows, band]
+
+# Toplu tahmin için gerekli girdi sütunları
+INPUT_COLUMNS = ['ilce', 'mahalle', 'metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat']
+# Model paketinde saklanan eğitim/test bölmesinin sütunları
+SPLIT_COLUMNS = INPUT_COLUMNS + ['fiyat']
+
+def to_input_frame(data):
+    """DataFrame, Arrow tablosu, NumPy kayıt dizisi veya sözlük listesini girdi DataFrame'ine çevir"""
+    if isinstance(data, pd.DataFrame):
+        frame = data
+    elif hasattr(data, 'to_pandas'):  # pyarrow.Table / RecordBatch
+        frame = data.to_pandas()
+    elif isinstance(data, np.ndarray) and data.dtype.names is not None:  # Kayıt dizisi
+        frame = pd.DataFrame.from_records(data)
+    else:
+        frame = pd.DataFrame(data)
+    
+    missing = [col for col in INPUT_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Eksik girdi sütunları: {missing}")
+    frame = frame[INPUT_COLUMNS].reset_index(drop=True)
+    # Kategorileri metin, sayısal sütunları float olarak sabitle
+    return frame.astype({'ilce': object, 'mahalle': object, 'metrekare': np.float64, 'oda_sayisi': np.float64,
+                         'yas': np.float64, 'bulundugu_kat': np.float64})
+
+def feature_hash(feature_names):
+    """Özellik isimleri ve sırasının SHA-256 özeti"""
+    return hashlib.sha256('\n'.join(feature_names).encode('utf-8')).hexdigest()
+
+def read_bundle_manifest(model_dir='models'):
+    """Model paketinin manifestini oku (paket yoksa None)"""
+    path = os.path.join(model_dir, MODEL_BUNDLE_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def has_trained_model(model_dir='models'):
+    """Eğitilmiş model var mı (versiyonlu paket veya eski ayrı dosyalar)"""
+    return (os.path.exists(os.path.join(model_dir, MODEL_BUNDLE_MANIFEST))
+            or os.path.exists(os.path.join(model_dir, 'konut_fiyat_model.pkl')))
+
+def save_model_bundle(artifacts, model_dir='models', keep=2):
+    """Tahmin dosyalarını tek versiyonlu pakete kaydet ve manifesti döndür
+    
+    Yük sıkıştırılmadan yazılır (NumPy dizileri bellek eşlemeli açılabilir). Önce yeni yük dosyası,
+    sonra manifest atomik olarak yazılır; okuyucular her zaman tutarlı bir çift görür. Okumakta
+    olan süreçler için son `keep` yük dosyası saklanır, eski ayrı model dosyaları silinir.
+    """
+    missing = [key for key in MODEL_BUNDLE_KEYS if key not in artifacts]
+    if missing:
+        raise ValueError(f"Model paketinde eksik parçalar: {missing}")
+    os.makedirs(model_dir, exist_ok=True)
+    
+    payload = {key: artifacts[key] for key in MODEL_BUNDLE_KEYS}
+    payload.update({key: artifacts[key] for key in MODEL_BUNDLE_OPTIONAL_KEYS if artifacts.get(key) is not None})
+    metrics = payload['performance_metrics']
+    version = pd.Timestamp.now().strftime('%Y%m%dT%H%M%S%f')
+    payload_name = f'bundle-{version}.joblib'
+    _atomic_dump(payload, os.path.join(model_dir, payload_name))
+    
+    manifest = {
+        'schema_version': MODEL_BUNDLE_SCHEMA_VERSION,
+        'bundle_version': version,
+        'payload': payload_name,
+        'payload_size': os.path.getsize(os.path.join(model_dir, payload_name)),
+        'feature_hash': feature_hash(payload['feature_names']),
+        'n_features': len(payload['feature_names']),
+        'model_type': type(payload['model']).__name__,
+        'inference_backend': 'compiled' if 'compiled_model' in payload else 'sklearn',
+        # Hiperparametre aramasının kazanan yapılandırması (elle ayarlı modellerde None)
+        'hyperparameter_search': metrics.get('hyperparameter_search'),
+        # Damıtılmış öğrenci modelin öğretmene sadakati ve hızı (yoksa None)
+        'student': payload['student_model'].report if 'student_model' in payload else None,
+        'training_date': metrics.get('training_date'),
+        'last_update_date': metrics.get('last_update_date'),
+        'metrics': {key: float(metrics[key]) for key in ('r2_score', 'rmse', 'mae', 'mape') if key in metrics},
+        # Arayüzün modeli açmadan okuduğu ilçe listesi, ilçe-mahalle haritası ve fiyat aralığı
+        'metadata': payload['metadata']
+    }
+    manifest_path = os.path.join(model_dir, MODEL_BUNDLE_MANIFEST)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    
+    # Eski yük dosyalarını ve paket öncesi ayrı dosyaları temizle
+    payloads = sorted(name for name in os.listdir(model_dir)
+                      if name.startswith('bundle-') and name.endswith('.joblib'))
+    for name in payloads[:-keep]:
+        os.remove(os.path.join(model_dir, name))
+    for name in LEGACY_MODEL_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    return manifest
+
+def _load_legacy_artifacts(model_dir):
+    """Paket öncesi ayrı dosyalardan aynı yapıda sözlük oluştur (eski model klasörleri)"""
+    def optional(name):
+        path = os.path.join(model_dir, f'{name}.pkl')
+        return joblib.load(path) if os.path.exists(path) else None
+    
+    feature_names = joblib.load(os.path.join(model_dir, 'feature_names.pkl'))
+    return {
+        'model': joblib.load(os.path.join(model_dir, 'konut_fiyat_model.pkl')),
+        'scaler': joblib.load(os.path.join(model_dir, 'scaler.pkl')),
+        'feature_names': feature_names,
+        'feature_plan': load_feature_plan(model_dir, feature_names),
+        'encoding_tables': optional('encoding_tables'),
+        'uncertainty_table': optional('uncertainty_table'),
+        'confidence_params': optional('confidence_params'),
+        'performance_metrics': optional('performance_metrics'),
+        'metadata': load_metadata(model_dir),
+        'compiled_model': None,
+        'student_model': None,
+        'training_split': None,
+        'manifest': None
+    }
+
+def load_model_bundle(model_dir='models', mmap_mode='r'):
+    """Versiyonlu model paketini doğrulayıp yükle
+    
+    Şema sürümü, yük dosyası boyutu, parça listesi ve özellik özeti bir kez kontrol edilir;
+    uyuşmazlıkta ValueError verilir. mmap_mode='r' ile büyük diziler kopyalanmadan açılır
+    (salt okunur); modeli değiştirecek çağıranlar mmap_mode=None kullanmalıdır. Paket yoksa
+    eski ayrı dosyalar yüklenir. Sonuç sözlüğünde manifest 'manifest' anahtarındadır.
+    """
+    manifest = read_bundle_manifest(model_dir)
+    if manifest is None:
+        return _load_legacy_artifacts(model_dir)
+    
+    if manifest.get('schema_version') != MODEL_BUNDLE_SCHEMA_VERSION:
+        raise ValueError(f"Desteklenmeyen model paketi şeması: {manifest.get('schema_version')} "
+                         f"(beklenen {MODEL_BUNDLE_SCHEMA_VERSION})")
+    payload_path = os.path.join(model_dir, manifest['payload'])
+    if os.path.getsize(payload_path) != manifest['payload_size']:
+        raise ValueError(f"Model paketi boyutu manifest ile uyuşmuyor: {manifest['payload']}")
+    
+    artifacts = joblib.load(payload_path, mmap_mode=mmap_mode)
+    missing = [key for key in MODEL_BUNDLE_KEYS if key not in artifacts]
+    if missing:
+        raise ValueError(f"Model paketinde eksik parçalar: {missing}")
+    if feature_hash(artifacts['feature_names']) != manifest['feature_hash']:
+        raise ValueError("Model paketindeki özellik isimleri manifest ile uyuşmuyor")
+    if artifacts['feature_plan'].feature_names != list(artifacts['feature_names']):
+        raise ValueError("Özellik planı ile özellik isimleri uyuşmuyor")
+    for key in MODEL_BUNDLE_OPTIONAL_KEYS:
+        artifacts.setdefault(key, None)
+    artifacts['manifest'] = manifest
+    return artifacts
+
+class KonutFiyatTahminci:
+    """Model dosyalarını bir kez yükleyip bellekte tutan kalıcı tahmin motoru
+    
+    Model, scaler ve kodlama tabloları ilk kullanımda versiyonlu paketten yüklenir; paket
+    manifesti (eski model klasörlerinde models/ dosyaları) değiştiğinde motor kendini
+    otomatik olarak yeniden yükler.
+    
+    backend='compiled' (varsayılan, KONUT_INFERENCE_BACKEND ortam değişkeniyle değiştirilebilir)
+    iken pakette derlenmiş ağaç motoru varsa compiled_max_rows satıra kadar olan parçalar onunla,
+    daha büyükleri orijinal modelle tahmin edilir. backend='sklearn' her zaman orijinal modeli,
+    backend='student' damıtılmış öğrenci modeli kullanır (pakette yoksa ensemble'a dönülür).
+    predict_batch çağrısı başına da motor seçilebilir.
+    """
+    
+    def __init__(self, model_dir='models', auto_reload=True, reload_check_interval=1.0, backend=None,
+                 compiled_max_rows=COMPILED_MAX_ROWS):
+        self.backend = backend or os.environ.get('KONUT_INFERENCE_BACKEND', 'compiled')
+        if self.backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Bilinmeyen tahmin motoru: {self.backend} (seçenekler: {INFERENCE_BACKENDS})")
+        self.compiled_max_rows = compiled_max_rows
+        self.model_dir = model_dir
+        self.auto_reload = auto_reload
+        self.reload_check_interval = reload_check_interval  # Saniye cinsinden dosya kontrol aralığı
+        self._lock = threading.RLock()
+        self._signature = None
+        self._last_check = 0.0
+        self.load()
+    
+    def _path(self, filename):
+        return os.path.join(self.model_dir, filename)
+    
+    def _file_signature(self):
+        """Paket manifestinin, o yoksa models/ klasöründeki dosyaların (isim, değişiklik zamanı, boyut) imzası"""
         try:
-            # Mahalle istatistiklerini hesapla
-            mahalle_target_stats = df.groupby('mahalle')['fiyat'].agg([
-                'mean', 'median', 'std', 'count', 'min', 'max',
-                lambda x: x.quantile(0.25),  # Q1
-                lambda x: x.quantile(0.75)   # Q3
-            ]).reset_index()
-            mahalle_target_stats.columns = ['mahalle', 'mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75']
-            
-            # Smoothed mean hesapla
-            mahalle_target_stats['smoothed_mean'] = (
-                (mahalle_target_stats['count'] * mahalle_target_stats['mean'] + smoothing_factor * global_mean) / 
-                (mahalle_target_stats['count'] + smoothing_factor)
-            )
-            
-            temp_mahalle = input_df.merge(mahalle_target_stats, on='mahalle', how='left')
-            for col in ['mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75', 'smoothed_mean']:
-                if col in temp_mahalle.columns:
-                    default_val = global_mean if col in ['mean', 'median', 'min', 'max', 'q25', 'q75', 'smoothed_mean'] else (global_std if col == 'std' else 1)
-                    input_df[f'mahalle_target_{col}'] = temp_mahalle[col].fillna(default_val)
-                else:
-                    default_val = global_mean if col in ['mean', 'median', 'min', 'max', 'q25', 'q75', 'smoothed_mean'] else (global_std if col == 'std' else 1)
-                    input_df[f'mahalle_target_{col}'] = default_val
-        except:
-            # Eğer merge başarısızsa varsayılan değerler kullan
-            for col in ['mean', 'median', 'std', 'count', 'min', 'max', 'q25', 'q75', 'smoothed_mean']:
-                default_val = global_mean if col in ['mean', 'median', 'min', 'max', 'q25', 'q75', 'smoothed_mean'] else (global_std if col == 'std' else 1)
-                input_df[f'mahalle_target_{col}'] = default_val
-        
-        # Özellik mühendisliği
-        X_numerical = create_features(input_df)
-        
-        # Gelişmiş target encoding özelliklerini al
-        target_encoding_cols = [
-            'ilce_target_mean', 'ilce_target_median', 'ilce_target_std',
-            'ilce_target_count', 'ilce_target_min', 'ilce_target_max', 
-            'ilce_target_q25', 'ilce_target_q75', 'ilce_target_smoothed',
-            'mahalle_target_mean', 'mahalle_target_median', 'mahalle_target_std',
-            'mahalle_target_count', 'mahalle_target_min', 'mahalle_target_max',
-            'mahalle_target_q25', 'mahalle_target_q75', 'mahalle_target_smoothed'
-        ]
-        
-        # Eksik sütunları 0 ile doldur (eski model uyumluluğu için)
-        for col in target_encoding_cols:
-            if col not in input_df.columns:
-                input_df[col] = global_mean if 'mean' in col or 'median' in col or 'smoothed' in col else global_std if 'std' in col else 1 if 'count' in col else global_mean
-        
-        X_target_encoded = input_df[target_encoding_cols]
-        
-        # Kategorik özellikleri one-hot encoding ile dönüştür
-        categorical_cols = ['ilce', 'mahalle']
-        X_categorical = pd.get_dummies(input_df[categorical_cols], drop_first=True)
-        
-        # Tüm özellikleri birleştir
-        X_combined = pd.concat([X_numerical, X_target_encoded, X_categorical], axis=1)
-        
-        # One-hot encoding'te eksik olan sütunları 0 olarak doldurmak için boş bir DataFrame oluştur
-        missing_cols = set(feature_names) - set(X_combined.columns)
-        missing_df = pd.DataFrame(0, index=X_combined.index, columns=list(missing_cols))
-        
-        # Tüm özellikleri birleştir
-        X = pd.concat([X_combined, missing_df], axis=1)
-        
-        # Özellikleri model için sırala
-        X = X.reindex(columns=feature_names, fill_value=0)
-        
-        # Özellikleri ölçeklendir
-        X_scaled = scaler.transform(X)
-        
-        # Tahmin yap
-        prediction = model.predict(X_scaled)[0]
-        
-        # Negatif fiyatları düzelt
-        prediction = max(0, prediction)
-        
-        # YENİ: Bootstrap tabanlı güven aralığı hesaplama (eğer varsa)
+            manifest = os.stat(self._path(MODEL_BUNDLE_MANIFEST))
+            return (MODEL_BUNDLE_MANIFEST, manifest.st_mtime_ns, manifest.st_size)
+        except FileNotFoundError:
+            pass
         try:
-            confidence_params = joblib.load('models/confidence_params.pkl')
-            bootstrap_predictions = confidence_params['bootstrap_predictions']
-            prediction_std = confidence_params['prediction_std']
-            mean_uncertainty = confidence_params['mean_uncertainty']
+            return tuple(sorted(
+                (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                for entry in os.scandir(self.model_dir) if entry.is_file()
+            ))
+        except FileNotFoundError:
+            return ()
+    
+    def load(self):
+        """Model dosyalarını yükle ve tüm arama tablolarını önceden hesapla"""
+        with self._lock:
+            signature = self._file_signature()
             
-            # Tek bir tahmin için belirsizlik tahmini
-            # Ortalama belirsizliği kullanarak güven aralığı hesapla
-            single_prediction_uncertainty = mean_uncertainty
+            artifacts = load_model_bundle(self.model_dir)
+            self.manifest = artifacts['manifest']
+            self.model = artifacts['model']
+            self.compiled_model = artifacts['compiled_model']
+            self.student_model = artifacts['student_model']
+            if self.backend == 'student' and self.student_model is None:
+                print("⚠️ Model paketinde öğrenci model yok, ensemble kullanılacak (python model.py --distill)")
+            self.scaler = artifacts['scaler']
+            self.feature_names = artifacts['feature_names']
+            self.price_range = artifacts['metadata']['price_range']
             
-            # %68 güven aralığı (1 sigma)
-            lower_bound = max(0, prediction - single_prediction_uncertainty)
-            upper_bound = prediction + single_prediction_uncertainty
+            # İlan bazlı belirsizlik tablosu; eski model klasörlerinde bootstrap ortalama
+            # belirsizliği, o da yoksa sabit oranlı güven aralığı kullanılır
+            self.uncertainty_table = artifacts['uncertainty_table']
+            confidence_params = artifacts['confidence_params']
+            if self.uncertainty_table is None and confidence_params is not None:
+                self.mean_uncertainty = confidence_params['mean_uncertainty']
+            else:
+                self.mean_uncertainty = None
             
-            # %95 güven aralığı (2 sigma) - daha geniş
-            lower_bound_95 = max(0, prediction - 2 * single_prediction_uncertainty)
-            upper_bound_95 = prediction + 2 * single_prediction_uncertainty
+            # Eğitimle aynı derlenmiş özellik planı (sütun sırası feature_names'e sabit)
+            self.feature_plan = artifacts['feature_plan']
             
-            confidence_interval = single_prediction_uncertainty
-            reliability_score = 1.0 - (single_prediction_uncertainty / prediction) if prediction > 0 else 0.5
+            # İlçe/mahalle kodlama tabloları eğitimde kaydedilir; eski model klasörlerinde
+            # tablo dosyası yoksa veri setinden bir kez hesaplanır
+            if artifacts['encoding_tables'] is not None:
+                self.encoding_tables = artifacts['encoding_tables']
+            else:
+                df = get_data_context().frame()
+                if df is None:
+                    raise RuntimeError("Kodlama tabloları için veri seti yüklenemedi")
+                self.encoding_tables = build_encoding_tables(df)
             
-        except FileNotFoundError:
+            self._signature = signature
+            self._last_check = time.monotonic()
+    
+    def _maybe_reload(self):
+        """Dosyalar değiştiyse modeli yeniden yükle (kontroller belirli aralıklarla yapılır)"""
+        if not self.auto_reload:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.reload_check_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            if self._file_signature() != self._signature:
+                print("🔄 Model dosyaları değişti, tahmin motoru yeniden yükleniyor...")
+                self.load()
+    
+    def _build_model_input(self, input_df, scaler):
+        """Girdi satırlarından modelin beklediği sırada ölçeklenmiş (yoğun + seyrek) girdiyi oluştur"""
+        return self.feature_plan.model_input(attach_encodings(input_df, self.encoding_tables), scaler)
+    
+    def _select_model(self, backend, n_rows):
+        """Parça için tahmin modeli: öğrenci, derlenmiş ağaç motoru veya orijinal ensemble"""
+        if backend == 'student' and self.student_model is not None:
+            return self.student_model
+        if backend != 'sklearn' and self.compiled_model is not None and n_rows <= self.compiled_max_rows:
+            return self.compiled_model
+        return self.model
+    
+    def predict_batch(self, data, chunk_size=50000, backend=None):
+        """Çok sayıda konut için tek geçişte vektörel fiyat tahmini
+        
+        Girdi DataFrame, pyarrow tablosu veya NumPy kayıt dizisi olabilir. Sonuç,
+        predict_price ile aynı alanları sütun olarak içeren bir DataFrame'dir. backend
+        verilirse motorun varsayılan tahmin modeli yerine kullanılır ('student' istenip
+        pakette öğrenci model yoksa ValueError).
+        """
+        if backend is not None and backend not in INFERENCE_BACKENDS:
+            raise ValueError(f"Bilinmeyen tahmin motoru: {backend} (seçenekler: {INFERENCE_BACKENDS})")
+        self._maybe_reload()
+        input_df = to_input_frame(data)
+        with self._lock:
+            if backend == 'student' and self.student_model is None:
+                raise ValueError("Model paketinde öğrenci model yok (python model.py --distill)")
+            backend = backend or self.backend
+            scaler, price_range = self.scaler, self.price_range
+            uncertainty_table, mean_uncertainty = self.uncertainty_table, self.mean_uncertainty
+            # Yoğun blok belleğini sınırlamak için parçalar halinde işlenir
+            predictions = []
+            for start in range(0, len(input_df), chunk_size):
+                X = self._build_model_input(input_df.iloc[start:start + chunk_size], scaler)
+                predictions.append(self._select_model(backend, X.shape[0]).predict(X))
+        
+        # Negatif fiyatları düzelt
+        prediction = np.maximum(0, np.concatenate(predictions) if predictions else np.empty(0))
+        
+        if uncertainty_table is not None:
+            # (ilçe, fiyat bandı) hücresinin kalibre edilmiş göreli hata çeyreklikleri
+            relative_error = lookup_uncertainty(uncertainty_table, input_df['ilce'].values, prediction)
+            confidence_interval = prediction * relative_error[:, 0]
+            confidence_interval_95 = prediction * relative_error[:, -1]
+            reliability_score = np.where(prediction > 0, 1.0 - relative_error[:, 0], 0.5)
+        elif mean_uncertainty is not None:
+            # Bootstrap tabanlı ortalama belirsizlik ile güven aralığı
+            confidence_interval = np.full_like(prediction, mean_uncertainty)
+            confidence_interval_95 = 2 * confidence_interval
+            with np.errstate(divide='ignore', invalid='ignore'):
+                reliability_score = np.where(prediction > 0, 1.0 - confidence_interval / prediction, 0.5)
+        else:
             # Bootstrap verileri yoksa eski yöntemi kullan
             confidence_interval = prediction * 0.15
-            lower_bound = max(0, prediction - confidence_interval)
-            upper_bound = prediction + confidence_interval
-            lower_bound_95 = max(0, prediction - 2 * confidence_interval)
-            upper_bound_95 = prediction + 2 * confidence_interval
-            reliability_score = 0.8
-        
-        # Tahmin güvenilirliğini değerlendir
-        reliability = "Yüksek"
-        warning = None
-        
-        # Fiyat aralığı dışında mı kontrol et
-        if prediction < price_range['q5'] or prediction > price_range['q95']:
-            reliability = "Düşük"
-            reliability_score = max(0.2, reliability_score * 0.4)
-            warning = "Tahmin edilen fiyat normal fiyat aralığının dışında."
-        elif prediction < price_range['q1'] * 0.8 or prediction > price_range['q3'] * 1.2:
-            reliability = "Orta"
-            reliability_score = max(0.5, reliability_score * 0.7)
-            warning = "Tahmin edilen fiyat normal fiyat aralığının sınırlarında."
-        
-        result = {
+            confidence_interval_95 = 2 * confidence_interval
+            reliability_score = np.full_like(prediction, 0.8)
+        
+        # %68 ve %95 güven aralıkları
+        lower_bound = np.maximum(0, prediction - confidence_interval)
+        upper_bound = prediction + confidence_interval
+        lower_bound_95 = np.maximum(0, prediction - confidence_interval_95)
+        upper_bound_95 = prediction + confidence_interval_95
+        
+        # Fiyat aralığı dışında veya sınırlarında mı kontrol et
+        outside = (prediction < price_range['q5']) | (prediction > price_range['q95'])
+        edge = ~outside & ((prediction < price_range['q1'] * 0.8) | (prediction > price_range['q3'] * 1.2))
+        reliability = np.select([outside, edge], ["Düşük", "Orta"], default="Yüksek")
+        reliability_score = np.select(
+            [outside, edge],
+            [np.maximum(0.2, reliability_score * 0.4), np.maximum(0.5, reliability_score * 0.7)],
+            default=reliability_score
+        )
+        warning = np.select(
+            [outside, edge],
+            ["Tahmin edilen fiyat normal fiyat aralığının dışında.",
+             "Tahmin edilen fiyat normal fiyat aralığının sınırlarında."],
+            default=None
+        )
+        prediction_quality = np.select([reliability_score > 0.8, reliability_score > 0.5], ['Yüksek', 'Orta'],
+                                       default='Düşük')
+        
+        return pd.DataFrame({
             'prediction': prediction,
             'lower_bound': lower_bound,
             'upper_bound': upper_bound,
@@ -1020,52 +2483,367 @@ def predict_price(features_dict):
             'reliability': reliability,
             'reliability_score': reliability_score,
             'warning': warning,
-            'price_per_m2': prediction / features_dict['metrekare'],
-            'prediction_quality': 'Yüksek' if reliability_score > 0.8 else 'Orta' if reliability_score > 0.5 else 'Düşük'
-        }
-        
+            'price_per_m2': prediction / input_df['metrekare'].values,
+            'prediction_quality': prediction_quality
+        }, index=data.index if isinstance(data, pd.DataFrame) else None)
+    
+    def predict(self, features_dict, backend=None):
+        """Tek bir konut için fiyat tahmini ve güvenilirlik bilgisi döndür"""
+        result = self.predict_batch(pd.DataFrame([features_dict]), backend=backend).iloc[0].to_dict()
+        # Tekil tahminde sayısal alanlar Python float olarak döner
+        for key, value in result.items():
+            if isinstance(value, np.floating):
+                result[key] = float(value)
         return result
+
+# Süreç boyunca paylaşılan tahmin motoru (ilk tahminde oluşturulur)
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    """Paylaşılan tahmin motorunu döndür, yoksa oluştur"""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = KonutFiyatTahminci()
+    return _predictor
+
+def predict_price(features_dict, backend=None):
+    """Konut fiyatını tahmin et ve güvenilirlik bilgisi döndür (backend: 'compiled', 'sklearn' veya 'student')"""
+    try:
+        return get_predictor().predict(features_dict, backend=backend)
     except Exception as e:
         print(f"Tahmin hatası: {e}")
         import traceback
         traceback.print_exc()
         return None
 
+def predict_price_batch(data, chunk_size=50000, backend=None):
+    """Konut listesi için toplu fiyat tahmini (DataFrame, Arrow tablosu veya NumPy kayıt dizisi)"""
+    try:
+        return get_predictor().predict_batch(data, chunk_size=chunk_size, backend=backend)
+    except Exception as e:
+        print(f"Toplu tahmin hatası: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def prediction_records(frame):
+    """predict_batch çıktısını ilan başına sözlük listesine çevir (eksik değerler None olur)"""
+    records = frame.to_dict('records')
+    for record in records:
+        for key, value in record.items():
+            if isinstance(value, float) and np.isnan(value):
+                record[key] = None
+    return records
+
+def _bucket_label(low, high):
+    return str(low) if low == high else f'{low}-{high}'
+
+class BatchingStats:
+    """Mikro-toplu kuyruğun gecikme yüzdelikleri ve grup boyutu histogramı (iş parçacığı güvenli)
+    
+    Sayaçlar sıfırlanana kadar birikir; yüzdelikler son history_size isteğin gecikmelerinden hesaplanır.
+    Grup boyutu kovaları 2'nin kuvvetleridir (1, 2-3, 4-7, ..., max_batch_size).
+    """
+    
+    def __init__(self, max_batch_size, history_size=10000):
+        self.max_batch_size = max_batch_size
+        self.history_size = history_size
+        lows = [1]
+        while lows[-1] * 2 <= max_batch_size:
+            lows.append(lows[-1] * 2)
+        self.bucket_lows = np.array(lows)
+        self.bucket_labels = [_bucket_label(low, min(2 * low - 1, max_batch_size)) for low in lows]
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Tüm sayaçları ve gecikme geçmişini sıfırla"""
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.n_requests = 0
+            self.n_batches = 0
+            self.n_rejected = 0
+            self.n_failed = 0
+            self.batch_size_counts = np.zeros(len(self.bucket_lows), dtype=np.int64)
+            self._queue_wait = deque(maxlen=self.history_size)
+            self._latency = deque(maxlen=self.history_size)
+            self._predict_time = deque(maxlen=self.history_size)
+    
+    def record_batch(self, queue_waits, predict_time, failed=False):
+        """Bir grubun istek başına kuyruk bekleme süreleri ve model çağrısı süresi (saniye)"""
+        with self._lock:
+            self.n_batches += 1
+            self.n_requests += len(queue_waits)
+            if failed:
+                self.n_failed += len(queue_waits)
+            self.batch_size_counts[np.searchsorted(self.bucket_lows, len(queue_waits), side='right') - 1] += 1
+            self._queue_wait.extend(queue_waits)
+            self._latency.extend(wait + predict_time for wait in queue_waits)
+            self._predict_time.append(predict_time)
+    
+    def record_rejected(self):
+        with self._lock:
+            self.n_rejected += 1
+    
+    @staticmethod
+    def _percentiles_ms(values, levels=(50, 90, 95, 99)):
+        if not values:
+            return None
+        values = np.fromiter(values, dtype=np.float64) * 1000
+        summary = {f'p{level}': float(p) for level, p in zip(levels, np.percentile(values, levels))}
+        summary['max'] = float(values.max())
+        return summary
+    
+    def snapshot(self):
+        """Anlık istatistikler: sayaçlar, gecikme yüzdelikleri (ms) ve grup boyutu histogramı"""
+        with self._lock:
+            elapsed = time.monotonic() - self.started_at
+            return {
+                'requests': self.n_requests,
+                'batches': self.n_batches,
+                'rejected': self.n_rejected,
+                'failed': self.n_failed,
+                'mean_batch_size': self.n_requests / self.n_batches if self.n_batches else None,
+                'requests_per_second': self.n_requests / elapsed if elapsed > 0 else None,
+                'queue_wait_ms': self._percentiles_ms(self._queue_wait),
+                'latency_ms': self._percentiles_ms(self._latency),
+                'predict_ms': self._percentiles_ms(self._predict_time),
+                'batch_size_histogram': dict(zip(self.bucket_labels, self.batch_size_counts.tolist()))
+            }
+
+class MicroBatcher:
+    """Eşzamanlı tekil tahmin isteklerini tek model çağrısında işleyen mikro-toplu kuyruk
+    
+    Topluluk modelinin predict çağrısı bir ilan için de birkaç yüz ilan için de yaklaşık aynı
+    sürer. Kuyruktaki istekler en fazla max_batch_size ilan veya ilk istekten sonra max_wait_ms
+    milisaniye dolana kadar toplanır. Ardından tek predict_batch çağrısıyla (tek scaler.transform
+    ve model.predict) tahmin edilir ve sonuçlar Future'lar üzerinden isteklere dağıtılır. Kuyruk
+    doluysa submit queue.Full verir.
+    """
+    
+    def __init__(self, predictor=None, max_batch_size=256, max_wait_ms=25.0, max_queue_size=4096,
+                 history_size=10000):
+        self.predictor = predictor if predictor is not None else get_predictor()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = BatchingStats(max_batch_size, history_size)
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='mikro-toplu-tahmin', daemon=True)
+        self._thread.start()
+    
+    def qsize(self):
+        return self._queue.qsize()
+    
+    def submit(self, features_dict):
+        """İlanı kuyruğa ekle; predict_price ile aynı alanları taşıyan sonucun Future'ını döndür"""
+        if self._closed:
+            raise RuntimeError("Mikro-toplu kuyruk kapatıldı")
+        future = Future()
+        try:
+            self._queue.put_nowait((features_dict, future, time.perf_counter()))
+        except queue.Full:
+            self.stats.record_rejected()
+            raise
+        return future
+    
+    def predict(self, features_dict, timeout=None):
+        """Tek ilanı kuyruk üzerinden tahmin et ve sonucu bekle"""
+        return self.submit(features_dict).result(timeout)
+    
+    def close(self, timeout=None):
+        """Kuyruktaki istekler işlendikten sonra işleyici iş parçacığını durdur"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+    
+    def _collect(self):
+        """İlk isteği bekle, ardından boyut veya süre sınırına kadar istek topla (kapatıldıysa None)"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Bu grup işlendikten sonra durulur
+                break
+            batch.append(item)
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # İptal edilmiş istekler (ör. bağlantısı kapanan istemciler) tahmin edilmez
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            queue_waits = [start - submitted for _, _, submitted in batch]
+            try:
+                records = prediction_records(self.predictor.predict_batch(pd.DataFrame([item[0] for item in batch])))
+            except Exception as e:
+                self.stats.record_batch(queue_waits, time.perf_counter() - start, failed=True)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.stats.record_batch(queue_waits, time.perf_counter() - start)
+            for (_, future, _), record in zip(batch, records):
+                future.set_result(record)
+
+def compute_ilce_mahalle_map(df):
+    """Her ilçe için sıralı mahalle listesi (tekil ilçe-mahalle çiftleri üzerinde tek gruplama)"""
+    pairs = df[['ilce', 'mahalle']].drop_duplicates().sort_values(['ilce', 'mahalle'])
+    return pairs.groupby('ilce', sort=False)['mahalle'].agg(list).to_dict()
+
+def merge_ilce_mahalle_maps(base, extra):
+    """İki ilçe-mahalle haritasını birleştir (mahalle listeleri sıralı ve tekil kalır)"""
+    merged = dict(base)
+    for ilce, mahalleler in extra.items():
+        merged[ilce] = sorted(set(merged.get(ilce, [])) | set(mahalleler))
+    return dict(sorted(merged.items()))
+
+def build_metadata(ilce_mahalle_map, price_range):
+    """Tahmin ve arayüz için gereken küçük yapıları tek sözlükte topla"""
+    return {
+        'unique_ilce': sorted(ilce_mahalle_map),
+        'ilce_mahalle_map': ilce_mahalle_map,
+        'price_range': price_range
+    }
+
+def load_metadata(model_dir='models'):
+    """Meta veriyi paket manifestinden oku (model açılmaz); eski model klasörlerinde pickle dosyalarından oluştur"""
+    manifest = read_bundle_manifest(model_dir)
+    if manifest is not None:
+        return manifest['metadata']
+    path = os.path.join(model_dir, os.path.basename(METADATA_FILE))
+    if os.path.exists(path):
+        return joblib.load(path)
+    # Eski model klasörleri: ayrı pickle dosyaları (harita yoksa veri setinden oluşturulur)
+    price_range = joblib.load(os.path.join(model_dir, 'price_range.pkl'))
+    map_path = os.path.join(model_dir, 'ilce_mahalle_map.pkl')
+    ilce_mahalle_map = joblib.load(map_path) if os.path.exists(map_path) else get_data_context().ilce_mahalle_map()
+    return build_metadata(ilce_mahalle_map, price_range)
+
+def compute_district_stats(df):
+    """İlçe bazında fiyat istatistikleri sözlüğü (ortalama, medyan, min, max, sayı, std, m² fiyatı)"""
+    # Fiyat ve metrekare başına fiyat istatistikleri tek gruplu geçişte (paylaşılan veri çerçevesi değiştirilmez)
+    grouped = df['fiyat'].groupby(df['ilce'])
+    district_stats = grouped.agg(['mean', 'median', 'min', 'max', 'count', 'std']).astype(float)
+    district_stats['price_per_sqm'] = (df['fiyat'] / df['metrekare']).groupby(df['ilce']).mean()
+    district_stats = district_stats.sort_values('mean', ascending=False)
+    
+    # Sonuçları ortalama fiyata göre azalan sırada sözlük olarak döndür
+    result = district_stats.to_dict('index')
+    for stats in result.values():
+        stats['count'] = int(stats['count'])
+    return result
+
+class DataContext:
+    """Süreç boyunca paylaşılan veri bağlamı
+    
+    Temizlenmiş veri seti ilk kullanımda bir kez yüklenir; ilçe istatistikleri ve ilçe-mahalle
+    haritası gibi türetilmiş görünümler ilk istendiklerinde hesaplanıp saklanır. Veri dosyası
+    değişirse tüm görünümler geçersiz sayılır. Paylaşılan veri çerçevesi değiştirilmemelidir.
+    """
+    
+    def __init__(self, source_path=DATA_FILE):
+        self.source_path = source_path
+        self._lock = threading.RLock()
+        self._df = None
+        self._views = {}
+        self._signature = None
+    
+    def _source_signature(self):
+        try:
+            stat = os.stat(self.source_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
+    def invalidate(self):
+        """Yüklenmiş veriyi ve tüm türetilmiş görünümleri bırak (sonraki erişimde yeniden yüklenir)"""
+        with self._lock:
+            self._df = None
+            self._views = {}
+    
+    def frame(self):
+        """Temizlenmiş veri seti (yüklenemezse None; başarısız yükleme saklanmaz)"""
+        with self._lock:
+            signature = self._source_signature()
+            if self._df is not None and signature != self._signature:
+                print("🔄 Veri dosyası değişti, veri bağlamı yenileniyor...")
+                self.invalidate()
+            if self._df is None:
+                self._df = load_and_preprocess_data()
+                self._signature = signature
+            return self._df
+    
+    def view(self, name, compute):
+        """Veri setinden türetilen görünümü bir kez hesapla ve sakla"""
+        with self._lock:
+            df = self.frame()
+            if df is None:
+                return None
+            if name not in self._views:
+                self._views[name] = compute(df)
+            return self._views[name]
+    
+    def district_stats(self):
+        return self.view('district_stats', compute_district_stats)
+    
+    def ilce_mahalle_map(self):
+        return self.view('ilce_mahalle_map', compute_ilce_mahalle_map)
+    
+    def unique_ilce(self):
+        return self.view('unique_ilce', lambda df: sorted(self.ilce_mahalle_map()))
+
+# Süreç boyunca paylaşılan veri bağlamı (ilk erişimde oluşturulur)
+_data_context = None
+_data_context_lock = threading.Lock()
+
+def get_data_context():
+    """Paylaşılan veri bağlamını döndür, yoksa oluştur"""
+    global _data_context
+    if _data_context is None:
+        with _data_context_lock:
+            if _data_context is None:
+                _data_context = DataContext()
+    return _data_context
+
 def get_available_features():
     """Kullanılabilir özellikleri döndür"""
     try:
-        if os.path.exists('models/unique_ilce.pkl'):
-            unique_ilce = joblib.load('models/unique_ilce.pkl')
-            
-            # İlçe-mahalle ilişkisini kontrol et
-            if os.path.exists('models/ilce_mahalle_map.pkl'):
-                ilce_mahalle_map = joblib.load('models/ilce_mahalle_map.pkl')
-            else:
-                # Model kaydedilmiş ama ilçe-mahalle haritası yoksa yeniden oluştur
-                df = load_and_preprocess_data()
-                ilce_mahalle_map = {}
-                for ilce in df['ilce'].unique():
-                    ilce_mahalle_map[ilce] = sorted(df[df['ilce'] == ilce]['mahalle'].unique().tolist())
-                
-                # Haritayı kaydet
-                joblib.dump(ilce_mahalle_map, 'models/ilce_mahalle_map.pkl')
-            
+        try:
+            metadata = load_metadata()
+        except FileNotFoundError:
+            metadata = None
+        
+        if metadata is not None:
             return {
-                'ilce': unique_ilce,
-                'ilce_mahalle_map': ilce_mahalle_map
+                'ilce': metadata['unique_ilce'],
+                'ilce_mahalle_map': metadata['ilce_mahalle_map']
             }
         else:
             # Model henüz eğitilmemişse veri setinden al
-            df = load_and_preprocess_data()
-            if df is not None:
-                # İlçe-mahalle haritasını oluştur
-                ilce_mahalle_map = {}
-                for ilce in df['ilce'].unique():
-                    ilce_mahalle_map[ilce] = sorted(df[df['ilce'] == ilce]['mahalle'].unique().tolist())
-                
+            context = get_data_context()
+            if context.frame() is not None:
                 return {
-                    'ilce': sorted(df['ilce'].unique().tolist()),
-                    'ilce_mahalle_map': ilce_mahalle_map
+                    'ilce': context.unique_ilce(),
+                    'ilce_mahalle_map': context.ilce_mahalle_map()
                 }
             return None
     except Exception as e:
@@ -1075,36 +2853,7 @@ def get_available_features():
 def get_district_stats():
     """İlçe bazında fiyat istatistiklerini döndürür"""
     try:
-        # Veri setini yükle
-        df = load_and_preprocess_data()
-        
-        if df is not None:
-            # İlçe bazında ortalama, medyan, minimum ve maksimum fiyatları hesapla
-            district_stats = df.groupby('ilce')['fiyat'].agg(['mean', 'median', 'min', 'max', 'count', 'std']).reset_index()
-            district_stats = district_stats.sort_values('mean', ascending=False)
-            
-            # Metrekare başına ortalama fiyatı hesapla
-            df['fiyat_metrekare'] = df['fiyat'] / df['metrekare']
-            price_per_sqm = df.groupby('ilce')['fiyat_metrekare'].mean().reset_index()
-            
-            # İlçe istatistiklerine metrekare başına fiyatı ekle
-            district_stats = district_stats.merge(price_per_sqm, on='ilce')
-            
-            # Sonuçları sözlük olarak döndür
-            result = {}
-            for _, row in district_stats.iterrows():
-                result[row['ilce']] = {
-                    'mean': float(row['mean']),
-                    'median': float(row['median']),
-                    'min': float(row['min']),
-                    'max': float(row['max']),
-                    'count': int(row['count']),
-                    'std': float(row['std']),
-                    'price_per_sqm': float(row['fiyat_metrekare'])
-                }
-            
-            return result
-        return None
+        return get_data_context().district_stats()
     except Exception as e:
         print(f"İlçe istatistikleri hesaplanırken hata oluştu: {e}")
         return None
@@ -1113,17 +2862,16 @@ def get_price_range_performance():
     """Fiyat aralığına göre model performansını döndürür"""
     try:
         # Model dosyalarını kontrol et
-        if not os.path.exists('models/konut_fiyat_model.pkl'):
+        if not has_trained_model():
             print("❌ Eğitilmiş model bulunamadı!")
             return None
         
-        # Modeli ve scaler'ı yükle
-        model = joblib.load('models/konut_fiyat_model.pkl')
-        scaler = joblib.load('models/scaler.pkl')
-        feature_names = joblib.load('models/feature_names.pkl')
+        # Modeli ve scaler'ı paylaşılan tahmin motorundan al
+        predictor = get_predictor()
+        model, scaler, feature_names = predictor.model, predictor.scaler, predictor.feature_names
         
-        # Veri setini yükle ve işle
-        df = load_and_preprocess_data()
+        # Paylaşılan veri setini kullan
+        df = get_data_context().frame()
         if df is None:
             return None
         
@@ -1135,27 +2883,13 @@ def get_price_range_performance():
         categorical_cols = ['ilce', 'mahalle']
         df_with_target_encoding = target_encode_categorical(df, categorical_cols, target_column)
         
-        # Özellik mühendisliği
-        X_numerical = create_features(df_with_target_encoding)
-        
-        # Target encoding özelliklerini ekle
-        target_encoding_cols = [col for col in df_with_target_encoding.columns if 'target_' in col]
-        X_target_encoded = df_with_target_encoding[target_encoding_cols]
-        
-        # One-hot encoding
-        X_categorical = pd.get_dummies(df[categorical_cols], drop_first=True)
+        # Test verisi oluştur (eğitimdeki %20'lik ayrım ile aynı satırlar)
+        train_rows, test_rows, y_train, y_test = train_test_split(
+            np.arange(len(df)), y, test_size=0.2, random_state=42, stratify=df['ilce'])
         
-        # Tüm özellikleri birleştir
-        X = pd.concat([X_numerical, X_target_encoded, X_categorical], axis=1)
-        
-        # Özellikleri model için sırala
-        X = X.reindex(columns=feature_names, fill_value=0)
-        
-        # Test verisi oluştur (son %20)
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=df['ilce'])
-        
-        # Özellikleri ölçeklendir
-        X_test_scaled = scaler.transform(X_test)
+        # Eğitimle aynı özellik planı ile ölçeklenmiş model girdisini oluştur
+        feature_plan = load_feature_plan('models', feature_names)
+        X_test_scaled = feature_plan.model_input(df_with_target_encoding.iloc[test_rows], scaler)
         
         # Tahmin yap
         y_pred = model.predict(X_test_scaled)
@@ -1257,15 +2991,476 @@ def get_price_range_performance():
         traceback.print_exc()
         return None
 
+# Artımlı güncellemede eklenen ilanlar (tam yeniden eğitimde veri setine eklenir)
+INCREMENTAL_ROWS_FILE = os.path.join('models', 'incremental_rows.pkl')
+RAW_COLUMNS = ['fiyat', 'ilce', 'mahalle', 'metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat']
+
+def read_listings(path):
+    """Yeni ilan dosyasını oku (Excel, CSV veya Parquet) ve temel temizlemeyi uygula"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xls'):
+        df = pd.read_excel(path)
+    elif extension == '.parquet':
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    return clean_raw_listings(df).reset_index(drop=True)
+
+def load_incremental_rows():
+    """Artımlı güncellemelerde eklenen ilanlar (yoksa None)"""
+    return joblib.load(INCREMENTAL_ROWS_FILE) if os.path.exists(INCREMENTAL_ROWS_FILE) else None
+
+def store_incremental_rows(delta):
+    """Güncellemesi tamamlanan yeni ilanları sakla; sonraki tam eğitimler de bu ilanları kullanır"""
+    stored = load_incremental_rows()
+    rows = delta[RAW_COLUMNS]
+    _atomic_dump(pd.concat([stored, rows], ignore_index=True) if stored is not None else rows, INCREMENTAL_ROWS_FILE)
+
+def load_training_frame(pending_rows=None):
+    """Eğitim veri seti: temizlenmiş Excel verisi + artımlı güncellemelerde eklenen ilanlar
+    
+    pending_rows: henüz saklanmamış yeni ilanlar (ör. kayma nedeniyle yeniden eğitilen güncelleme)
+    """
+    df = load_and_preprocess_data()
+    extra = [rows[RAW_COLUMNS] for rows in (load_incremental_rows(), pending_rows) if rows is not None]
+    if df is None or not extra:
+        return df
+    extra = pd.concat(extra, ignore_index=True)
+    print(f"Artımlı güncellemelerden {len(extra)} ilan eğitim verisine ekleniyor")
+    # Yeni ilanlar Excel verisiyle aynı filtrelerden birleşik veri üzerinde geçer (ör. tek ilanlı
+    # yeni ilçe tabakalı bölmeyi bozmasın diye az örnekli gruplar çıkarılır). Filtreler tekrar
+    # uygulanınca sınırlar kaydığı için zaten temizlenmiş veri seti satırları olduğu gibi kalır;
+    # kalan yeni ilanların grupları birleşik veride de en az örnek sayısını sağlar.
+    tagged = pd.concat([df[RAW_COLUMNS].assign(yeni_ilan=False), extra[RAW_COLUMNS].assign(yeni_ilan=True)],
+                       ignore_index=True)
+    kept = filter_listings(tagged)
+    kept = kept.loc[kept['yeni_ilan'], RAW_COLUMNS]
+    print(f"Temizleme sonrası {len(kept)}/{len(extra)} yeni ilan eğitim verisine eklendi")
+    combined = pd.concat([df[RAW_COLUMNS], kept], ignore_index=True)
+    combined['fiyat_metrekare'] = combined['fiyat'] / combined['metrekare']
+    return add_group_statistics(combined)
+
+def population_stability_index(reference_hist, current_hist, n_buckets=10):
+    """Referans dağılımın eşit olasılıklı kovalarında iki fiyat histogramı arasındaki PSI"""
+    reference_hist = np.asarray(reference_hist, dtype=np.float64)
+    current_hist = np.asarray(current_hist, dtype=np.float64)
+    # İnce histogram kutuları referansın birikimli oranına göre kovalara atanır
+    cumulative_before = np.concatenate([[0], np.cumsum(reference_hist)[:-1]]) / reference_hist.sum()
+    bucket = np.minimum((cumulative_before * n_buckets).astype(np.intp), n_buckets - 1)
+    reference = np.bincount(bucket, weights=reference_hist, minlength=n_buckets) / reference_hist.sum()
+    current = np.bincount(bucket, weights=current_hist, minlength=n_buckets) / max(current_hist.sum(), 1)
+    reference = np.maximum(reference, 1e-4)
+    current = np.maximum(current, 1e-4)
+    return float(np.sum((current - reference) * np.log(current / reference)))
+
+def iter_base_estimators(model):
+    """Ensemble içindeki eğitilmiş temel modelleri (fold modelleri dahil) sırayla döndür"""
+    if isinstance(model, WeightedEnsemble):
+        for _, estimator in model.estimators:
+            yield from iter_base_estimators(estimator)
+    elif isinstance(model, (FoldAverageModel, VotingRegressor, StackingRegressor)):
+        for estimator in model.estimators_:
+            yield from iter_base_estimators(estimator)
+    else:
+        yield model
+
+# Ek ağaç/tur eğitmek için gereken en az yeni ilan sayısı: daha azıyla eğitilen ağaçlar birkaç ilanın
+# fiyatını ezberler, Gradient Boosting'in alt örneklemesinde torba dışı satır kalmaz
+MIN_EXTEND_ROWS = 30
+
+def extend_estimator(estimator, X, y, extra_fraction=0.1, min_rows=MIN_EXTEND_ROWS):
+    """Eğitilmiş modele yeni ilanlarla ek ağaç/boosting turu ekle; eklenen sayıyı döndür
+    
+    Desteklenmeyen modellerde veya min_rows'tan az ilanda model değişmez ve 0 döner.
+    """
+    if X.shape[0] < min_rows:
+        return 0
+    if isinstance(estimator, RandomForestRegressor):
+        n_current = len(estimator.estimators_)
+    elif isinstance(estimator, GradientBoostingRegressor):
+        n_current = estimator.estimators_.shape[0]
+    elif XGB_AVAILABLE and isinstance(estimator, xgb.XGBRegressor):
+        n_current = estimator.get_booster().num_boosted_rounds()
+    elif LGB_AVAILABLE and isinstance(estimator, lgb.LGBMRegressor):
+        n_current = estimator.booster_.current_iteration()
+    else:
+        return 0
+    n_new = max(1, int(round(n_current * extra_fraction)))
+    
+    if isinstance(estimator, RandomForestRegressor):
+        # Yeni ağaçlar yalnızca yeni ilanlar üzerinde eğitilir (OOB skoru bu veride anlamsız)
+        oob_score = estimator.oob_score
+        estimator.set_params(warm_start=True, n_estimators=n_current + n_new, oob_score=False)
+        estimator.fit(X, y)
+        estimator.set_params(warm_start=False, oob_score=oob_score)
+    elif isinstance(estimator, GradientBoostingRegressor):
+        # Ek aşamalar mevcut modelin yeni ilanlardaki artıklarına eğitilir
+        estimator.set_params(warm_start=True, n_estimators=n_current + n_new)
+        estimator.fit(X, y)
+        estimator.set_params(warm_start=False)
+    elif XGB_AVAILABLE and isinstance(estimator, xgb.XGBRegressor):
+        estimator.set_params(n_estimators=n_new)
+        estimator.fit(X, y, xgb_model=estimator.get_booster())
+    else:
+        estimator.set_params(n_estimators=n_new)
+        estimator.fit(X, y, init_model=estimator.booster_)
+    return n_new
+
+def _atomic_dump(obj, path):
+    """Dosyayı önce geçici isimle yaz, sonra değiştir (tahmin motoru yarım dosya okumasın)"""
+    tmp_path = path + '.tmp'
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def update_model(delta_path, psi_threshold=0.2, error_threshold=0.25, extra_fraction=0.1, min_drift_rows=50,
+                 n_jobs=None):
+    """Yeni ilan dosyası ile modeli artımlı olarak güncelle
+    
+    İlçe/mahalle istatistikleri birleştirilebilir özetlerle güncellenir, ensemble modellerine
+    yeni ilanlarla ek ağaç/tur eklenir. Fiyat dağılımı (PSI) veya hata oranı eşiği aşılırsa
+    model tüm veri ile yeniden eğitilir. Öğrenci model varsa güncel ensemble'dan yeniden damıtılır;
+    damıtma başarısız olursa önceki öğrenci pakette kalır. Sonuç: {'mode', 'n_rows', 'psi',
+    'error_ratio'} ve öğrenci varsa 'student' ('updated' veya 'kept_previous').
+    """
+    try:
+        delta = read_listings(delta_path)
+        if delta.empty:
+            print("Yeni ilan dosyasında temizleme sonrası kayıt kalmadı, güncelleme yapılmadı.")
+            return None
+        print(f"Yeni ilanlar: {len(delta)} kayıt")
+        
+        # Model yerinde değiştirileceği için paket bellek eşlemesiz (yazılabilir) yüklenir
+        artifacts = load_model_bundle(mmap_mode=None)
+        model, scaler, feature_plan = artifacts['model'], artifacts['scaler'], artifacts['feature_plan']
+        encoding_tables = artifacts['encoding_tables']
+        performance_metrics = artifacts['performance_metrics']
+        # Öğrenci model varsa güncellenen ensemble'dan yeniden damıtılır (o zamana kadar eskisi kalır)
+        previous_student = artifacts['student_model']
+        if os.path.exists('models/encoding_state.pkl'):
+            encoding_state = joblib.load('models/encoding_state.pkl')
+        else:
+            # Eski model klasörü: özetler eğitim verisinden bir kez hesaplanır
+            encoding_state = build_encoding_state(load_training_frame())
+        
+        # Yeni ilanlar güncelleme öncesi tablolarla kodlanır (eğitimdeki out-of-fold kodlamaya denk)
+        X_delta = feature_plan.model_input(attach_encodings(delta[INPUT_COLUMNS], encoding_tables), scaler)
+        y_delta = delta['fiyat'].to_numpy(dtype=np.float64)
+        
+        # Kayma kontrolü: fiyat dağılımı ve mevcut modelin yeni ilanlardaki hatası
+        delta_hist = _price_summary(np.zeros(len(delta), dtype=np.intp), y_delta, 1)['hist'][0]
+        psi = population_stability_index(encoding_state['global']['hist'][0], delta_hist)
+        delta_mape = mean_absolute_percentage_error(y_delta, np.maximum(0, model.predict(X_delta))) * 100
+        error_ratio = delta_mape / performance_metrics['mape']
+        print(f"Fiyat dağılımı PSI: {psi:.3f} (eşik {psi_threshold})")
+        print(f"Yeni ilanlarda MAPE: %{delta_mape:.2f} (eğitim %{performance_metrics['mape']:.2f}, oran {error_ratio:.2f})")
+        
+        # Yeni ilanlar ancak güncelleme başarıyla kaydedildikten sonra saklanır; başarısız bir
+        # güncelleme tekrar denendiğinde aynı ilanlar iki kez eklenmez
+        drift = len(delta) >= min_drift_rows and (psi > psi_threshold or error_ratio > 1 + error_threshold)
+        result = {'n_rows': len(delta), 'psi': psi, 'error_ratio': error_ratio}
+        if drift:
+            print("⚠️ Kayma eşiği aşıldı, model tüm veri ile yeniden eğitiliyor...")
+            df = load_training_frame(pending_rows=delta)
+            # Önceki aramanın kazanan hiperparametreleri korunur
+            ensemble_model, _, _ = train_model(df, n_jobs=n_jobs,
+                                               search_result=performance_metrics.get('hyperparameter_search'))
+            if ensemble_model is None:
+                return None
+            store_incremental_rows(delta)
+            if previous_student is not None:
+                result['student'] = _refresh_student(previous_student)
+            return {'mode': 'retrain', **result}
+        
+        # Ensemble modellerine yeni ilanlarla ek ağaç/tur ekle (az ilanda yalnızca istatistikler güncellenir)
+        n_added = 0
+        if len(delta) < MIN_EXTEND_ROWS:
+            print(f"⚠️ Ek ağaç/tur için en az {MIN_EXTEND_ROWS} yeni ilan gerekir ({len(delta)} var), "
+                  f"yalnızca istatistikler güncelleniyor")
+        else:
+            for estimator in iter_base_estimators(model):
+                n_added += extend_estimator(estimator, X_delta, y_delta, extra_fraction)
+            print(f"Ensemble modellerine toplam {n_added} ağaç/tur eklendi")
+        
+        # İstatistik özetlerini ve kodlama tablolarını güncelle
+        encoding_state = update_encoding_state(encoding_state, delta)
+        
+        # İlçe-mahalle haritasına yeni çiftleri ekle
+        metadata = artifacts['metadata']
+        ilce_mahalle_map = merge_ilce_mahalle_maps(metadata['ilce_mahalle_map'], compute_ilce_mahalle_map(delta))
+        
+        performance_metrics['n_incremental_samples'] = performance_metrics.get('n_incremental_samples', 0) + len(delta)
+        # Yeni ilanlar eğitim tarafına eklenir; test ilanları değişmez
+        training_split = artifacts['training_split']
+        if training_split is not None:
+            training_split = {'train': pd.concat([training_split['train'], delta[SPLIT_COLUMNS]], ignore_index=True),
+                              'test': training_split['test']}
+        performance_metrics['last_update_date'] = pd.Timestamp.now().isoformat()
+        
+        artifacts.update({
+            'encoding_tables': encoding_tables_from_state(encoding_state),
+            'performance_metrics': performance_metrics,
+            'metadata': build_metadata(ilce_mahalle_map, metadata['price_range']),
+            # Eklenen ağaçlarla birlikte yeniden derle
+            'compiled_model': build_compiled_model(model, X_delta),
+            'training_split': training_split
+        })
+        save_model_bundle(artifacts)
+        _atomic_dump(encoding_state, 'models/encoding_state.pkl')
+        store_incremental_rows(delta)
+        print("✅ Model artımlı olarak güncellendi.")
+        if previous_student is not None:
+            result['student'] = _refresh_student(previous_student)
+        return {'mode': 'incremental', **result}
+    except Exception as e:
+        print(f"Artımlı güncelleme hatası: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def _refresh_student(previous_student, model_dir='models'):
+    """Öğrenciyi güncel ensemble'dan yeniden damıt; başarısız olursa önceki öğrenciyi pakette bırak"""
+    if distill_model(model_dir=model_dir) is not None:
+        return 'updated'
+    print("⚠️ Öğrenci model yeniden damıtılamadı, önceki öğrenci model korunuyor")
+    artifacts = load_model_bundle(model_dir, mmap_mode=None)
+    if artifacts['student_model'] is None:
+        # Tam eğitim yeni paketi öğrencisiz kaydeder
+        artifacts['student_model'] = previous_student
+        save_model_bundle(artifacts, model_dir)
+    return 'kept_previous'
+
+def compile_model_bundle(model_dir='models', n_check=2000):
+    """Mevcut model paketine derlenmiş ağaç motorunu ekle (yeniden eğitmeden)
+    
+    Derlenmiş model veri setinden alınan n_check ilanlık örnekte orijinal modelle karşılaştırılır.
+    """
+    try:
+        artifacts = load_model_bundle(model_dir, mmap_mode=None)
+        df = get_data_context().frame()
+        if df is None:
+            print("❌ Doğrulama için veri seti yüklenemedi")
+            return None
+        encoding_tables = artifacts['encoding_tables']
+        if encoding_tables is None:
+            encoding_tables = build_encoding_tables(df)
+        sample = df.sample(min(n_check, len(df)), random_state=42)[INPUT_COLUMNS]
+        X_check = artifacts['feature_plan'].model_input(attach_encodings(sample, encoding_tables), artifacts['scaler'])
+        
+        artifacts['compiled_model'] = build_compiled_model(artifacts['model'], X_check)
+        if artifacts['compiled_model'] is None:
+            return None
+        manifest = save_model_bundle(artifacts, model_dir)
+        print(f"✅ Derlenmiş model pakete eklendi: {manifest['payload']}")
+        return manifest
+    except Exception as e:
+        print(f"Model derleme hatası: {e}")
+        return None
+
+class DistilledModel:
+    """Ensemble tahminlerinden damıtılmış küçük öğrenci model
+    
+    Yalnızca yoğun bloğu (sayısal + target encoding sütunları) kullanır ve öğretmenin log
+    fiyat tahminini öğrenir. Küçük gruplar derlenmiş ağaç motoruyla tahmin edilir.
+    report öğretmene sadakat ve hız ölçümlerini tutar.
+    """
+    
+    def __init__(self, estimator, n_features, compiled_max_rows=COMPILED_MAX_ROWS):
+        self.estimator = estimator
+        self.n_features = n_features
+        self.compiled_max_rows = compiled_max_rows
+        self.compiled_ = None
+        self.report = None
+    
+    def _dense(self, X):
+        X = X[:, :self.n_features]
+        return X.toarray() if sparse.issparse(X) else np.asarray(X)
+    
+    def fit(self, X, teacher_prediction):
+        X = self._dense(X)
+        self.estimator.fit(X, np.log(np.maximum(teacher_prediction, 1.0)))
+        self.compiled_ = CompiledForest.from_estimator(self.estimator)
+        if self.compiled_ is not None and compiled_prediction_error(self.estimator, self.compiled_, X) > 1e-9:
+            self.compiled_ = None
+        return self
+    
+    def predict(self, X):
+        X = self._dense(X)
+        use_compiled = self.compiled_ is not None and X.shape[0] <= self.compiled_max_rows
+        return np.exp((self.compiled_ if use_compiled else self.estimator).predict(X))
+
+def perturb_listings(listings, n_copies, ilce_mahalle_map, random_state=42, swap_fraction=0.2):
+    """İlanların rastgele pertürbe edilmiş n_copies kopyası (damıtma için sentetik girdiler)
+    
+    Metrekare log ölçekte ~%15, oda sayısı ±1, yaş ±3, kat ±2 oynatılır; swap_fraction
+    olasılıkla mahalle aynı ilçeden rastgele bir mahalleyle değiştirilir.
+    """
+    rng = np.random.default_rng(random_state)
+    synthetic = listings[INPUT_COLUMNS].iloc[np.tile(np.arange(len(listings)), n_copies)].reset_index(drop=True)
+    n_rows = len(synthetic)
+    metrekare = synthetic['metrekare'].to_numpy(dtype=np.float64) * np.exp(rng.normal(0, 0.15, n_rows))
+    synthetic['metrekare'] = np.clip(np.round(metrekare), listings['metrekare'].min(), listings['metrekare'].max())
+    synthetic['oda_sayisi'] = np.maximum(1, synthetic['oda_sayisi'].to_numpy() + rng.integers(-1, 2, n_rows))
+    synthetic['yas'] = np.maximum(0, synthetic['yas'].to_numpy() + rng.integers(-3, 4, n_rows))
+    synthetic['bulundugu_kat'] = synthetic['bulundugu_kat'].to_numpy() + rng.integers(-2, 3, n_rows)
+    
+    ilce = synthetic['ilce'].to_numpy()
+    mahalle = synthetic['mahalle'].to_numpy(dtype=object).copy()
+    swap = rng.random(n_rows) < swap_fraction
+    for name in np.unique(ilce[swap]):
+        rows = np.flatnonzero(swap & (ilce == name))
+        options = np.asarray(ilce_mahalle_map.get(name, []), dtype=object)
+        if len(options):
+            mahalle[rows] = options[rng.integers(0, len(options), len(rows))]
+    synthetic['mahalle'] = mahalle
+    return synthetic
+
+def _best_time(func, *args, repeat=5):
+    """Fonksiyonun birkaç çalıştırmadaki en iyi süresi (milisaniye)"""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def distill_model(df=None, model_dir='models', n_perturbations=3, random_state=42):
+    """Ensemble'ı küçük bir öğrenci modele damıt ve model paketine ekle
+    
+    Öğrenci (sığ HistGradientBoosting), eğitim ilanları ve bunların n_perturbations pertürbe
+    kopyası üzerinde ensemble tahminlerini öğrenir. Eğitim/test ilanları paketteki bölmeden
+    alınır; girdiler yalnızca eğitim ilanlarından hesaplanan kodlama tablolarıyla oluşturulur.
+    Sadakat ve hız test ilanlarında öğretmenle karşılaştırılır. df yalnızca bölmesi olmayan eski
+    paketlerde kullanılır. Sonuç: rapor sözlüğü (hata durumunda None).
+    """
+    try:
+        # Pakete yeni parça ekleneceği için bellek eşlemesiz yüklenir
+        artifacts = load_model_bundle(model_dir, mmap_mode=None)
+        teacher, scaler, feature_plan = artifacts['model'], artifacts['scaler'], artifacts['feature_plan']
+        
+        training_split = artifacts['training_split']
+        if training_split is None:
+            # Eski paket: eğitimdeki bölme aynı tohum ve ilçe tabakalamasıyla yeniden üretilir
+            print("⚠️ Pakette eğitim bölmesi yok, bölme veri setinden yeniden oluşturuluyor")
+            if df is None:
+                df = load_training_frame()
+            if df is None:
+                print("❌ Damıtma için veri seti yüklenemedi")
+                return None
+            train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42,
+                                                     stratify=df['ilce'])
+            training_split = {'train': df[SPLIT_COLUMNS].iloc[train_rows], 'test': df[SPLIT_COLUMNS].iloc[test_rows]}
+        train_split, test_split = training_split['train'], training_split['test']
+        metadata = artifacts['metadata']
+        ilce_mahalle_map = metadata['ilce_mahalle_map'] if metadata else compute_ilce_mahalle_map(train_split)
+        
+        # Kodlama tabloları yalnızca eğitim ilanlarından: test fiyatları girdilere sızmaz
+        encoding_tables = build_encoding_tables(train_split)
+        
+        def model_input(listings):
+            return feature_plan.model_input(attach_encodings(listings, encoding_tables), scaler)
+        
+        # Öğrenci test ilanlarını görmez
+        train_listings = train_split[INPUT_COLUMNS]
+        synthetic = perturb_listings(train_listings, n_perturbations, ilce_mahalle_map, random_state)
+        X_fit = model_input(pd.concat([train_listings, synthetic], ignore_index=True))
+        print(f"Damıtma verisi: {len(train_listings)} eğitim + {len(synthetic)} sentetik ilan")
+        
+        start = time.perf_counter()
+        student = DistilledModel(HistGradientBoostingRegressor(
+            max_iter=300,
+            learning_rate=0.1,
+            max_depth=6,
+            min_samples_leaf=10,
+            early_stopping=False,
+            random_state=random_state
+        ), feature_plan.n_dense).fit(X_fit, teacher.predict(X_fit))
+        fit_seconds = time.perf_counter() - start
+        
+        # Sadakat: test ilanlarında öğrenci ve öğretmen tahminleri (ve gerçek fiyatlar)
+        X_test = model_input(test_split[INPUT_COLUMNS])
+        y_test = test_split['fiyat'].to_numpy(dtype=np.float64)
+        teacher_test = np.maximum(0, teacher.predict(X_test))
+        student_test = student.predict(X_test)
+        gap = np.abs(student_test - teacher_test) / np.maximum(teacher_test, 1.0)
+        
+        report = {
+            'n_training_rows': len(train_listings),
+            'n_synthetic_rows': len(synthetic),
+            'fit_seconds': fit_seconds,
+            'fidelity_r2': r2_score(teacher_test, student_test),
+            'fidelity_mape': float(gap.mean() * 100),
+            'fidelity_p95_gap': float(np.quantile(gap, 0.95) * 100),
+            'teacher_r2': r2_score(y_test, teacher_test),
+            'teacher_mape': mean_absolute_percentage_error(y_test, teacher_test) * 100,
+            'student_r2': r2_score(y_test, student_test),
+            'student_mape': mean_absolute_percentage_error(y_test, student_test) * 100,
+            # Model çağrısı süreleri (özellik oluşturma hariç)
+            'teacher_ms_single': _best_time(teacher.predict, X_test[:1]),
+            'student_ms_single': _best_time(student.predict, X_test[:1]),
+            'teacher_ms_batch': _best_time(teacher.predict, X_test, repeat=2),
+            'student_ms_batch': _best_time(student.predict, X_test, repeat=2),
+            'batch_rows': len(test_split),
+            'teacher_size_mb': len(pickle.dumps(teacher, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20,
+            'student_size_mb': len(pickle.dumps(student, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20,
+            'distillation_date': pd.Timestamp.now().isoformat()
+        }
+        if artifacts['compiled_model'] is not None:
+            report['compiled_ms_single'] = _best_time(artifacts['compiled_model'].predict, X_test[:1])
+        report = {key: float(value) if isinstance(value, (float, np.floating)) else value
+                  for key, value in report.items()}
+        student.report = report
+        
+        artifacts['student_model'] = student
+        manifest = save_model_bundle(artifacts, model_dir)
+        print(f"Sadakat (test, öğretmene göre): R²={report['fidelity_r2']:.4f}, "
+              f"ort. sapma %{report['fidelity_mape']:.2f}, %95'lik sapma %{report['fidelity_p95_gap']:.2f}")
+        print(f"Gerçek fiyatlara göre MAPE: öğretmen %{report['teacher_mape']:.2f}, öğrenci %{report['student_mape']:.2f}")
+        compiled_note = (f" (derlenmiş {report['compiled_ms_single']:.1f} ms)" if 'compiled_ms_single' in report else "")
+        print(f"Tek ilan: öğretmen {report['teacher_ms_single']:.1f} ms{compiled_note}, "
+              f"öğrenci {report['student_ms_single']:.1f} ms; "
+              f"{report['batch_rows']} ilan: öğretmen {report['teacher_ms_batch']:.0f} ms, "
+              f"öğrenci {report['student_ms_batch']:.0f} ms")
+        print(f"Boyut: öğretmen {report['teacher_size_mb']:.1f} MB, öğrenci {report['student_size_mb']:.2f} MB")
+        print(f"✅ Öğrenci model pakete eklendi: {manifest['payload']}")
+        return report
+    except Exception as e:
+        print(f"Model damıtma hatası: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
 if __name__ == "__main__":
-    # Veri setini yükle
+    # Kaydedilen sınıfların (FeaturePlan, ensemble'lar) app.py'den yüklenebilmesi için
+    # '__main__' yerine 'model' modülü üzerinden çalıştır
+    import model as model_module
+    import sys
+    
+    # python model.py --update yeni_ilanlar.xlsx : artımlı güncelleme
+    if len(sys.argv) == 3 and sys.argv[1] == '--update':
+        model_module.update_model(sys.argv[2])
+        sys.exit(0)
+    
+    # python model.py --compile : mevcut pakete derlenmiş ağaç motorunu ekle
+    if len(sys.argv) == 2 and sys.argv[1] == '--compile':
+        sys.exit(0 if model_module.compile_model_bundle() is not None else 1)
+    
+    # python model.py --distill : mevcut ensemble'ı küçük bir öğrenci modele damıt
+    if len(sys.argv) == 2 and sys.argv[1] == '--distill':
+        sys.exit(0 if model_module.distill_model() is not None else 1)
+    
+    # python model.py --search [arama.json] : hiperparametre aramasıyla tam eğitim
+    search = None
+    if len(sys.argv) in (2, 3) and sys.argv[1] == '--search':
+        search = sys.argv[2] if len(sys.argv) == 3 else True
+    
+    # Veri setini yükle (artımlı güncellemelerde eklenen ilanlar dahil)
     print("Veri seti yükleniyor...")
-    data = load_and_preprocess_data()
+    data = model_module.load_training_frame()
     
     if data is not None:
         print(f"Veri seti başarıyla yüklendi. Toplam {data.shape[0]} kayıt, {data.shape[1]} özellik var.")
         # Modeli eğit
-        model, scaler, feature_names = train_model(data)
+        model, scaler, feature_names = model_module.train_model(data, search=search)
         
         if model is not None:
             print("Model başarıyla eğitildi ve kaydedildi.") 
\ No newline at end of file
@@ -0,0 +1,258 @@
+# Konut fiyat tahmini HTTP servisi (ASGI) - model paketini bir kez yükler, tekil istekleri mikro-toplu işler
+# Kullanım: python server.py [--host 0.0.0.0] [--port 8000] [--max-batch 256] [--max-wait-ms 25]
+#       veya: uvicorn server:app
+import argparse
+import asyncio
+import json
+import math
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from model import INPUT_COLUMNS, KonutFiyatTahminci, MicroBatcher, prediction_records
+
+# Tek bir isteğin gövde boyutu ve toplu istekteki ilan sayısı sınırları
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_BATCH_ROWS = 10000
+NUMERIC_INPUT_COLUMNS = ['metrekare', 'oda_sayisi', 'yas', 'bulundugu_kat']
+
+
+class HTTPError(Exception):
+    """İstemciye durum kodu ve mesajla döndürülecek hata"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_listing(payload):
+    """İstek gövdesindeki tek ilanı doğrula ve girdi sözlüğüne çevir (hatalıysa HTTPError 422)"""
+    if not isinstance(payload, dict):
+        raise HTTPError(422, "İlan bir JSON nesnesi olmalı")
+    missing = [col for col in INPUT_COLUMNS if payload.get(col) is None]
+    if missing:
+        raise HTTPError(422, f"Eksik alanlar: {missing}")
+    listing = {'ilce': str(payload['ilce']), 'mahalle': str(payload['mahalle'])}
+    for col in NUMERIC_INPUT_COLUMNS:
+        value = payload[col]
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise HTTPError(422, f"'{col}' sayısal olmalı")
+        try:
+            value = float(value)
+        except ValueError:
+            raise HTTPError(422, f"'{col}' sayısal olmalı")
+        if not math.isfinite(value):
+            raise HTTPError(422, f"'{col}' sonlu bir sayı olmalı")
+        listing[col] = value
+    if listing['metrekare'] <= 0:
+        raise HTTPError(422, "'metrekare' pozitif olmalı")
+    return listing
+
+
+class PredictionService:
+    """Tahmin motorunu saran ASGI uygulaması
+
+    Tekil istekler MicroBatcher kuyruğunda toplanır; en fazla max_batch_size ilan veya max_wait_ms
+    milisaniye dolunca tek predict_batch çağrısıyla tahmin edilip sonuçlar isteklere dağıtılır.
+    Kuyruk doluysa 503 döner. Toplu istekler n_workers iş parçacıklı sınırlı havuzda çalışır.
+
+    Tahmin motoru model çağrılarını kendi kilidiyle sıraladığı için tek işleyici yeterlidir: model
+    meşgulken gelen istekler kuyrukta birikip sonraki gruba girer. Bekleme süresi, olay döngüsünün
+    soket kuyruğundaki istekleri okuyabileceği kadar uzun olmalıdır; /metrics gecikme yüzdelikleri
+    ve grup boyutu histogramı ile ayarlanır. Çok çekirdekli makinelerde ölçekleme için uvicorn
+    --workers ile birden fazla süreç çalıştırılır.
+    """
+
+    def __init__(self, model_dir='models', max_batch_size=256, max_wait_ms=25.0, n_workers=1, max_queue_size=4096):
+        self.model_dir = model_dir
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.n_workers = n_workers
+        self.max_queue_size = max_queue_size
+        self.predictor = None
+        self.load_error = None
+        self.started_at = None
+        self.batcher = None
+        self._executor = None
+
+    # --- Yaşam döngüsü ---
+
+    async def startup(self):
+        """Model paketini bir kez yükle ve mikro-toplu işleyiciyi başlat"""
+        self.started_at = time.time()
+        self._executor = ThreadPoolExecutor(max_workers=self.n_workers, thread_name_prefix='tahmin')
+        loop = asyncio.get_running_loop()
+        try:
+            self.predictor = await loop.run_in_executor(self._executor, KonutFiyatTahminci, self.model_dir)
+            print(f"✅ Model yüklendi: {self.bundle_version() or 'eski model klasörü'}")
+        except Exception as e:
+            # Servis ayakta kalır; /ready model yüklenene kadar 503 döner
+            self.load_error = str(e)
+            print(f"❌ Model yükleme hatası: {e}")
+            return
+        self.batcher = MicroBatcher(self.predictor, max_batch_size=self.max_batch_size,
+                                    max_wait_ms=self.max_wait * 1000, max_queue_size=self.max_queue_size)
+
+    async def shutdown(self):
+        """Mikro-toplu kuyruğu boşaltıp durdur ve iş parçacığı havuzunu kapat"""
+        if self.batcher is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.batcher.close)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def ready(self):
+        return self.batcher is not None
+
+    def bundle_version(self):
+        manifest = getattr(self.predictor, 'manifest', None)
+        return manifest['bundle_version'] if manifest else None
+
+    # --- Tahmin ---
+
+    async def predict_one(self, listing):
+        """Tek ilanı mikro-toplu kuyruğa ekle ve sonucunu bekle"""
+        try:
+            future = self.batcher.submit(listing)
+        except queue.Full:
+            raise HTTPError(503, "Tahmin kuyruğu dolu, daha sonra tekrar deneyin")
+        # İstek iptal edilirse (istemci bağlantıyı kapattı) kuyruktaki ilan da tahmin edilmez
+        return await asyncio.wrap_future(future)
+
+    async def predict_many(self, listings):
+        """Toplu istek zaten bir grup olduğundan kuyruğa girmeden doğrudan havuzda çalışır"""
+        if not listings:
+            return []
+        loop = asyncio.get_running_loop()
+        frame = await loop.run_in_executor(self._executor, self.predictor.predict_batch, pd.DataFrame(listings))
+        return prediction_records(frame)
+
+    # --- HTTP ---
+
+    async def handle(self, method, path, body):
+        """İsteği yönlendir ve (durum kodu, JSON gövdesi) döndür"""
+        if path == '/health':
+            # Canlılık: süreç istek kabul ediyor
+            return 200, {'status': 'ok', 'uptime_seconds': round(time.time() - self.started_at, 1)}
+        if path == '/ready':
+            # Hazırlık: model yüklendi, tahmin yapılabilir
+            if not self.ready():
+                return 503, {'status': 'loading' if self.load_error is None else 'error', 'error': self.load_error}
+            return 200, {'status': 'ready', 'bundle_version': self.bundle_version(),
+                         'queue_size': self.batcher.qsize()}
+        if path == '/metrics':
+            # Mikro-toplu ayarı (N, T) için gecikme yüzdelikleri ve grup boyutu histogramı
+            if not self.ready():
+                raise HTTPError(503, "Model henüz yüklenmedi")
+            if method == 'DELETE':
+                self.batcher.stats.reset()
+            return 200, {'max_batch_size': self.max_batch_size, 'max_wait_ms': self.max_wait * 1000,
+                         'queue_size': self.batcher.qsize(), **self.batcher.stats.snapshot()}
+        if path not in ('/predict', '/predict/batch'):
+            raise HTTPError(404, "Bulunamadı")
+        if method != 'POST':
+            raise HTTPError(405, "Yalnızca POST desteklenir")
+        if not self.ready():
+            raise HTTPError(503, "Model henüz yüklenmedi")
+
+        try:
+            payload = json.loads(body)
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPError(400, "Geçersiz JSON")
+
+        if path == '/predict':
+            return 200, await self.predict_one(parse_listing(payload))
+
+        listings = payload.get('listings') if isinstance(payload, dict) else payload
+        if not isinstance(listings, list):
+            raise HTTPError(422, "'listings' bir liste olmalı")
+        if len(listings) > MAX_BATCH_ROWS:
+            raise HTTPError(413, f"Toplu istekte en fazla {MAX_BATCH_ROWS} ilan olabilir")
+        parsed = []
+        for i, item in enumerate(listings):
+            try:
+                parsed.append(parse_listing(item))
+            except HTTPError as e:
+                raise HTTPError(e.status, f"ilan {i}: {e.message}")
+        return 200, {'predictions': await self.predict_many(parsed)}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                return  # İstemci bağlantıyı kapattı, yanıt gönderilmez
+            status, content = await self.handle(scope['method'], scope['path'], body)
+        except HTTPError as e:
+            status, content = e.status, {'error': e.message}
+        except Exception as e:
+            print(f"Tahmin servisi hatası: {e}")
+            status, content = 500, {'error': "Sunucu hatası"}
+        data = json.dumps(content, ensure_ascii=False).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                                (b'content-length', str(len(data)).encode())]})
+        await send({'type': 'http.response.body', 'body': data})
+
+    @staticmethod
+    async def _read_body(receive):
+        """İstek gövdesini oku (istemci bağlantıyı kapattıysa None)"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, "İstek gövdesi çok büyük")
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+
+def create_app():
+    """Ortam değişkenlerinden ayarlanan servis (KONUT_MODEL_DIR, KONUT_MAX_BATCH, KONUT_MAX_WAIT_MS, KONUT_WORKERS)"""
+    return PredictionService(
+        model_dir=os.environ.get('KONUT_MODEL_DIR', 'models'),
+        max_batch_size=int(os.environ.get('KONUT_MAX_BATCH', 256)),
+        max_wait_ms=float(os.environ.get('KONUT_MAX_WAIT_MS', 25)),
+        n_workers=int(os.environ.get('KONUT_WORKERS', 1))
+    )
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Konut fiyat tahmini HTTP servisi")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--threads', type=int, default=app.n_workers, help="Model çağrıları için iş parçacığı sayısı")
+    parser.add_argument('--max-batch', type=int, default=app.max_batch_size, help="Mikro-toplu en fazla ilan sayısı")
+    parser.add_argument('--max-wait-ms', type=float, default=app.max_wait * 1000, help="Mikro-toplu en uzun bekleme")
+    args = parser.parse_args()
+
+    app.n_workers, app.max_batch_size, app.max_wait = args.threads, args.max_batch, args.max_wait_ms / 1000.0
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
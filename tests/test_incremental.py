@@ -0,0 +1,35 @@
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+from model import MIN_EXTEND_ROWS, extend_estimator
+
+
+def _fitted(estimator, n_rows=200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 5))
+    y = X @ rng.normal(size=5) + rng.normal(scale=0.1, size=n_rows)
+    return estimator.fit(X, y), rng
+
+
+def test_small_update_leaves_models_unchanged():
+    # Tek ilanlık güncelleme: alt örneklemeli GB'de torba dışı satır kalmaz, hata vermemeli
+    gb, rng = _fitted(GradientBoostingRegressor(n_estimators=20, subsample=0.8, random_state=0))
+    rf, _ = _fitted(RandomForestRegressor(n_estimators=10, random_state=0))
+    X_new, y_new = rng.normal(size=(1, 5)), rng.normal(size=1)
+    before = gb.predict(X_new), rf.predict(X_new)
+
+    assert extend_estimator(gb, X_new, y_new) == 0
+    assert extend_estimator(rf, X_new, y_new) == 0
+    assert gb.estimators_.shape[0] == 20 and len(rf.estimators_) == 10
+    np.testing.assert_array_equal(gb.predict(X_new), before[0])
+    np.testing.assert_array_equal(rf.predict(X_new), before[1])
+
+
+def test_update_with_enough_rows_adds_stages():
+    gb, rng = _fitted(GradientBoostingRegressor(n_estimators=20, subsample=0.8, random_state=0))
+    X_new = rng.normal(size=(MIN_EXTEND_ROWS, 5))
+    y_new = rng.normal(size=MIN_EXTEND_ROWS)
+
+    assert extend_estimator(gb, X_new, y_new, extra_fraction=0.1) == 2
+    assert gb.estimators_.shape[0] == 22
+    assert not gb.warm_start